@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, any_, literal, or_, text, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import selectinload
 from database import get_db
 import models, schemas
-from auth import get_current_user, get_password_hash
+from auth import get_current_user, get_password_hash, revoke_user_tokens
 from typing import Optional
+import json
+import invalidation
 
 router = APIRouter(
     prefix="/admin",
@@ -60,6 +63,7 @@ async def approve_driver(
         raise HTTPException(status_code=400, detail="User is not a driver")
     
     driver.status = models.UserStatus.APPROVED
+    await invalidation.notify(db, invalidation.USERS, driver.id)
     await db.commit()
     await db.refresh(driver)
     return driver
@@ -85,10 +89,93 @@ async def reject_driver(
         raise HTTPException(status_code=400, detail="User is not a driver")
     
     driver.status = models.UserStatus.REJECTED
+    await invalidation.notify(db, invalidation.USERS, driver.id)
+    await revoke_user_tokens(db, driver.email)
     await db.commit()
     await db.refresh(driver)
     return driver
 
+# Bulk approve/reject/suspend in a single UPDATE ... RETURNING
+BULK_ACTION_STATUS = {
+    "approve": models.UserStatus.APPROVED,
+    "reject": models.UserStatus.REJECTED,
+    "suspend": models.UserStatus.SUSPENDED,
+}
+
+@router.post("/users/bulk-status", response_model=schemas.BulkUserStatusResponse)
+async def bulk_update_user_status(
+    request: schemas.BulkUserStatusRequest,
+    db: AsyncSession = Depends(get_db),
+    admin: models.User = Depends(verify_admin)
+):
+    if request.user_ids is None and request.role is None and request.status is None:
+        raise HTTPException(status_code=400, detail="Provide user_ids or at least one filter")
+
+    new_status = BULK_ACTION_STATUS[request.action]
+    stmt = update(models.User).values(status=new_status)
+
+    if request.user_ids is not None:
+        user_ids = list(dict.fromkeys(request.user_ids))
+        if not user_ids:
+            return {"action": request.action, "updated": 0, "results": []}
+        stmt = stmt.where(models.User.id == any_(literal(user_ids, ARRAY(Integer))))
+    if request.role:
+        stmt = stmt.where(models.User.role == request.role)
+    if request.status:
+        stmt = stmt.where(models.User.status == request.status)
+
+    # Approve/reject only apply to driver applications, same as the single endpoints
+    if request.action in ("approve", "reject"):
+        stmt = stmt.where(models.User.role == models.UserRole.DRIVER)
+    # Never let an admin lock themselves out
+    stmt = stmt.where(models.User.id != admin.id)
+
+    stmt = stmt.returning(models.User.id, models.User.email).execution_options(synchronize_session=False)
+    result = await db.execute(stmt)
+    updated = result.all()
+    updated_ids = {row.id for row in updated}
+    if request.action != "approve":
+        for row in updated:
+            await revoke_user_tokens(db, row.email)
+    if updated_ids:
+        await invalidation.notify(db, invalidation.USERS, ",".join(map(str, sorted(updated_ids))))
+    await db.commit()
+
+    if request.user_ids is None:
+        results = [
+            schemas.BulkUserOutcome(id=uid, outcome="updated", status=new_status)
+            for uid in sorted(updated_ids, reverse=True)
+        ]
+        return {"action": request.action, "updated": len(updated_ids), "results": results}
+
+    # Only look up the ids that did not match, to tell "missing" from "not eligible"
+    missing = [uid for uid in user_ids if uid not in updated_ids]
+    existing = {}
+    if missing:
+        m_result = await db.execute(
+            select(models.User.id, models.User.role, models.User.status)
+            .where(models.User.id == any_(literal(missing, ARRAY(Integer))))
+        )
+        existing = {row.id: row for row in m_result.all()}
+
+    results = []
+    for uid in user_ids:
+        if uid in updated_ids:
+            results.append(schemas.BulkUserOutcome(id=uid, outcome="updated", status=new_status))
+        elif uid not in existing:
+            results.append(schemas.BulkUserOutcome(id=uid, outcome="not_found", detail="User not found"))
+        else:
+            row = existing[uid]
+            if uid == admin.id:
+                detail = "Cannot change your own status"
+            elif request.action in ("approve", "reject") and row.role != models.UserRole.DRIVER:
+                detail = "User is not a driver"
+            else:
+                detail = "User does not match filter"
+            results.append(schemas.BulkUserOutcome(id=uid, outcome="skipped", status=row.status, detail=detail))
+
+    return {"action": request.action, "updated": len(updated_ids), "results": results}
+
 # Get all users with optional filtering
 @router.get("/users", response_model=list[schemas.UserResponse])
 async def get_all_users(
@@ -108,6 +195,75 @@ async def get_all_users(
     result = await db.execute(query)
     return result.scalars().all()
 
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def _estimate_count(db: AsyncSession, query) -> int:
+    # Planner estimate instead of COUNT(*): cheap at any table size, accurate enough for a pager
+    if query.whereclause is None:
+        result = await db.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'users'")
+        )
+        return result.scalar() or 0
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    # Sent as is: text() would read a ":word" in the search term as a bind parameter
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+# Paginated, searchable user directory (keyset on id DESC)
+@router.get("/users/directory", response_model=schemas.UserDirectoryPage)
+async def get_user_directory(
+    q: Optional[str] = None,
+    role: Optional[models.UserRole] = None,
+    status: Optional[models.UserStatus] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    admin: models.User = Depends(verify_admin)
+):
+    filtered = select(models.User.id)
+
+    if role:
+        filtered = filtered.where(models.User.role == role)
+    if status:
+        filtered = filtered.where(models.User.status == status)
+    if q and q.strip():
+        term = _like_escape(q.strip())
+        # Prefix match on email, substring match on name; both served by the trigram indexes
+        filtered = filtered.where(or_(
+            models.User.email.ilike(f"{term}%", escape="\\"),
+            models.User.name.ilike(f"%{term}%", escape="\\"),
+        ))
+
+    estimated_total = await _estimate_count(db, filtered)
+
+    page = filtered
+    if cursor is not None:
+        page = page.where(models.User.id < cursor)
+    page = page.order_by(models.User.id.desc()).limit(limit + 1)
+    ids = (await db.execute(page)).scalars().all()
+
+    next_cursor = None
+    if len(ids) > limit:
+        ids = ids[:limit]
+        next_cursor = ids[-1]
+
+    users = []
+    if ids:
+        result = await db.execute(
+            select(models.User)
+            .where(models.User.id.in_(ids))
+            .options(selectinload(models.User.company))
+            .order_by(models.User.id.desc())
+        )
+        users = result.scalars().all()
+
+    return {"items": users, "next_cursor": next_cursor, "estimated_total": estimated_total}
+
 # Create new user (admin or driver)
 @router.post("/users", response_model=schemas.UserResponse)
 async def create_user(
@@ -170,9 +326,14 @@ async def update_user(
         user.license_number = user_data['license_number']
     if 'status' in user_data:
         user.status = models.UserStatus(user_data['status'])
+        if user.status in (models.UserStatus.SUSPENDED, models.UserStatus.REJECTED):
+            await revoke_user_tokens(db, user.email)
     if 'password' in user_data:
         user.hashed_password = get_password_hash(user_data['password'])
+        # A password reset by an admin logs out every existing session
+        await revoke_user_tokens(db, user.email)
     
+    await invalidation.notify(db, invalidation.USERS, user.id)
     await db.commit()
     await db.refresh(user)
     return user
@@ -194,11 +355,15 @@ async def suspend_user(
     if permanent:
         # Permanently delete user
         await db.delete(user)
+        await invalidation.notify(db, invalidation.USERS, user_id)
+        await revoke_user_tokens(db, user.email)
         await db.commit()
         return {"message": "User permanently deleted"}
     else:
         # Suspend user
         user.status = models.UserStatus.SUSPENDED
+        await invalidation.notify(db, invalidation.USERS, user_id)
+        await revoke_user_tokens(db, user.email)
         await db.commit()
         return {"message": "User suspended"}
 
@@ -226,6 +391,8 @@ async def assign_vehicle_to_driver(
     
     # Assign vehicle to driver
     vehicle.driver_id = driver.id
+    await invalidation.notify(db, invalidation.VEHICLES, vehicle.id)
+    await invalidation.notify(db, invalidation.USERS, driver.id)
     await db.commit()
     
     return {"message": f"Vehicle {vehicle.vehicle_number} assigned to {driver.name}"}
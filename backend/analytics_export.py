@@ -0,0 +1,322 @@
+"""Incremental Parquet export of orders, trips, vehicles and order events.
+
+    python analytics_export.py [export_dir]
+
+Writes Hive-style partitions that DuckDB, pandas or Spark read directly:
+
+    <export_dir>/orders/day=2025-03-14/part-20250314T020000.parquet
+    <export_dir>/trips/day=.../part-....parquet
+    <export_dir>/order_events/day=.../part-....parquet
+    <export_dir>/vehicles/day=<run day>/part-....parquet   (full snapshot)
+
+Each run only reads rows past the watermarks in <export_dir>/_watermarks.json.
+Orders have no updated_at, so an order changed since the last run (archiving
+included) is found through its order_events rows and written again; trips
+not yet completed are written again every run. Every file carries an
+exported_at column and readers keep the latest row per id (analytics_query.py
+does this for you). Run it from cron or a scheduler as often as you like.
+"""
+import asyncio
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Order, OrderEvent, Trip, Vehicle
+import zones
+
+EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", "exports")
+EXPORT_BATCH_SIZE = int(os.getenv("ANALYTICS_EXPORT_BATCH_SIZE", 5000))
+# Rows buffered per table before part files are written
+EXPORT_FLUSH_ROWS = int(os.getenv("ANALYTICS_EXPORT_FLUSH_ROWS", 100000))
+# Rows newer than this are left for the next run, so a transaction that took
+# its id early but committed late is not skipped by the id watermark
+EXPORT_LAG_SECONDS = int(os.getenv("ANALYTICS_EXPORT_LAG_SECONDS", 60))
+
+WATERMARK_FILE = "_watermarks.json"
+UNKNOWN_DAY = "unknown"
+# Trips in any other status can still change and are exported again every run
+FINAL_TRIP_STATUSES = {"COMPLETED"}
+
+# Low-cardinality columns are dictionary-encoded: each value is stored once
+# per row group and rows hold small integer codes
+LABEL = pa.dictionary(pa.int8(), pa.string())  # statuses, event types
+ZONE_ID = pa.dictionary(pa.int32(), pa.int32())
+
+ORDER_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.int64()),
+    ("status", LABEL),
+    ("weight_kg", pa.float64()),
+    ("volume_m3", pa.float64()),
+    ("pickup_latitude", pa.float64()),
+    ("pickup_longitude", pa.float64()),
+    ("pickup_zone_id", ZONE_ID),
+    ("assigned_vehicle_id", pa.int64()),
+    ("trip_id", pa.int64()),
+    ("created_at", pa.timestamp("us")),
+    ("delivered_at", pa.timestamp("us")),
+    ("archived", pa.bool_()),
+    ("exported_at", pa.timestamp("us")),
+])
+
+TRIP_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("vehicle_id", pa.int64()),
+    ("source", pa.string()),
+    ("destination", pa.string()),
+    ("start_time", pa.string()),
+    ("status", LABEL),
+    ("exported_at", pa.timestamp("us")),
+])
+
+VEHICLE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("vehicle_number", pa.string()),
+    ("zone_id", ZONE_ID),
+    ("max_weight_kg", pa.float64()),
+    ("max_volume_m3", pa.float64()),
+    ("driver_id", pa.int64()),
+    ("exported_at", pa.timestamp("us")),
+])
+
+EVENT_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("order_id", pa.int64()),
+    ("event_type", LABEL),
+    ("from_status", LABEL),
+    ("to_status", LABEL),
+    ("vehicle_id", pa.int64()),
+    ("actor_id", pa.int64()),
+    ("created_at", pa.timestamp("us")),
+    ("exported_at", pa.timestamp("us")),
+])
+
+
+def _value(v):
+    return v.value if hasattr(v, "value") else v
+
+
+def _day(value) -> str:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    try:
+        return datetime.fromisoformat(str(value)[:10]).date().isoformat()
+    except (TypeError, ValueError):
+        return UNKNOWN_DAY
+
+
+def _pickup(location):
+    try:
+        lat, lon = map(float, location.split(","))
+        return lat, lon
+    except Exception:
+        return None, None
+
+
+class PartitionWriter:
+    """Buffers rows per day partition and writes them out every
+    EXPORT_FLUSH_ROWS rows (and at close), so a run over a large database
+    holds one flush worth of rows in memory, not every row it exports."""
+
+    def __init__(self, root: str, table: str, schema: pa.Schema, run: str, flush_rows: int = EXPORT_FLUSH_ROWS):
+        self.root = os.path.join(root, table)
+        self.schema = schema
+        self.run = run
+        self.flush_rows = flush_rows
+        self.rows = defaultdict(list)
+        self.buffered = 0
+        self.parts = 0
+        self.written = 0
+
+    def add(self, day: str, row: dict):
+        self.rows[day].append(row)
+        self.buffered += 1
+        if self.buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        suffix = f"-{self.parts:04d}" if self.parts else ""
+        for day, rows in sorted(self.rows.items()):
+            directory = os.path.join(self.root, f"day={day}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run}{suffix}.parquet")
+            table = pa.Table.from_pylist(rows, schema=self.schema)
+            # Write beside the target and rename, so readers never see half a file
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+            self.written += len(rows)
+        self.rows.clear()
+        self.buffered = 0
+        self.parts += 1
+
+    def close(self) -> int:
+        if self.buffered:
+            self.flush()
+        return self.written
+
+
+def load_watermarks(root: str) -> dict:
+    try:
+        with open(os.path.join(root, WATERMARK_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_watermarks(root: str, watermarks: dict):
+    path = os.path.join(root, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+async def _keyset(db, query, id_column, after_id: int):
+    """Yield batches of rows with id > after_id in id order."""
+    while True:
+        result = await db.execute(query.where(id_column > after_id).order_by(id_column).limit(EXPORT_BATCH_SIZE))
+        rows = result.scalars().all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+def _order_row(o: Order, index: zones.ZoneIndex, exported_at: datetime) -> dict:
+    lat, lon = _pickup(o.pickup_location)
+    return {
+        "id": o.id,
+        "user_id": o.user_id,
+        "status": _value(o.status),
+        "weight_kg": o.weight_kg,
+        "volume_m3": o.volume_m3,
+        "pickup_latitude": lat,
+        "pickup_longitude": lon,
+        "pickup_zone_id": index.lookup(lat, lon) if lat is not None else None,
+        "assigned_vehicle_id": o.assigned_vehicle_id,
+        "trip_id": o.trip_id,
+        "created_at": o.created_at,
+        "delivered_at": o.delivered_at,
+        "archived": o.archived,
+        "exported_at": exported_at,
+    }
+
+
+async def export(root: str = EXPORT_DIR) -> dict:
+    """Run one incremental export into root and return rows written per table."""
+    os.makedirs(root, exist_ok=True)
+    watermarks = load_watermarks(root)
+    now = datetime.utcnow()
+    run = now.strftime("%Y%m%dT%H%M%S")
+    cutoff = now - timedelta(seconds=EXPORT_LAG_SECONDS)
+    written = {}
+
+    async with AsyncSessionLocal() as db:
+        index = await zones.get_zone_index(db)
+
+        # Order events first: they tell us which existing orders changed
+        events = PartitionWriter(root, "order_events", EVENT_SCHEMA, run)
+        event_mark = watermarks.get("order_events", 0)
+        changed = set()
+        query = select(OrderEvent).where(OrderEvent.created_at < cutoff)
+        async for batch in _keyset(db, query, OrderEvent.id, event_mark):
+            for e in batch:
+                changed.add(e.order_id)
+                events.add(_day(e.created_at), {
+                    "id": e.id,
+                    "order_id": e.order_id,
+                    "event_type": e.event_type,
+                    "from_status": _value(e.from_status),
+                    "to_status": _value(e.to_status),
+                    "vehicle_id": e.vehicle_id,
+                    "actor_id": e.actor_id,
+                    "created_at": e.created_at,
+                    "exported_at": now,
+                })
+            event_mark = batch[-1].id
+
+        orders = PartitionWriter(root, "orders", ORDER_SCHEMA, run)
+        order_mark = watermarks.get("orders", 0)
+        # Orders may lack created_at (legacy rows); those are exported at once
+        query = select(Order).where((Order.created_at < cutoff) | Order.created_at.is_(None))
+        async for batch in _keyset(db, query, Order.id, order_mark):
+            for o in batch:
+                changed.discard(o.id)
+                orders.add(_day(o.created_at), _order_row(o, index, now))
+            order_mark = batch[-1].id
+        # Older orders that changed since the last run, re-exported with their current state
+        changed = sorted(i for i in changed if i <= order_mark)
+        for start in range(0, len(changed), EXPORT_BATCH_SIZE):
+            result = await db.execute(select(Order).where(Order.id.in_(changed[start:start + EXPORT_BATCH_SIZE])))
+            for o in result.scalars().all():
+                orders.add(_day(o.created_at), _order_row(o, index, now))
+
+        trips = PartitionWriter(root, "trips", TRIP_SCHEMA, run)
+        # Exports made before open trips were tracked: write every trip once more
+        trip_mark = watermarks.get("trips", 0) if "open_trips" in watermarks else 0
+        open_trips = []
+
+        def add_trip(t: Trip):
+            if t.status not in FINAL_TRIP_STATUSES:
+                open_trips.append(t.id)
+            trips.add(_day(t.start_time), {
+                "id": t.id,
+                "vehicle_id": t.vehicle_id,
+                "source": t.source,
+                "destination": t.destination,
+                "start_time": t.start_time,
+                "status": t.status,
+                "exported_at": now,
+            })
+
+        # Trips change status after creation and have no updated_at: those
+        # not yet completed at the last run are exported again as they are now
+        previous = watermarks.get("open_trips", [])
+        for start in range(0, len(previous), EXPORT_BATCH_SIZE):
+            result = await db.execute(select(Trip).where(Trip.id.in_(previous[start:start + EXPORT_BATCH_SIZE])))
+            for t in result.scalars().all():
+                add_trip(t)
+        async for batch in _keyset(db, select(Trip), Trip.id, trip_mark):
+            for t in batch:
+                add_trip(t)
+            trip_mark = batch[-1].id
+
+        # Vehicles are few and mutable: snapshot them all every run
+        vehicles = PartitionWriter(root, "vehicles", VEHICLE_SCHEMA, run)
+        async for batch in _keyset(db, select(Vehicle), Vehicle.id, 0):
+            for v in batch:
+                vehicles.add(now.date().isoformat(), {
+                    "id": v.id,
+                    "vehicle_number": v.vehicle_number,
+                    "zone_id": v.zone_id,
+                    "max_weight_kg": v.max_weight_kg,
+                    "max_volume_m3": v.max_volume_m3,
+                    "driver_id": v.driver_id,
+                    "exported_at": now,
+                })
+
+    for name, writer in (("order_events", events), ("orders", orders), ("trips", trips), ("vehicles", vehicles)):
+        written[name] = writer.close()
+
+    # Only advance the watermarks once every file is in place; a failed run
+    # is simply repeated, and readers drop the duplicate rows by id
+    save_watermarks(root, {
+        "order_events": event_mark,
+        "orders": order_mark,
+        "trips": trip_mark,
+        "open_trips": sorted(open_trips),
+        "exported_at": now.isoformat(),
+    })
+    return written
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else EXPORT_DIR
+    counts = asyncio.run(export(root))
+    print(f"Exported to {root}: " + ", ".join(f"{n} {name}" for name, n in counts.items()))
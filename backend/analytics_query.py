@@ -0,0 +1,108 @@
+"""Query the Parquet files written by analytics_export.py.
+
+    python analytics_query.py orders_by_status
+    python analytics_query.py "SELECT status, count(*) FROM orders GROUP BY 1" [export_dir]
+
+The first argument is either a built-in report (see REPORTS) or SQL over
+the views orders, trips, vehicles and order_events, which hold the latest
+exported row per id. SQL needs DuckDB (pip install duckdb); the built-in
+reports fall back to pandas when DuckDB is not installed.
+"""
+import os
+import sys
+
+EXPORT_DIR = os.getenv("ANALYTICS_EXPORT_DIR", "exports")
+
+TABLES = ("orders", "trips", "vehicles", "order_events")
+
+REPORTS = {
+    "orders_by_status": """
+        SELECT status, count(*) AS orders, round(sum(weight_kg), 2) AS weight_kg
+        FROM orders GROUP BY status ORDER BY orders DESC
+    """,
+    "orders_by_day": """
+        SELECT CAST(created_at AS DATE) AS day, count(*) AS orders, round(sum(weight_kg), 2) AS weight_kg
+        FROM orders GROUP BY day ORDER BY day
+    """,
+    "orders_by_zone": """
+        SELECT pickup_zone_id, count(*) AS orders, round(sum(weight_kg), 2) AS weight_kg,
+               round(sum(volume_m3), 3) AS volume_m3
+        FROM orders GROUP BY pickup_zone_id ORDER BY orders DESC
+    """,
+}
+
+
+def _files(root: str, table: str) -> str:
+    return os.path.join(root, table, "*", "*.parquet")
+
+
+def run_duckdb(duckdb, root: str, sql: str):
+    con = duckdb.connect()
+    for table in TABLES:
+        if not os.path.isdir(os.path.join(root, table)):
+            continue
+        # A row may have been exported more than once; keep its latest copy
+        con.execute(f"""
+            CREATE VIEW {table} AS
+            SELECT * FROM read_parquet('{_files(root, table)}', hive_partitioning = true)
+            QUALIFY row_number() OVER (PARTITION BY id ORDER BY exported_at DESC) = 1
+        """)
+    print(con.sql(sql))
+
+
+def _load(pd, root: str, table: str):
+    df = pd.read_parquet(os.path.join(root, table))
+    return df.sort_values("exported_at").drop_duplicates("id", keep="last")
+
+
+def run_pandas(pd, root: str, report: str):
+    orders = _load(pd, root, "orders")
+    if report == "orders_by_day":
+        orders["day"] = orders["created_at"].dt.date
+        key = "day"
+    elif report == "orders_by_zone":
+        key = "pickup_zone_id"
+    else:
+        key = "status"
+    grouped = orders.groupby(key, dropna=False, observed=True)
+    result = grouped.agg(orders=("id", "count"), weight_kg=("weight_kg", "sum"))
+    if report == "orders_by_zone":
+        result["volume_m3"] = grouped["volume_m3"].sum().round(3)
+    result["weight_kg"] = result["weight_kg"].round(2)
+    if report != "orders_by_day":
+        result = result.sort_values("orders", ascending=False)
+    print(result.to_string())
+
+
+def main(argv: list[str]):
+    if not argv:
+        print(__doc__)
+        print("Reports: " + ", ".join(REPORTS))
+        sys.exit(1)
+    query = argv[0]
+    root = argv[1] if len(argv) > 1 else EXPORT_DIR
+    if not os.path.isdir(root):
+        print(f"No export at {root}; run analytics_export.py first")
+        sys.exit(1)
+
+    try:
+        import duckdb
+    except ImportError:
+        duckdb = None
+    if duckdb is not None:
+        run_duckdb(duckdb, root, REPORTS.get(query, query))
+        return
+
+    if query not in REPORTS:
+        print("Ad-hoc SQL needs DuckDB: pip install duckdb")
+        sys.exit(1)
+    try:
+        import pandas as pd
+    except ImportError:
+        print("Install duckdb or pandas to query the export")
+        sys.exit(1)
+    run_pandas(pd, root, query)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,127 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, update, insert, func, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+
+import models
+from models import Order, OrderEvent, User
+from database import get_db, AsyncSessionLocal
+from auth import get_current_admin
+import jobs
+import invalidation
+
+router = APIRouter(prefix="/orders", tags=["Orders"])
+
+# Delivered orders older than this move from orders_hot to orders_cold
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 90))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", 1000))
+ORDER_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ORDER_ARCHIVE_INTERVAL_SECONDS", 3600))
+
+
+async def ensure_partitions(conn: AsyncConnection):
+    """Create the hot and cold partitions of orders.
+
+    Raises on a database whose orders table predates partitioning: every
+    query on Order.archived would fail there, so the API stays unready
+    (/readyz reports this error) and the worker refuses to start until
+    migrate_partition_orders.py has run.
+    """
+    partitioned = (await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'orders'::regclass"
+    ))).scalar()
+    if not partitioned:
+        raise RuntimeError("orders is not partitioned; run migrate_partition_orders.py")
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS orders_hot PARTITION OF orders FOR VALUES IN (false)"))
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS orders_cold PARTITION OF orders FOR VALUES IN (true)"))
+
+
+async def archive_delivered(db: AsyncSession, older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS, limit: int = ORDER_ARCHIVE_BATCH_SIZE) -> int:
+    """Move one batch of old delivered orders to the cold partition. Returns
+    how many moved; rows locked by a concurrent update are left for later."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    batch = (
+        select(Order.id)
+        .where(
+            Order.archived.is_(False),
+            Order.status == models.OrderStatus.DELIVERED,
+            # Orders delivered before delivered_at existed age from creation
+            func.coalesce(Order.delivered_at, Order.created_at, datetime(1970, 1, 1)) < cutoff,
+        )
+        .order_by(Order.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Order)
+        .where(Order.archived.is_(False), Order.id.in_(batch))
+        .values(archived=True)  # Postgres moves the row to orders_cold
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )
+    archived_ids = result.scalars().all()
+    if archived_ids:
+        # History rows, so the timeline and the analytics export see the change
+        now = datetime.utcnow()
+        await db.execute(insert(OrderEvent), [
+            {
+                "created_at": now, "order_id": order_id, "event_type": "ARCHIVED",
+                "from_status": models.OrderStatus.DELIVERED, "to_status": models.OrderStatus.DELIVERED,
+            }
+            for order_id in archived_ids
+        ])
+        await invalidation.notify(db, invalidation.ORDERS)
+    await db.commit()
+    return len(archived_ids)
+
+
+async def archive_all(db: AsyncSession, older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS) -> int:
+    """Archive in short batches so live order updates never wait long on locks."""
+    total = 0
+    while True:
+        moved = await archive_delivered(db, older_than_days)
+        total += moved
+        if moved < ORDER_ARCHIVE_BATCH_SIZE:
+            return total
+
+
+async def run_archiver(stop: asyncio.Event, interval_seconds: int = ORDER_ARCHIVE_INTERVAL_SECONDS):
+    """Archive every interval_seconds until stop is set."""
+    print(f"Archiver started (after={ORDER_ARCHIVE_AFTER_DAYS}d, interval={interval_seconds}s)")
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                moved = await archive_all(db)
+                if moved:
+                    print(f"Archiver: moved {moved} delivered orders to orders_cold")
+        except Exception as e:
+            print(f"Archiver error: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+@jobs.job_handler("archive_delivered_orders", concurrency=1)
+async def archive_delivered_job(db: AsyncSession, payload: dict):
+    days = int(payload.get("older_than_days", ORDER_ARCHIVE_AFTER_DAYS))
+    return {"archived": await archive_all(db, days)}
+
+
+# Endpoints
+
+@router.post("/archive")
+async def trigger_archive(
+    older_than_days: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """Run an archival pass now on the job worker."""
+    payload = {"older_than_days": older_than_days if older_than_days is not None else ORDER_ARCHIVE_AFTER_DAYS}
+    job = await jobs.enqueue(db, "archive_delivered_orders", payload, created_by=admin.id, max_attempts=1)
+    await db.commit()
+    return {"job_id": job.id}
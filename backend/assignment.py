@@ -0,0 +1,305 @@
+import asyncio
+import os
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from models import Order, Vehicle
+from database import AsyncSessionLocal
+from jobs import job_handler
+import zones
+import stats
+import fleet
+import order_events
+import invalidation
+
+# "inline": assign inside POST /orders (default)
+# "batch":  POST /orders only inserts PENDING; run_assigner() assigns in micro-batches
+ASSIGNMENT_MODE = os.getenv("ASSIGNMENT_MODE", "inline")
+ASSIGNER_INTERVAL_MS = int(os.getenv("ASSIGNER_INTERVAL_MS", 200))
+ASSIGNER_BATCH_SIZE = int(os.getenv("ASSIGNER_BATCH_SIZE", 500))
+# Rescan from the start periodically: order ids can commit out of sequence
+ASSIGNER_SWEEP_SECONDS = int(os.getenv("ASSIGNER_SWEEP_SECONDS", 30))
+
+# Orders in these states still occupy space on their vehicle
+ACTIVE_ORDER_STATUSES = (models.OrderStatus.ASSIGNED, models.OrderStatus.SHIPPED)
+
+# Retries when every capable vehicle is locked by a concurrent assignment
+ASSIGN_LOCK_RETRIES = int(os.getenv("ASSIGN_LOCK_RETRIES", 5))
+ASSIGN_RETRY_BACKOFF_MS = int(os.getenv("ASSIGN_RETRY_BACKOFF_MS", 20))
+
+
+async def lock_vehicle(db: AsyncSession, vehicle_id: int, skip_locked: bool = False) -> Optional[Vehicle]:
+    """SELECT ... FOR UPDATE on one vehicle row. With skip_locked, returns None
+    instead of waiting when another transaction holds it."""
+    result = await db.execute(
+        select(Vehicle)
+        .where(Vehicle.id == vehicle_id)
+        .with_for_update(skip_locked=skip_locked)
+    )
+    return result.scalars().first()
+
+
+async def vehicle_load(db: AsyncSession, vehicle_id: int, exclude_order_id: Optional[int] = None) -> tuple[float, float]:
+    """Current (weight_kg, volume_m3) carried by one vehicle."""
+    stmt = (
+        select(func.coalesce(func.sum(Order.weight_kg), 0.0), func.coalesce(func.sum(Order.volume_m3), 0.0))
+        .where(Order.assigned_vehicle_id == vehicle_id, Order.status.in_(ACTIVE_ORDER_STATUSES), Order.archived.is_(False))
+    )
+    if exclude_order_id is not None:
+        stmt = stmt.where(Order.id != exclude_order_id)
+    weight, volume = (await db.execute(stmt)).one()
+    return float(weight), float(volume)
+
+
+async def vehicle_loads(db: AsyncSession, vehicle_ids: list[int]) -> dict[int, tuple[float, float]]:
+    """Current (weight_kg, volume_m3) carried by each vehicle."""
+    if not vehicle_ids:
+        return {}
+    result = await db.execute(
+        select(Order.assigned_vehicle_id, func.sum(Order.weight_kg), func.sum(Order.volume_m3))
+        .where(Order.assigned_vehicle_id.in_(vehicle_ids), Order.status.in_(ACTIVE_ORDER_STATUSES), Order.archived.is_(False))
+        .group_by(Order.assigned_vehicle_id)
+    )
+    return {vid: (w or 0.0, v or 0.0) for vid, w, v in result.all()}
+
+
+def vehicle_has_room(vehicle: Vehicle, load: tuple[float, float], weight_kg: float, volume_m3: float) -> bool:
+    used_weight, used_volume = load
+    return (
+        vehicle.max_weight_kg - used_weight >= weight_kg
+        and vehicle.max_volume_m3 - used_volume >= volume_m3
+    )
+
+
+async def match_zone_id(db: AsyncSession, lat: float, lon: float) -> Optional[int]:
+    """Return the id of the zone the point belongs to, if any."""
+    return (await zones.get_zone_index(db)).lookup(lat, lon)
+
+
+async def find_vehicle_id(db: AsyncSession, zone_id: int, weight_kg: float, volume_m3: float) -> Optional[int]:
+    """Reserve the first vehicle in the zone with enough remaining capacity.
+
+    Each candidate is locked with FOR UPDATE SKIP LOCKED before its load is
+    read, and the lock is held until the caller commits, so two concurrent
+    orders can never both squeeze onto the last free space. Vehicles locked by
+    another assignment are skipped; if nothing else fits we back off and retry
+    just those.
+    """
+    result = await db.execute(
+        select(Vehicle.id)
+        .where(
+            Vehicle.zone_id == zone_id,
+            Vehicle.max_weight_kg >= weight_kg,
+            Vehicle.max_volume_m3 >= volume_m3,
+        )
+        .order_by(Vehicle.id)
+    )
+    return await reserve_first_fit(db, result.scalars().all(), weight_kg, volume_m3)
+
+
+async def find_nearest_vehicle_id(db: AsyncSession, lat: float, lon: float, weight_kg: float, volume_m3: float) -> Optional[int]:
+    """Reserve the closest vehicle with room within NEAREST_VEHICLE_RADIUS_KM, in any zone."""
+    locator = await fleet.get_locator(db)
+    candidates = [vid for vid, _ in locator.nearest(lat, lon, weight_kg, volume_m3)]
+    return await reserve_first_fit(db, candidates, weight_kg, volume_m3)
+
+
+async def reserve_first_fit(db: AsyncSession, candidates: list[int], weight_kg: float, volume_m3: float) -> Optional[int]:
+    """Lock and return the first candidate (in the given order) with enough room."""
+    for attempt in range(ASSIGN_LOCK_RETRIES):
+        contended = []
+        for vid in candidates:
+            vehicle = await lock_vehicle(db, vid, skip_locked=True)
+            if vehicle is None:
+                contended.append(vid)
+                continue
+            if vehicle_has_room(vehicle, await vehicle_load(db, vid), weight_kg, volume_m3):
+                return vid
+        if not contended:
+            return None
+        candidates = contended
+        await asyncio.sleep(ASSIGN_RETRY_BACKOFF_MS / 1000 * (attempt + 1))
+    return None
+
+
+async def auto_assign(db: AsyncSession, lat: float, lon: float, weight_kg: float, volume_m3: float) -> Optional[int]:
+    """Zone lookup + first-fit vehicle, trying overlapping and then adjacent
+    zones when the pickup zone has no room, and finally the nearest capable
+    vehicle in any zone. Returns the vehicle id or None."""
+    index = await zones.get_zone_index(db)
+    zone_id = index.lookup(lat, lon)
+    if zone_id:
+        for candidate_zone_id in index.candidate_zones(zone_id):
+            vehicle_id = await find_vehicle_id(db, candidate_zone_id, weight_kg, volume_m3)
+            if vehicle_id:
+                return vehicle_id
+    return await find_nearest_vehicle_id(db, lat, lon, weight_kg, volume_m3)
+
+
+@job_handler("auto_assign_order", concurrency=4)
+async def auto_assign_order_job(db: AsyncSession, payload: dict):
+    result = await db.execute(select(Order).where(Order.id == payload["order_id"]).with_for_update())
+    order = result.scalars().first()
+    if not order:
+        return {"order_id": payload["order_id"], "assigned_vehicle_id": None, "detail": "Order not found"}
+    # Someone (an admin, or another job) got there first
+    if order.status != models.OrderStatus.PENDING or order.assigned_vehicle_id:
+        return {"order_id": order.id, "assigned_vehicle_id": order.assigned_vehicle_id}
+
+    lat, lon = map(float, order.pickup_location.split(','))
+    vehicle_id = await auto_assign(db, lat, lon, order.weight_kg, order.volume_m3)
+    if vehicle_id:
+        before = stats.snapshot(order)
+        order.assigned_vehicle_id = vehicle_id
+        order.status = models.OrderStatus.ASSIGNED
+        stats.record_change(db, order, before)
+        order_events.record(db, order, before)
+        await invalidation.notify(db, invalidation.ORDERS)
+        await db.commit()
+    return {"order_id": order.id, "assigned_vehicle_id": vehicle_id}
+
+
+# Micro-batch assigner
+
+async def assign_pending_batch(db: AsyncSession, after_id: int = 0, limit: int = ASSIGNER_BATCH_SIZE) -> tuple[int, int, int]:
+    """Assign one batch of PENDING orders with id > after_id.
+
+    Orders and the candidate vehicles are row-locked for the transaction, so
+    concurrent assigners (or admins) cannot push a vehicle over capacity.
+    Returns (highest order id seen, orders seen, orders assigned).
+    """
+    result = await db.execute(
+        select(Order)
+        .where(
+            Order.id > after_id,
+            Order.status == models.OrderStatus.PENDING,
+            Order.archived.is_(False),
+            Order.assigned_vehicle_id.is_(None),
+            Order.trip_id.is_(None),
+        )
+        .order_by(Order.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    orders = result.scalars().all()
+    if not orders:
+        await db.rollback()
+        return after_id, 0, 0
+
+    index = await zones.get_zone_index(db)
+    by_zone = defaultdict(list)
+    positions = {}
+    for o in orders:
+        try:
+            lat, lon = map(float, o.pickup_location.split(','))
+        except Exception:
+            continue
+        positions[o.id] = (lat, lon)
+        zone_id = index.lookup(lat, lon)
+        by_zone[zone_id].append(o)  # None: outside every zone, nearest-vehicle only
+
+    assigned = 0
+    remaining = {}
+
+    def place(o, vehicle_ids) -> bool:
+        for vid in vehicle_ids:
+            cap = remaining.get(vid)
+            if cap and cap[0] >= o.weight_kg and cap[1] >= o.volume_m3:
+                cap[0] -= o.weight_kg
+                cap[1] -= o.volume_m3
+                before = stats.snapshot(o)
+                o.assigned_vehicle_id = vid
+                o.status = models.OrderStatus.ASSIGNED
+                stats.record_change(db, o, before)
+                order_events.record(db, o, before)
+                return True
+        return False
+
+    unplaced = list(by_zone.pop(None, []))
+    if by_zone:
+        candidate_zones = {zone_id: index.candidate_zones(zone_id) for zone_id in by_zone}
+        # Lock in id order so concurrent assigners never deadlock
+        v_result = await db.execute(
+            select(Vehicle)
+            .where(Vehicle.zone_id.in_({z for zs in candidate_zones.values() for z in zs}))
+            .order_by(Vehicle.id)
+            .with_for_update()
+        )
+        vehicles = v_result.scalars().all()
+        loads = await vehicle_loads(db, [v.id for v in vehicles])
+
+        zone_vehicles = defaultdict(list)
+        for v in vehicles:
+            used_w, used_v = loads.get(v.id, (0.0, 0.0))
+            remaining[v.id] = [v.max_weight_kg - used_w, v.max_volume_m3 - used_v]
+            zone_vehicles[v.zone_id].append(v.id)
+
+        for zone_id, zone_orders in by_zone.items():
+            vehicle_ids = [vid for z in candidate_zones[zone_id] for vid in zone_vehicles[z]]
+            for o in zone_orders:
+                if place(o, vehicle_ids):
+                    assigned += 1
+                else:
+                    unplaced.append(o)
+
+    if unplaced:
+        # Nearest capable vehicle in any zone. These vehicles are locked after
+        # the zone ones, so skip any another assigner holds instead of waiting.
+        locator = await fleet.get_locator(db)
+        nearest = {
+            o.id: [vid for vid, _ in locator.nearest(*positions[o.id], o.weight_kg, o.volume_m3)]
+            for o in unplaced
+        }
+        extra = sorted({vid for ids in nearest.values() for vid in ids} - remaining.keys())
+        if extra:
+            v_result = await db.execute(
+                select(Vehicle)
+                .where(Vehicle.id.in_(extra))
+                .order_by(Vehicle.id)
+                .with_for_update(skip_locked=True)
+            )
+            vehicles = v_result.scalars().all()
+            loads = await vehicle_loads(db, [v.id for v in vehicles])
+            for v in vehicles:
+                used_w, used_v = loads.get(v.id, (0.0, 0.0))
+                remaining[v.id] = [v.max_weight_kg - used_w, v.max_volume_m3 - used_v]
+        for o in unplaced:
+            if place(o, nearest[o.id]):
+                assigned += 1
+
+    if assigned:
+        await invalidation.notify(db, invalidation.ORDERS)
+    await db.commit()
+    return orders[-1].id, len(orders), assigned
+
+
+async def run_assigner(stop: Optional[asyncio.Event] = None, interval_ms: int = ASSIGNER_INTERVAL_MS):
+    """Poll for new PENDING orders every interval_ms and assign them in batches."""
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    last_id = 0
+    last_sweep = loop.time()
+    print(f"Assigner started (interval={interval_ms}ms, batch={ASSIGNER_BATCH_SIZE})")
+    while not stop.is_set():
+        if loop.time() - last_sweep >= ASSIGNER_SWEEP_SECONDS:
+            last_id = 0
+            last_sweep = loop.time()
+        seen = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                prev = last_id
+                last_id, seen, assigned = await assign_pending_batch(db, after_id=last_id)
+                if assigned:
+                    print(f"Assigner: {assigned}/{seen} orders assigned (ids {prev + 1}..{last_id})")
+        except Exception as e:
+            print(f"Assigner error: {e}")
+        if seen >= ASSIGNER_BATCH_SIZE:
+            continue  # Backlog: go again without sleeping
+        try:
+            await asyncio.wait_for(stop.wait(), interval_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
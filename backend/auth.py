@@ -1,6 +1,9 @@
 import os
+import secrets
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
@@ -11,12 +14,23 @@ from database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
 from sqlalchemy import select
+import invalidation
+
+try:
+    import jwt as pyjwt  # Optional: pip install PyJWT
+except ImportError:
+    pyjwt = None
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey") 
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# "jose" or "pyjwt"; both read and write the same tokens. Compare them with
+# bench_jwt.py: the cache below matters far more than either.
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+# Verified tokens remembered per process
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
 
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") # Removed passlib
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -37,15 +51,104 @@ def get_password_hash(password):
     hashed = bcrypt.hashpw(pwd_bytes, salt)
     return hashed.decode('utf-8')
 
+def _decode_jose(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def _decode_pyjwt(token: str) -> dict:
+    try:
+        return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except pyjwt.PyJWTError as e:
+        raise JWTError(str(e))
+
+if JWT_BACKEND == "pyjwt" and pyjwt is None:
+    print("JWT_BACKEND=pyjwt but PyJWT is not installed; using python-jose")
+    JWT_BACKEND = "jose"
+_decode = _decode_pyjwt if JWT_BACKEND == "pyjwt" else _decode_jose
+_encode = pyjwt.encode if JWT_BACKEND == "pyjwt" else jwt.encode
+
+DEFAULT_TOKEN_LIFETIME_SECONDS = 15 * 60
+# Longest lifetime issued by this process, for pruning the deny-list below
+_longest_lifetime = DEFAULT_TOKEN_LIFETIME_SECONDS
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+    global _longest_lifetime
+    now = time.time()
+    lifetime = int(expires_delta.total_seconds()) if expires_delta else DEFAULT_TOKEN_LIFETIME_SECONDS
+    _longest_lifetime = max(_longest_lifetime, lifetime)
+    # iat in milliseconds, so a user's tokens can be revoked up to an exact moment
+    to_encode = {**data, "exp": int(now) + lifetime, "iat": int(now * 1000) / 1000, "jti": secrets.token_urlsafe(8)}
+    return _encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# token -> verified claims, most recently used last. The signature is checked
+# once per token; every hit still checks expiry and the deny-list below.
+_verified = OrderedDict()
+
+# Deny-list, in memory and shared between processes through invalidation
+# notifications: revoked token ids until they expire, and per user a time
+# before which every issued token is void. A restart forgets it, which lets
+# tokens revoked before the restart work until they expire (15 minutes).
+_revoked_ids = {}  # jti -> exp
+_revoked_before = {}  # sub -> unix time
+
+def _is_revoked(claims: dict) -> bool:
+    if claims.get("jti") in _revoked_ids:
+        return True
+    cutoff = _revoked_before.get(claims.get("sub"))
+    return cutoff is not None and claims.get("iat", 0) < cutoff
+
+def decode_token(token: str) -> dict:
+    """Claims of a valid token (do not modify them). Raises JWTError if the
+    token is malformed, badly signed, expired or revoked."""
+    claims = _verified.get(token)
+    if claims is None:
+        claims = _decode(token)
+        _verified[token] = claims
+        if len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+        _verified.move_to_end(token)
+    exp = claims.get("exp")
+    if exp is not None and exp <= time.time():
+        _verified.pop(token, None)
+        raise JWTError("Signature has expired.")
+    if _is_revoked(claims):
+        raise JWTError("Token has been revoked.")
+    return claims
+
+def _deny(kind: str, moment: float, key: str):
+    now = time.time()
+    # Entries every affected token has outlived are dropped
+    for jti in [j for j, exp in _revoked_ids.items() if exp <= now]:
+        del _revoked_ids[jti]
+    for sub in [u for u, cutoff in _revoked_before.items() if cutoff + _longest_lifetime <= now]:
+        del _revoked_before[sub]
+    if kind == "jti":
+        if moment > now:
+            _revoked_ids[key] = moment
+    elif kind == "sub":
+        _revoked_before[key] = max(moment, _revoked_before.get(key, 0))
+
+@invalidation.on(invalidation.TOKENS)
+def _on_revocation(payload: str = ""):
+    # Empty payload: the listener reconnected. Revocations sent meanwhile are
+    # lost; nothing cached here can be refreshed from the database.
+    if payload:
+        kind, moment, key = payload.split(":", 2)
+        _deny(kind, float(moment), key)
+
+async def revoke_token(db: AsyncSession, claims: dict) -> None:
+    """Revoke one token (logout), in every process once db commits."""
+    if "jti" in claims:
+        _deny("jti", claims["exp"], claims["jti"])
+        await invalidation.notify(db, invalidation.TOKENS, f"jti:{claims['exp']}:{claims['jti']}")
+
+async def revoke_user_tokens(db: AsyncSession, email: str) -> None:
+    """Revoke every token issued so far to a user, in every process once db commits."""
+    # Same millisecond resolution as iat, so a token issued right after
+    # this (e.g. the user logging in again) is still accepted
+    now = int(time.time() * 1000) / 1000
+    _deny("sub", now, email)
+    await invalidation.notify(db, invalidation.TOKENS, f"sub:{now}:{email}")
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
@@ -54,7 +157,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
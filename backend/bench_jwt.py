@@ -0,0 +1,41 @@
+"""Compare the cost of checking a bearer token.
+
+    python bench_jwt.py --iterations 20000
+
+Times signature verification with python-jose and with PyJWT (if installed)
+against a hit in auth's verified-token cache, which is what a client
+reusing one token pays after its first request.
+"""
+import argparse
+import time
+
+import auth
+
+
+def per_call_us(fn, token: str, iterations: int) -> float:
+    fn(token)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(token)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = auth.create_access_token({"sub": "driver@example.com", "role": "DRIVER"})
+    candidates = [("python-jose decode", auth._decode_jose)]
+    if auth.pyjwt is not None:
+        candidates.append(("PyJWT decode", auth._decode_pyjwt))
+    else:
+        print("PyJWT not installed (pip install PyJWT); skipping it")
+    candidates.append((f"cached decode_token ({auth.JWT_BACKEND})", auth.decode_token))
+
+    for name, fn in candidates:
+        print(f"{name:32} {per_call_us(fn, token, args.iterations):8.2f} us/token")
+
+
+if __name__ == "__main__":
+    main()
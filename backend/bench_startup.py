@@ -0,0 +1,79 @@
+"""Measure cold start: process launch to the first answered request.
+
+    python bench_startup.py --runs 5
+
+Each run starts uvicorn on a spare port and polls GET /healthz until it
+answers, then stops the server. Also reports how long `import main` takes on
+its own, which is most of the total. The target is under 300ms.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+TARGET_MS = 300
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(app: str, path: str, timeout: float = 30) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    env = dict(os.environ, SQL_ECHO="false")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(url).status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.HTTPError:
+                    pass
+                if proc.poll() is not None:
+                    raise RuntimeError("server exited during startup")
+                time.sleep(0.005)
+        raise RuntimeError("server did not answer")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def import_time(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, env=dict(os.environ, SQL_ECHO="false"))
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--path", default="/healthz")
+    args = parser.parse_args()
+
+    module = args.app.split(":")[0]
+    baseline = statistics.median(import_time("fastapi") for _ in range(args.runs))
+    imports = statistics.median(import_time(module) for _ in range(args.runs))
+    first = [time_to_first_request(args.app, args.path) for _ in range(args.runs)]
+    median = statistics.median(first)
+    print(f"python + import fastapi:    {baseline:7.0f} ms (floor)")
+    print(f"python + import {module}: {imports:10.0f} ms")
+    print(f"launch to first {args.path}: {median:7.0f} ms median, {min(first):.0f} ms best over {args.runs} runs")
+    print(f"target {TARGET_MS} ms: {'met' if median <= TARGET_MS else 'missed'}")
+
+
+if __name__ == "__main__":
+    main()
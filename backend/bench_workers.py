@@ -0,0 +1,122 @@
+"""Measure API throughput as the number of worker processes grows.
+
+    python bench_workers.py --workers 1,2,4 --path "/zones/geometry?zoom=10"
+
+For each worker count this starts uvicorn on a spare port (SQL echo and
+rate limiting off), drives it from --clients load processes for --duration
+seconds, and prints requests per second and scaling efficiency against one
+worker. Load processes use CPU too, so on a small machine leave cores free
+for them or point --url at a server started elsewhere with serve.py.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _drive(url: str, concurrency: int, duration: float) -> tuple[int, int]:
+    ok = errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def loop():
+            nonlocal ok, errors
+            while time.perf_counter() < deadline:
+                try:
+                    r = await client.get(url)
+                    if r.status_code < 400:
+                        ok += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return ok, errors
+
+
+def _client(args) -> tuple[int, int]:
+    return asyncio.run(_drive(*args))
+
+
+def measure(url: str, clients: int, concurrency: int, duration: float) -> tuple[float, int]:
+    per_client = max(1, concurrency // clients)
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(_client, [(url, per_client, duration)] * clients)
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return ok / duration, errors
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run_server(app: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, SQL_ECHO="false", RATE_LIMIT_ENABLED="false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--workers", str(workers),
+         "--no-access-log", "--log-level", "warning"],
+        env=env,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    parser.add_argument("--path", default="/zones/geometry?zoom=10")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    args = parser.parse_args()
+
+    if args.url:
+        measure(args.url, args.clients, args.concurrency, args.warmup)
+        rps, errors = measure(args.url, args.clients, args.concurrency, args.duration)
+        print(f"{args.url}: {rps:.0f} req/s ({errors} errors)")
+        return
+
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'errors':>7}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}{args.path}"
+        proc = run_server(args.app, workers, port)
+        try:
+            _wait_ready(url, proc)
+            measure(url, args.clients, args.concurrency, args.warmup)
+            rps, errors = measure(url, args.clients, args.concurrency, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+        baseline = baseline or rps
+        speedup = rps / baseline if baseline else 0.0
+        print(f"{workers:>7} {rps:>10.0f} {speedup:>7.2f}x {speedup / workers:>9.0%} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""gzip / brotli response compression.
+
+Whole responses under COMPRESS_MIN_BYTES go out as they are. Streamed
+responses (more than one body chunk, e.g. /orders/export) are compressed
+chunk by chunk and flushed after each one, so the client receives rows as
+they are produced instead of after the whole export.
+"""
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Brotli quality 4 compresses better than gzip -6 at about the same speed
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/x-ndjson", b"application/javascript", b"application/xml")
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+def compress_whole(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_bytes: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    b"content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # Held until we know the body size
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                headers = [(k, v) for k, v in start.get("headers", []) if k not in (b"content-length", b"vary")]
+                headers.append((b"vary", b"Accept-Encoding"))
+                if not more:
+                    # Whole response in one message
+                    if len(body) < self.min_bytes:
+                        await send(start)
+                        await send(message)
+                        start = None
+                        return
+                    body = compress_whole(encoding, body)
+                    headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    return
+                compressor = _Brotli() if encoding == "br" else _Gzip()
+                headers.append((b"content-encoding", encoding.encode()))
+                await send({**start, "headers": headers})
+                start = None
+            if compressor is None:
+                await send(message)
+                return
+            chunk = compressor.compress(body) if body else b""
+            if not more:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
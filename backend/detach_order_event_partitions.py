@@ -0,0 +1,32 @@
+"""Detach monthly order_events partitions older than a given month.
+
+    python detach_order_event_partitions.py 2025-01
+
+detaches every partition before January 2025. Each becomes a standalone
+table (e.g. order_events_y2024m12) that can be dumped with
+`pg_dump -t order_events_y2024m12` and then dropped.
+"""
+import asyncio
+import sys
+from datetime import date
+
+from database import engine
+import order_events
+
+async def detach(month: date):
+    async with engine.begin() as conn:
+        try:
+            detached = await order_events.detach_partitions_before(conn, month)
+            if detached:
+                print(f"Detached {len(detached)} partitions: {', '.join(detached)}")
+            else:
+                print("No partitions to detach.")
+        except Exception as e:
+            print(f"Detach failed: {e}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    year, month = map(int, sys.argv[1].split("-"))
+    asyncio.run(detach(date(year, month, 1)))
@@ -0,0 +1,205 @@
+import csv
+import heapq
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Straight-line distance is scaled by this to approximate road distance
+ROAD_DETOUR_FACTOR = float(os.getenv("ROAD_DETOUR_FACTOR", 1.3))
+AVG_SPEED_KMPH = float(os.getenv("AVG_SPEED_KMPH", 35))
+HANDLING_MINUTES = float(os.getenv("HANDLING_MINUTES", 15))  # Pickup + drop time per order
+
+# Optional local road network: CSV of edges "from_lat,from_lon,to_lat,to_lon[,km]"
+ROAD_GRAPH_PATH = os.getenv(
+    "ROAD_GRAPH_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "road_graph.csv"),
+)
+ROAD_SNAP_MAX_KM = float(os.getenv("ROAD_SNAP_MAX_KM", 5))
+# A* gives up after settling this many nodes; the pair then falls back to
+# the straight-line estimate
+ROAD_SEARCH_MAX_NODES = int(os.getenv("ROAD_SEARCH_MAX_NODES", 20000))
+
+CACHE_CELL_DEG = 0.01  # ~1km
+DISTANCE_CACHE_SIZE = int(os.getenv("DISTANCE_CACHE_SIZE", 100000))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance, vectorized over any broadcastable arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_matrix_km(lats, lons) -> np.ndarray:
+    """All-pairs road-estimate distance matrix for n points (n x n)."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :]) * ROAD_DETOUR_FACTOR
+
+
+class RoadGraph:
+    """Undirected weighted graph of road segments with grid-based snapping."""
+
+    GRID_DEG = 0.05
+
+    def __init__(self):
+        self.lats = []
+        self.lons = []
+        self.adj = []
+        self._ids = {}
+        self._grid = {}
+
+    def _node(self, lat: float, lon: float) -> int:
+        key = (round(lat, 6), round(lon, 6))
+        if key not in self._ids:
+            self._ids[key] = len(self.lats)
+            self.lats.append(lat)
+            self.lons.append(lon)
+            self.adj.append([])
+            cell = (int(lat // self.GRID_DEG), int(lon // self.GRID_DEG))
+            self._grid.setdefault(cell, []).append(self._ids[key])
+        return self._ids[key]
+
+    @classmethod
+    def from_csv(cls, path: str) -> "RoadGraph":
+        graph = cls()
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                try:
+                    a_lat, a_lon, b_lat, b_lon = map(float, row[:4])
+                except ValueError:
+                    continue  # Header or bad row
+                km = float(row[4]) if len(row) > 4 and row[4] else float(haversine_km(a_lat, a_lon, b_lat, b_lon))
+                a, b = graph._node(a_lat, a_lon), graph._node(b_lat, b_lon)
+                graph.adj[a].append((b, km))
+                graph.adj[b].append((a, km))
+        return graph
+
+    def __len__(self):
+        return len(self.lats)
+
+    def nearest_node(self, lat: float, lon: float) -> Optional[int]:
+        cx, cy = int(lat // self.GRID_DEG), int(lon // self.GRID_DEG)
+        candidates = [
+            n for x in (cx - 1, cx, cx + 1) for y in (cy - 1, cy, cy + 1)
+            for n in self._grid.get((x, y), ())
+        ]
+        if not candidates:
+            return None
+        d = haversine_km(lat, lon, [self.lats[n] for n in candidates], [self.lons[n] for n in candidates])
+        i = int(np.argmin(d))
+        return candidates[i] if d[i] <= ROAD_SNAP_MAX_KM else None
+
+    def shortest_km(self, source: int, target: int, max_nodes: int = ROAD_SEARCH_MAX_NODES) -> Optional[float]:
+        """A* with the haversine distance as an admissible heuristic.
+
+        None if the nodes are not connected or the search settles more than
+        max_nodes nodes without reaching the target.
+        """
+        # Scalar haversine in plain floats: NumPy per call is far slower here
+        t_lat, t_lon = math.radians(self.lats[target]), math.radians(self.lons[target])
+        cos_t = math.cos(t_lat)
+        lats, lons = self.lats, self.lons
+
+        def heuristic(n: int) -> float:
+            lat, lon = math.radians(lats[n]), math.radians(lons[n])
+            a = math.sin((t_lat - lat) / 2) ** 2 + math.cos(lat) * cos_t * math.sin((t_lon - lon) / 2) ** 2
+            return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+        best = {source: 0.0}
+        heap = [(0.0, 0.0, source)]
+        settled = 0
+        while heap:
+            _, dist, node = heapq.heappop(heap)
+            if node == target:
+                return dist
+            if dist > best.get(node, math.inf):
+                continue
+            settled += 1
+            if settled > max_nodes:
+                return None
+            for nxt, km in self.adj[node]:
+                nd = dist + km
+                if nd < best.get(nxt, math.inf):
+                    best[nxt] = nd
+                    heapq.heappush(heap, (nd + heuristic(nxt), nd, nxt))
+        return None
+
+
+_graph: Optional[RoadGraph] = None
+_graph_loaded = False
+_graph_lock = threading.Lock()
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    global _graph, _graph_loaded
+    if not _graph_loaded:
+        with _graph_lock:
+            if not _graph_loaded:
+                if os.path.exists(ROAD_GRAPH_PATH):
+                    _graph = RoadGraph.from_csv(ROAD_GRAPH_PATH)
+                    print(f"Loaded road graph with {len(_graph)} nodes from {ROAD_GRAPH_PATH}")
+                _graph_loaded = True
+    return _graph
+
+
+# Road distances are cached per (origin cell, destination cell)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cell(lat: float, lon: float) -> tuple[int, int]:
+    return int(math.floor(lat / CACHE_CELL_DEG)), int(math.floor(lon / CACHE_CELL_DEG))
+
+
+def _road_km(o_lat: float, o_lon: float, d_lat: float, d_lon: float, graph: RoadGraph) -> Optional[float]:
+    key = (_cell(o_lat, o_lon), _cell(d_lat, d_lon))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    km = None
+    a, b = graph.nearest_node(o_lat, o_lon), graph.nearest_node(d_lat, d_lon)
+    if a is not None and b is not None:
+        km = graph.shortest_km(a, b)
+    with _cache_lock:
+        _cache[key] = km
+        if len(_cache) > DISTANCE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return km
+
+
+def batch_distance_km(o_lats, o_lons, d_lats, d_lons) -> np.ndarray:
+    """Road distance estimates for n origin/destination pairs.
+
+    Straight-line distances are computed for the whole batch in one NumPy
+    pass; if a road graph is loaded, pairs it can route are replaced by the
+    cached network distance. Uncached graph searches are CPU-bound, so
+    request handlers call this through asyncio.to_thread.
+    """
+    km = haversine_km(o_lats, o_lons, d_lats, d_lons) * ROAD_DETOUR_FACTOR
+    graph = get_road_graph()
+    if graph is not None:
+        for i, (a, b, c, d) in enumerate(zip(o_lats, o_lons, d_lats, d_lons)):
+            road = _road_km(a, b, c, d, graph)
+            if road is not None:
+                km[i] = road
+    return km
+
+
+def distance_km(o_lat: float, o_lon: float, d_lat: float, d_lon: float) -> float:
+    return float(batch_distance_km([o_lat], [o_lon], [d_lat], [d_lon])[0])
+
+
+def eta_minutes(km, handling: bool = True):
+    """Driving time at AVG_SPEED_KMPH, plus pickup/drop handling."""
+    minutes = np.asarray(km, dtype=np.float64) / AVG_SPEED_KMPH * 60.0
+    if handling:
+        minutes = minutes + HANDLING_MINUTES
+    return minutes
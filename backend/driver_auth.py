@@ -7,6 +7,8 @@ from schemas import UserCreate, Token, VehicleCreate
 from auth import get_password_hash, create_access_token, verify_password
 from datetime import timedelta
 import logging
+import invalidation
+import refresh_tokens
 
 router = APIRouter(prefix="/driver", tags=["Driver Auth"])
 
@@ -46,6 +48,7 @@ async def signup_driver(
         zone_id=vehicle_details.zone_id # Optional
     )
     db.add(new_vehicle)
+    await invalidation.notify(db, invalidation.VEHICLES)
     
     await db.commit()
     await db.refresh(new_driver)
@@ -65,4 +68,6 @@ async def login_driver(user_details: UserCreate, db: AsyncSession = Depends(get_
         raise HTTPException(status_code=403, detail="Not authorized as Driver")
 
     access_token = create_access_token(data={"sub": user.email, "role": "DRIVER"})
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await refresh_tokens.issue(db, user.id)
+    await db.commit()
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
@@ -0,0 +1,71 @@
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from models import User
+from auth import get_current_user
+import invalidation
+
+# Per-process table versions, bumped when a change notification arrives,
+# which Postgres only delivers after the change has committed. ETags are
+# therefore never newer than the data they label. A restarted (or another)
+# worker has a different epoch, so its ETags simply never match.
+_epoch = uuid.uuid4().hex[:8]
+_versions = defaultdict(int)
+
+
+def _bump(topic: str):
+    def handler(payload: str = ""):
+        _versions[topic] += 1
+    return handler
+
+
+for _topic in (invalidation.ORDERS, invalidation.VEHICLES, invalidation.ZONES):
+    invalidation.on(_topic)(_bump(_topic))
+
+
+def current_etag(topics: tuple, scope="") -> Optional[str]:
+    """Weak ETag for a response built from topics' tables, or None while the
+    listener is down and versions cannot be trusted. Read it before querying."""
+    if not invalidation.listening():
+        return None
+    parts = [_epoch, *(str(_versions[t]) for t in topics)]
+    if scope != "":
+        parts.append(f"u{scope}")
+    return 'W/"' + "-".join(parts) + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def check(request: Request, response: Response, etag: Optional[str]):
+    """Answer 304 if the client already has etag; otherwise attach it to the response."""
+    if etag is None:
+        return
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        # Starlette sends 304s without a body
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+
+def conditional(*topics: str):
+    """Dependency for public lists: 304 before the endpoint runs any query."""
+    async def dependency(request: Request, response: Response):
+        check(request, response, current_etag(topics))
+    return dependency
+
+
+def conditional_for_user(*topics: str):
+    """Same, for lists that differ per user; the ETag includes the user id so a
+    browser shared by two accounts never revalidates one's list as the other's."""
+    async def dependency(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+        check(request, response, current_etag(topics, current_user.id))
+    return dependency
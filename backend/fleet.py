@@ -0,0 +1,196 @@
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from models import User, Vehicle
+from database import get_db
+from auth import get_current_user
+import distance
+import zones
+import assignment
+import invalidation
+
+router = APIRouter(prefix="/vehicles", tags=["Fleet"])
+
+# Fallback search when the pickup zone (and its neighbours) has no room
+NEAREST_VEHICLE_RADIUS_KM = float(os.getenv("NEAREST_VEHICLE_RADIUS_KM", 25))
+NEAREST_VEHICLE_K = int(os.getenv("NEAREST_VEHICLE_K", 8))
+# Positions move constantly; the index is rebuilt at most this often
+VEHICLE_INDEX_TTL_SECONDS = float(os.getenv("VEHICLE_INDEX_TTL_SECONDS", 5))
+
+KM_PER_DEG_LAT = 111.0
+
+
+class VehicleLocator:
+    """Vehicle positions sorted by latitude.
+
+    A query bisects the latitude band that can lie within the radius and
+    ranks only that slice with one vectorized haversine, so it stays well
+    under a millisecond for thousands of vehicles.
+    """
+
+    def __init__(self, rows: list[tuple[int, float, float, float, float]]):
+        # rows: (vehicle id, lat, lon, max_weight_kg, max_volume_m3)
+        rows = sorted(rows, key=lambda r: r[1])
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.lats = np.array([r[1] for r in rows], dtype=np.float64)
+        self.lons = np.array([r[2] for r in rows], dtype=np.float64)
+        self.max_weight = np.array([r[3] for r in rows], dtype=np.float64)
+        self.max_volume = np.array([r[4] for r in rows], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        weight_kg: float = 0.0,
+        volume_m3: float = 0.0,
+        k: int = NEAREST_VEHICLE_K,
+        radius_km: float = NEAREST_VEHICLE_RADIUS_KM,
+    ) -> list[tuple[int, float]]:
+        """Up to k (vehicle id, km) pairs within radius_km whose total capacity
+        fits the order, closest first. Current load is not considered here."""
+        band = radius_km / KM_PER_DEG_LAT
+        lo = int(np.searchsorted(self.lats, lat - band, side="left"))
+        hi = int(np.searchsorted(self.lats, lat + band, side="right"))
+        if lo >= hi:
+            return []
+        fits = (self.max_weight[lo:hi] >= weight_kg) & (self.max_volume[lo:hi] >= volume_m3)
+        ids = self.ids[lo:hi][fits]
+        km = distance.haversine_km(lat, lon, self.lats[lo:hi][fits], self.lons[lo:hi][fits])
+        inside = km <= radius_km
+        ids, km = ids[inside], km[inside]
+        if len(ids) > k:
+            top = np.argpartition(km, k)[:k]
+            ids, km = ids[top], km[top]
+        order = np.argsort(km, kind="stable")
+        return [(int(ids[i]), float(km[i])) for i in order]
+
+
+_locator: Optional[tuple[float, VehicleLocator]] = None
+_generation = 0  # Bumped by invalidate()
+
+
+async def build_locator(db: AsyncSession) -> VehicleLocator:
+    """Vehicles at their last reported position, or their zone's centroid."""
+    index = await zones.get_zone_index(db)
+    result = await db.execute(
+        select(Vehicle.id, Vehicle.last_latitude, Vehicle.last_longitude, Vehicle.zone_id, Vehicle.max_weight_kg, Vehicle.max_volume_m3)
+    )
+    rows = []
+    for vid, lat, lon, zone_id, max_w, max_v in result.all():
+        if lat is None or lon is None:
+            if zone_id not in index.centroids:
+                continue  # Nowhere to place it
+            lat, lon = index.centroids[zone_id]
+        rows.append((vid, lat, lon, max_w, max_v))
+    return VehicleLocator(rows)
+
+
+@invalidation.on(invalidation.ZONES)
+@invalidation.on(invalidation.VEHICLES)
+def invalidate(payload: str = ""):
+    # Positions are refreshed by the TTL; new vehicles and zones right away
+    global _locator, _generation
+    _locator = None
+    _generation += 1
+
+
+async def get_locator(db: AsyncSession) -> VehicleLocator:
+    global _locator
+    now = time.monotonic()
+    current, generation = _locator, _generation
+    if current is None or now - current[0] >= VEHICLE_INDEX_TTL_SECONDS:
+        locator = await build_locator(db)
+        # Not cached if invalidated while building: it may predate the change
+        if generation == _generation:
+            _locator = (now, locator)
+        return locator
+    return current[1]
+
+
+# Schemas
+class PositionUpdate(BaseModel):
+    latitude: float
+    longitude: float
+
+
+class NearbyVehicle(BaseModel):
+    vehicle_id: int
+    distance_km: float
+    remaining_weight_kg: float
+    remaining_volume_m3: float
+
+
+# Endpoints
+
+@router.put("/{vehicle_id}/position")
+async def update_vehicle_position(
+    vehicle_id: int,
+    position: PositionUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not (-90 <= position.latitude <= 90 and -180 <= position.longitude <= 180):
+        raise HTTPException(status_code=400, detail="Coordinate out of range")
+    result = await db.execute(select(Vehicle).where(Vehicle.id == vehicle_id))
+    vehicle = result.scalars().first()
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    if current_user.role != models.UserRole.SUPER_ADMIN and vehicle.driver_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to update this vehicle")
+
+    vehicle.last_latitude = position.latitude
+    vehicle.last_longitude = position.longitude
+    vehicle.last_position_at = datetime.utcnow()
+    await db.commit()
+    return {"vehicle_id": vehicle.id, "updated_at": vehicle.last_position_at}
+
+
+@router.get("/nearest", response_model=List[NearbyVehicle])
+async def get_nearest_vehicles(
+    latitude: float,
+    longitude: float,
+    weight_kg: float = 0.0,
+    volume_m3: float = 0.0,
+    radius_km: float = Query(NEAREST_VEHICLE_RADIUS_KM, gt=0, le=500),
+    k: int = Query(NEAREST_VEHICLE_K, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Closest vehicles that can still take a shipment of this size."""
+    if current_user.role != models.UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can search vehicles")
+    locator = await get_locator(db)
+    # Over-fetch: some of the nearest may already be full
+    nearby = locator.nearest(latitude, longitude, weight_kg, volume_m3, k=k * 4, radius_km=radius_km)
+    loads = await assignment.vehicle_loads(db, [vid for vid, _ in nearby])
+    result = await db.execute(select(Vehicle).where(Vehicle.id.in_([vid for vid, _ in nearby])))
+    vehicles = {v.id: v for v in result.scalars().all()}
+
+    response = []
+    for vid, km in nearby:
+        v = vehicles.get(vid)
+        if v is None:
+            continue
+        used_w, used_v = loads.get(vid, (0.0, 0.0))
+        if v.max_weight_kg - used_w >= weight_kg and v.max_volume_m3 - used_v >= volume_m3:
+            response.append(NearbyVehicle(
+                vehicle_id=vid,
+                distance_km=round(km, 2),
+                remaining_weight_kg=round(v.max_weight_kg - used_w, 2),
+                remaining_volume_m3=round(v.max_volume_m3 - used_v, 3),
+            ))
+            if len(response) >= k:
+                break
+    return response
@@ -0,0 +1,296 @@
+import csv
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+router = APIRouter(prefix="/geo", tags=["Geocoding"])
+
+# Offline India pincode directory (data.gov.in "All India Pincode Directory"
+# CSV with officename, pincode, district, statename, latitude, longitude).
+PINCODE_DATASET = os.getenv(
+    "PINCODE_DATASET",
+    os.path.join(os.path.dirname(__file__), "data", "india_pincodes.csv"),
+)
+GEO_CACHE_SIZE = int(os.getenv("GEO_CACHE_SIZE", 4096))
+GRID_CELL_DEG = 0.1  # ~11km buckets for reverse lookups
+
+
+class PincodeIndex:
+    """Compact, read-only index over the pincode directory.
+
+    Pincodes are kept in a sorted int array with parallel float32 centroid
+    arrays; post offices are stored as interned string ids in flat arrays
+    addressed by per-pincode offsets. A 6-digit code, a place-name prefix or a
+    coordinate resolves with a bisect or a grid-bucket scan, no I/O.
+    """
+
+    def __init__(self):
+        self.pincodes = array('i')
+        self.lats = array('f')
+        self.lons = array('f')
+        self.office_start = array('i', [0])
+        self.office_name = array('i')
+        self.office_district = array('i')
+        self.office_state = array('i')
+        self.strings = []
+        # Sorted lower-cased place names with the pincode index they point to
+        self.name_keys = []
+        self.name_pins = array('i')
+        self.grid = {}
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "PincodeIndex":
+        offices = {}
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [h.strip().lower() for h in reader.fieldnames or []]
+            for row in reader:
+                try:
+                    pin = int(row["pincode"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                offices.setdefault(pin, []).append((
+                    _clean_office_name(row.get("officename", "")),
+                    (row.get("district") or row.get("districtname") or "").strip().title(),
+                    (row.get("statename") or row.get("state") or "").strip().title(),
+                    _parse_coord(row.get("latitude")),
+                    _parse_coord(row.get("longitude")),
+                ))
+        return cls.build(offices)
+
+    @classmethod
+    def build(cls, offices: dict) -> "PincodeIndex":
+        """offices: pincode -> list of (name, district, state, lat, lon)."""
+        index = cls()
+        interned = {}
+
+        def intern(s):
+            if s not in interned:
+                interned[s] = len(index.strings)
+                index.strings.append(s)
+            return interned[s]
+
+        names = []
+        for i, pin in enumerate(sorted(offices)):
+            rows = offices[pin]
+            index.pincodes.append(pin)
+            coords = [(lat, lon) for _, _, _, lat, lon in rows if lat is not None and lon is not None]
+            if coords:
+                lat = sum(c[0] for c in coords) / len(coords)
+                lon = sum(c[1] for c in coords) / len(coords)
+                index.grid.setdefault(_cell(lat, lon), []).append(i)
+            else:
+                lat = lon = math.nan
+            index.lats.append(lat)
+            index.lons.append(lon)
+            seen = set()
+            for name, district, state, _, _ in rows:
+                index.office_name.append(intern(name))
+                index.office_district.append(intern(district))
+                index.office_state.append(intern(state))
+                for key in (name.lower(), district.lower()):
+                    if key and (key, i) not in seen:
+                        seen.add((key, i))
+                        names.append((key, i))
+            index.office_start.append(len(index.office_name))
+
+        names.sort()
+        index.name_keys = [n for n, _ in names]
+        index.name_pins = array('i', (p for _, p in names))
+        return index
+
+    def _find(self, pin: int) -> Optional[int]:
+        i = bisect_left(self.pincodes, pin)
+        if i < len(self.pincodes) and self.pincodes[i] == pin:
+            return i
+        return None
+
+    def _record(self, i: int) -> dict:
+        s = self.strings
+        start, end = self.office_start[i], self.office_start[i + 1]
+        lat, lon = self.lats[i], self.lons[i]
+        offices = [
+            {
+                "name": s[self.office_name[j]],
+                "district": s[self.office_district[j]],
+                "state": s[self.office_state[j]],
+            }
+            for j in range(start, end)
+        ]
+        return {
+            "pincode": f"{self.pincodes[i]:06d}",
+            "city": offices[0]["district"] if offices else None,
+            "state": offices[0]["state"] if offices else None,
+            "latitude": None if math.isnan(lat) else round(lat, 6),
+            "longitude": None if math.isnan(lon) else round(lon, 6),
+            "offices": offices,
+        }
+
+    def lookup(self, pincode: str) -> Optional[dict]:
+        if not (pincode.isdigit() and len(pincode) == 6):
+            return None
+        i = self._find(int(pincode))
+        return self._record(i) if i is not None else None
+
+    def autocomplete(self, q: str, limit: int = 10) -> list[dict]:
+        q = q.strip().lower()
+        if not q:
+            return []
+        if q.isdigit():
+            if len(q) > 6:
+                return []
+            lo = bisect_left(self.pincodes, int(q.ljust(6, '0')))
+            hi = bisect_right(self.pincodes, int(q.ljust(6, '9')))
+            return [self._summary(i) for i in range(lo, min(hi, lo + limit))]
+
+        results, seen = [], set()
+        k = bisect_left(self.name_keys, q)
+        while k < len(self.name_keys) and self.name_keys[k].startswith(q) and len(results) < limit:
+            i = self.name_pins[k]
+            if i not in seen:
+                seen.add(i)
+                results.append(self._summary(i))
+            k += 1
+        return results
+
+    def place_centroid(self, name: str) -> Optional[tuple[float, float]]:
+        """Average centroid of pincodes whose district or office is exactly `name`."""
+        key = name.strip().lower()
+        k = bisect_left(self.name_keys, key)
+        lats, lons = [], []
+        while k < len(self.name_keys) and self.name_keys[k] == key:
+            i = self.name_pins[k]
+            if not math.isnan(self.lats[i]):
+                lats.append(self.lats[i])
+                lons.append(self.lons[i])
+            k += 1
+        if not lats:
+            return None
+        return sum(lats) / len(lats), sum(lons) / len(lons)
+
+    def _summary(self, i: int) -> dict:
+        record = self._record(i)
+        record["offices"] = [o["name"] for o in record["offices"]]
+        return record
+
+    def nearest(self, lat: float, lon: float, max_rings: int = 5) -> Optional[dict]:
+        """Closest pincode centroid, searching grid rings outwards."""
+        cx, cy = _cell(lat, lon)
+        cos_lat = math.cos(math.radians(lat))
+        best, best_d = None, math.inf
+        for r in range(max_rings + 1):
+            for x in range(cx - r, cx + r + 1):
+                for y in range(cy - r, cy + r + 1):
+                    if max(abs(x - cx), abs(y - cy)) != r:
+                        continue  # Only the ring's border; inner cells already done
+                    for i in self.grid.get((x, y), ()):
+                        d = (self.lats[i] - lat) ** 2 + ((self.lons[i] - lon) * cos_lat) ** 2
+                        if d < best_d:
+                            best, best_d = i, d
+            # Anything outside ring r is at least r cells away; longitude
+            # distances are scaled by cos_lat, so a cell counts for less
+            if best is not None and math.sqrt(best_d) <= r * GRID_CELL_DEG * min(1.0, cos_lat):
+                break
+        return self._record(best) if best is not None else None
+
+
+def _cell(lat: float, lon: float) -> tuple[int, int]:
+    return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lon / GRID_CELL_DEG))
+
+
+def _parse_coord(value) -> Optional[float]:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) and v != 0.0 else None
+
+
+def _clean_office_name(name: str) -> str:
+    # "Koramangala S.O" -> "Koramangala"
+    name = name.strip()
+    for suffix in (" B.O", " S.O", " H.O", " BO", " SO", " HO"):
+        if name.upper().endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    return name.strip().title()
+
+
+_index: Optional[PincodeIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> PincodeIndex:
+    """Load the dataset on first use; an empty index if the file is missing."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if os.path.exists(PINCODE_DATASET):
+                    _index = PincodeIndex.from_csv(PINCODE_DATASET)
+                    print(f"Loaded {len(_index)} pincodes from {PINCODE_DATASET}")
+                else:
+                    print(f"Pincode dataset not found at {PINCODE_DATASET}; geocoding disabled")
+                    _index = PincodeIndex()
+    return _index
+
+
+@lru_cache(maxsize=GEO_CACHE_SIZE)
+def lookup_pincode(pincode: str) -> Optional[dict]:
+    return get_index().lookup(pincode)
+
+
+@lru_cache(maxsize=GEO_CACHE_SIZE)
+def autocomplete(q: str, limit: int = 10) -> list[dict]:
+    return get_index().autocomplete(q, limit)
+
+
+@lru_cache(maxsize=GEO_CACHE_SIZE)
+def place_coordinates(name: str) -> Optional[tuple[float, float]]:
+    return get_index().place_centroid(name)
+
+
+@lru_cache(maxsize=GEO_CACHE_SIZE)
+def reverse(lat: float, lon: float) -> Optional[dict]:
+    return get_index().nearest(lat, lon)
+
+
+# Endpoints
+
+def _require_dataset():
+    if not len(get_index()):
+        raise HTTPException(status_code=503, detail="Pincode dataset not loaded")
+
+
+@router.get("/pincode/{pincode}")
+def get_pincode(pincode: str):
+    _require_dataset()
+    record = lookup_pincode(pincode)
+    if not record:
+        raise HTTPException(status_code=404, detail="Pincode not found")
+    return record
+
+
+@router.get("/autocomplete")
+def get_autocomplete(q: str, limit: int = Query(10, ge=1, le=50)):
+    _require_dataset()
+    return autocomplete(q.strip().lower(), limit)
+
+
+@router.get("/reverse")
+def get_reverse(lat: float, lon: float):
+    _require_dataset()
+    # Round so nearby clicks share cache entries (~100m)
+    record = reverse(round(lat, 3), round(lon, 3))
+    if not record:
+        raise HTTPException(status_code=404, detail="No pincode near this location")
+    return record
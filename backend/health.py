@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text, bindparam, ARRAY, String
+
+import models  # Registers every table on Base.metadata
+from database import get_engine, Base, AsyncSessionLocal
+import archive
+import order_events
+
+router = APIRouter(tags=["Health"])
+
+STARTUP_LOCK_ID = 7_301_046  # pg advisory lock around startup DDL
+STARTUP_RETRY_SECONDS = float(os.getenv("STARTUP_RETRY_SECONDS", 2))
+READYZ_TIMEOUT_SECONDS = float(os.getenv("READYZ_TIMEOUT_SECONDS", 2))
+# Build geometry and place indexes in the background once ready
+WARM_CACHES = os.getenv("WARM_CACHES", "true").lower() != "false"
+
+_started_at = time.monotonic()
+_ready_after: Optional[float] = None
+_error: Optional[str] = None
+
+
+def is_ready() -> bool:
+    return _ready_after is not None
+
+
+async def prepare_database():
+    """Create missing tables and this month's partitions.
+
+    Checking which tables exist is one query; create_all (one round trip per
+    table) only runs on a new or partially migrated database.
+    """
+    names = sorted(Base.metadata.tables)
+    async with get_engine().begin() as conn:
+        result = await conn.execute(
+            text("SELECT t FROM unnest(:names) AS t WHERE to_regclass(t) IS NULL")
+            .bindparams(bindparam("names", type_=ARRAY(String))),
+            {"names": names},
+        )
+        missing = result.scalars().all()
+        if missing:
+            # With several workers only one runs the DDL at a time
+            print(f"Creating missing tables: {', '.join(missing)}")
+            await conn.execute(text(f"SELECT pg_advisory_xact_lock({STARTUP_LOCK_ID})"))
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.create_all)
+        await order_events.ensure_partitions(conn)
+        await archive.ensure_partitions(conn)
+
+
+async def warm_caches():
+    """Load what the first orders and searches would otherwise wait for."""
+    import geocoding
+    import places
+    import zones
+    import fleet
+    await asyncio.to_thread(geocoding.get_index)
+    async with AsyncSessionLocal() as db:
+        await zones.get_zone_index(db)
+        await fleet.get_locator(db)
+        await places.get_index(db)
+
+
+async def start(stop: asyncio.Event):
+    """Prepare the database (retrying until it is reachable), then mark the
+    process ready and warm caches. Runs beside request handling, so the
+    process answers /healthz as soon as it is up."""
+    global _ready_after, _error
+    while not stop.is_set():
+        try:
+            await prepare_database()
+            break
+        except Exception as e:
+            _error = str(e)
+            print(f"Startup: database not ready: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), STARTUP_RETRY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    if stop.is_set():
+        return
+    _error = None
+    _ready_after = time.monotonic() - _started_at
+    print(f"Ready after {_ready_after:.2f}s")
+    if WARM_CACHES:
+        started = time.monotonic()
+        try:
+            await warm_caches()
+            print(f"Caches warmed in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            print(f"Cache warm-up failed (caches load on first use instead): {e}")
+
+
+# Endpoints
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is serving requests. Never touches the database."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness: the schema is in place and the database answers."""
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting", "error": _error})
+    try:
+        async with get_engine().connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), READYZ_TIMEOUT_SECONDS)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e)})
+    return {"status": "ready", "ready_after_seconds": round(_ready_after, 3)}
@@ -0,0 +1,288 @@
+import asyncio
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db, AsyncSessionLocal
+from models import DemandTile, Order, User
+from auth import get_current_admin
+import jobs
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+# Tiles are kept at every precision in this range, so any zoom level reads
+# pre-aggregated rows instead of rolling up finer cells.
+MIN_PRECISION = 2   # ~1250 x 625 km
+MAX_PRECISION = 7   # ~150 x 150 m
+HEATMAP_FLUSH_SECONDS = float(os.getenv("HEATMAP_FLUSH_SECONDS", 5))
+HEATMAP_MAX_DAYS = int(os.getenv("HEATMAP_MAX_DAYS", 366))
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode_geohash(lat: float, lon: float, precision: int = MAX_PRECISION) -> str:
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch, lon_lo = (ch << 1) | 1, mid
+            else:
+                ch, lon_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of a cell."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in geohash:
+        v = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """Map zoom level (0-20) to the geohash precision whose cells are a few pixels wide."""
+    for max_zoom, precision in ((3, 2), (5, 3), (8, 4), (11, 5), (14, 6)):
+        if zoom <= max_zoom:
+            return precision
+    return MAX_PRECISION
+
+
+def tile_keys(lat: float, lon: float, day: date) -> list[tuple[int, str, date]]:
+    finest = encode_geohash(lat, lon, MAX_PRECISION)
+    return [(p, finest[:p], day) for p in range(MIN_PRECISION, MAX_PRECISION + 1)]
+
+
+# Order creation only touches this in-memory buffer; the flusher merges it
+# into demand_tiles in one upsert, so concurrent orders never queue up on the
+# few coarse-tile rows.
+_pending = {}  # (precision, geohash, day) -> [orders, weight_kg, volume_m3]
+_pending_lock = threading.Lock()
+
+
+def record_order(lat: float, lon: float, weight_kg: float, volume_m3: float, created_at: Optional[datetime] = None):
+    day = (created_at or datetime.utcnow()).date()
+    with _pending_lock:
+        for key in tile_keys(lat, lon, day):
+            totals = _pending.setdefault(key, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += weight_kg or 0.0
+            totals[2] += volume_m3 or 0.0
+
+
+async def flush(db: AsyncSession) -> int:
+    """Write buffered increments to demand_tiles. Returns the number of tiles touched."""
+    global _pending
+    with _pending_lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+    rows = []
+    # Sorted keys: concurrent flushers from several API processes lock rows in the same order
+    for (precision, geohash, day), (count, weight, volume) in sorted(batch.items()):
+        min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash)
+        rows.append({
+            "precision": precision,
+            "geohash": geohash,
+            "day": day,
+            "order_count": count,
+            "total_weight_kg": weight,
+            "total_volume_m3": volume,
+            "center_lat": (min_lat + max_lat) / 2,
+            "center_lon": (min_lon + max_lon) / 2,
+        })
+    stmt = insert(DemandTile)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DemandTile.precision, DemandTile.geohash, DemandTile.day],
+        set_={
+            "order_count": DemandTile.order_count + stmt.excluded.order_count,
+            "total_weight_kg": DemandTile.total_weight_kg + stmt.excluded.total_weight_kg,
+            "total_volume_m3": DemandTile.total_volume_m3 + stmt.excluded.total_volume_m3,
+        },
+    )
+    try:
+        await db.execute(stmt, rows)
+        await db.commit()
+    except Exception:
+        # Put the increments back so the next flush retries them
+        with _pending_lock:
+            for key, (count, weight, volume) in batch.items():
+                totals = _pending.setdefault(key, [0, 0.0, 0.0])
+                totals[0] += count
+                totals[1] += weight
+                totals[2] += volume
+        raise
+    return len(rows)
+
+
+async def run_flusher(stop: asyncio.Event, interval_seconds: float = HEATMAP_FLUSH_SECONDS):
+    """Flush every interval_seconds until stop is set, then once more."""
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with AsyncSessionLocal() as db:
+                await flush(db)
+        except Exception as e:
+            print(f"Heatmap flush error: {e}")
+        if stop.is_set():
+            return
+
+
+@jobs.job_handler("rebuild_demand_tiles", concurrency=1)
+async def rebuild_tiles(db: AsyncSession, payload: dict):
+    """Recompute tiles from orders since payload["since"] (ISO date).
+
+    Used to backfill after enabling the heatmap or to repair counts lost when
+    an API process died with unflushed increments. Only whole days that API
+    processes can no longer have buffered are rebuilt (up to yesterday);
+    otherwise a later flush would add its increments on top of the rebuilt
+    counts. Orders without created_at (made before that column existed)
+    cannot be placed on a day and are left out; their number is reported.
+    """
+    since = date.fromisoformat(payload["since"])
+    # Stay a few flush intervals clear of midnight, for increments still in flight
+    until = (datetime.utcnow() - timedelta(seconds=max(60, 10 * HEATMAP_FLUSH_SECONDS))).date()
+    if since >= until:
+        return {"tiles": 0, "days": 0, "undated_orders": 0}
+    start = datetime.combine(since, datetime.min.time())
+    end = datetime.combine(until, datetime.min.time())
+    await db.execute(delete(DemandTile).where(DemandTile.day >= since, DemandTile.day < until))
+
+    totals = {}
+    result = await db.stream(
+        select(Order.pickup_location, Order.weight_kg, Order.volume_m3, Order.created_at)
+        .where(Order.created_at >= start, Order.created_at < end)
+        .execution_options(yield_per=5000)
+    )
+    async for loc, weight, volume, created_at in result:
+        try:
+            lat, lon = map(float, loc.split(','))
+        except (AttributeError, ValueError):
+            continue
+        for key in tile_keys(lat, lon, created_at.date()):
+            t = totals.setdefault(key, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += weight or 0.0
+            t[2] += volume or 0.0
+
+    for (precision, geohash, day), (count, weight, volume) in totals.items():
+        min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash)
+        db.add(DemandTile(
+            precision=precision, geohash=geohash, day=day,
+            order_count=count, total_weight_kg=weight, total_volume_m3=volume,
+            center_lat=(min_lat + max_lat) / 2, center_lon=(min_lon + max_lon) / 2,
+        ))
+    undated = (await db.execute(select(func.count()).select_from(Order).where(Order.created_at.is_(None)))).scalar()
+    await db.commit()
+    return {"tiles": len(totals), "days": (until - since).days, "undated_orders": undated}
+
+
+# Schemas
+class HeatmapCell(BaseModel):
+    geohash: str
+    latitude: float
+    longitude: float
+    orders: int
+    total_weight_kg: float
+    total_volume_m3: float
+
+
+class HeatmapResponse(BaseModel):
+    precision: int
+    start: date
+    end: date
+    cells: List[HeatmapCell]
+
+
+# Endpoints
+
+@router.get("/heatmap", response_model=HeatmapResponse)
+async def get_heatmap(
+    zoom: int = Query(10, ge=0, le=20),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    min_lat: Optional[float] = None,
+    min_lon: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lon: Optional[float] = None,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= HEATMAP_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Window is limited to {HEATMAP_MAX_DAYS} days")
+
+    precision = precision_for_zoom(zoom)
+    query = (
+        select(
+            DemandTile.geohash,
+            func.min(DemandTile.center_lat),
+            func.min(DemandTile.center_lon),
+            func.sum(DemandTile.order_count),
+            func.sum(DemandTile.total_weight_kg),
+            func.sum(DemandTile.total_volume_m3),
+        )
+        .where(DemandTile.precision == precision, DemandTile.day.between(start, end))
+        .group_by(DemandTile.geohash)
+    )
+    if None not in (min_lat, min_lon, max_lat, max_lon):
+        query = query.where(
+            DemandTile.center_lat.between(min_lat, max_lat),
+            DemandTile.center_lon.between(min_lon, max_lon),
+        )
+    result = await db.execute(query)
+    cells = [
+        HeatmapCell(
+            geohash=geohash, latitude=lat, longitude=lon,
+            orders=count, total_weight_kg=round(weight, 2), total_volume_m3=round(volume, 3),
+        )
+        for geohash, lat, lon, count, weight, volume in result.all()
+    ]
+    return HeatmapResponse(precision=precision, start=start, end=end, cells=cells)
+
+
+@router.post("/heatmap/rebuild")
+async def rebuild_heatmap(
+    since: date,
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    job = await jobs.enqueue(db, "rebuild_demand_tiles", {"since": since.isoformat()}, created_by=admin.id)
+    await db.commit()
+    return {"job_id": job.id}
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import IdempotencyKey
+
+# A key may be replayed for this long after the request that used it
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))
+# Completed responses kept in process, so most retries never reach Postgres
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000))
+IDEMPOTENCY_PURGE_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", 600))
+MAX_KEY_LENGTH = 255
+
+
+class ResponseCache:
+    """LRU of (user id, key) -> (expires at, request hash, response) with TTL."""
+
+    def __init__(self, max_size: int = IDEMPOTENCY_CACHE_SIZE, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def get(self, user_id: int, key: str) -> Optional[tuple[str, dict]]:
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[(user_id, key)]
+            return None
+        self._entries.move_to_end((user_id, key))
+        return entry[1], entry[2]
+
+    def put(self, user_id: int, key: str, request_hash: str, response: dict, ttl_seconds: Optional[float] = None):
+        expires = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._entries[(user_id, key)] = (expires, request_hash, response)
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_cache = ResponseCache()
+
+
+def request_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored_hash: str, fingerprint: str, response: dict) -> dict:
+    if stored_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    return response
+
+
+async def claim(db: AsyncSession, user_id: int, key: str, fingerprint: str) -> Optional[dict]:
+    """Reserve key for this request in the caller's transaction.
+
+    Returns None when the caller should go ahead, or the stored response of
+    the earlier request with this key. A concurrent request with the same
+    key waits on the row lock here until the first one commits (and then
+    replays its response) or rolls back (and then proceeds itself).
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+    cached = _cache.get(user_id, key)
+    if cached:
+        return _replay(cached[0], fingerprint, cached[1])
+
+    now = datetime.utcnow()
+    stmt = insert(IdempotencyKey).values(user_id=user_id, key=key, request_hash=fingerprint, created_at=now)
+    # An expired key is taken over as if it were new
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={"request_hash": fingerprint, "response": None, "created_at": now},
+        where=IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    ).returning(IdempotencyKey.user_id)
+    if (await db.execute(stmt)).first():
+        return None
+
+    result = await db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.response, IdempotencyKey.created_at)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )
+    stored = result.first()
+    if stored is None or stored.response is None:
+        # Only possible if the row was purged between the two statements
+        raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is still in progress; retry")
+    response = json.loads(stored.response)
+    remaining = IDEMPOTENCY_TTL_SECONDS - (now - stored.created_at).total_seconds()
+    _cache.put(user_id, key, stored.request_hash, response, ttl_seconds=remaining)
+    return _replay(stored.request_hash, fingerprint, response)
+
+
+async def complete(db: AsyncSession, user_id: int, key: str, response: dict):
+    """Store the response for a claimed key; commits with the caller's transaction."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(response=json.dumps(response))
+    )
+
+
+def remember(user_id: int, key: str, fingerprint: str, response: dict):
+    """Cache a committed response so retries to this process skip the database."""
+    _cache.put(user_id, key, fingerprint, response)
+
+
+async def purge(db: AsyncSession) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    await db.commit()
+    return result.rowcount
+
+
+async def run_purger(stop: asyncio.Event, interval_seconds: float = IDEMPOTENCY_PURGE_SECONDS):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with AsyncSessionLocal() as db:
+                await purge(db)
+        except Exception as e:
+            print(f"Idempotency purge error: {e}")
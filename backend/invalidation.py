@@ -0,0 +1,106 @@
+"""Cache invalidation across API processes through Postgres LISTEN/NOTIFY.
+
+A mutation calls notify(db, topic) inside its transaction; Postgres delivers
+the message to every listening process when (and only if) it commits. Each
+process registers what to drop per topic with @on(topic) and runs
+run_listener() on its own connection.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+
+CHANNEL = "cache_invalidation"
+
+# Topics
+ZONES = "zones"
+VEHICLES = "vehicles"
+USERS = "users"
+TRIPS = "trips"
+ORDERS = "orders"
+TOKENS = "tokens"
+
+_handlers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+_listening = False
+
+
+def on(topic: str):
+    """Register fn(payload) to run in every process when topic is notified."""
+    def decorator(fn):
+        _handlers[topic].append(fn)
+        return fn
+    return decorator
+
+
+def listening() -> bool:
+    """True while this process is connected and receiving invalidations, so
+    caches may skip their own staleness checks."""
+    return _listening
+
+
+def apply(topic: str, payload: str = ""):
+    for fn in _handlers.get(topic, ()):
+        try:
+            fn(payload)
+        except Exception as e:
+            print(f"Invalidation handler error ({topic}): {e}")
+
+
+def apply_all():
+    for topic in list(_handlers):
+        apply(topic)
+
+
+async def notify(db: AsyncSession, topic: str, payload="") -> None:
+    """Queue an invalidation in the caller's transaction."""
+    await db.execute(
+        text("SELECT pg_notify(:channel, :message)"),
+        {"channel": CHANNEL, "message": f"{topic}:{payload}"},
+    )
+
+
+def _on_notification(connection, pid, channel, message: str):
+    topic, _, payload = message.partition(":")
+    apply(topic, payload)
+
+
+def _dsn() -> str:
+    # asyncpg wants a plain postgresql:// URL
+    return database.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+async def run_listener(stop: asyncio.Event, retry_seconds: float = 2.0):
+    """Listen until stop is set, reconnecting after connection loss."""
+    global _listening
+    import asyncpg  # Loaded with the engine's dialect, not at import time
+    while not stop.is_set():
+        conn = None
+        lost = asyncio.Event()
+        try:
+            conn = await asyncpg.connect(_dsn())
+            conn.add_termination_listener(lambda c: lost.set())
+            await conn.add_listener(CHANNEL, _on_notification)
+            # Messages sent while we were not listening are gone: drop everything once
+            apply_all()
+            _listening = True
+            waiters = [asyncio.create_task(stop.wait()), asyncio.create_task(lost.wait())]
+            _, pending = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if lost.is_set():
+                print("Invalidation listener: connection lost, reconnecting")
+        except Exception as e:
+            print(f"Invalidation listener error: {e}")
+        finally:
+            _listening = False
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        if not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), retry_seconds)
+            except asyncio.TimeoutError:
+                pass
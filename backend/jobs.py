@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db, AsyncSessionLocal
+from models import Job, JobStatus, User, UserRole
+from auth import get_current_user
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+# Worker tuning
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 8))
+JOB_POLL_INTERVAL_MS = int(os.getenv("JOB_POLL_INTERVAL_MS", 500))
+JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", 300))  # Reclaim jobs from dead workers
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", 2))
+
+# kind -> async handler(db, payload) returning a JSON-serializable result
+HANDLERS = {}
+# kind -> max jobs of that kind running at once in one worker
+KIND_CONCURRENCY = {}
+
+
+def job_handler(kind: str, concurrency: Optional[int] = None):
+    """Register a coroutine as the handler for a job kind."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        if concurrency:
+            KIND_CONCURRENCY[kind] = concurrency
+        return func
+    return decorator
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: Optional[dict] = None,
+    created_by: Optional[int] = None,
+    max_attempts: int = 3,
+    delay_seconds: float = 0,
+) -> Job:
+    """Add a job to the queue. The caller owns the transaction, so the job
+    commits (or rolls back) together with the work that produced it."""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        status=JobStatus.QUEUED,
+        max_attempts=max_attempts,
+        created_by=created_by,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+
+# Schemas
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+# Endpoints
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if current_user.role != UserRole.SUPER_ADMIN and job.created_by != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+
+@router.get("/", response_model=list[JobResponse])
+async def list_jobs(
+    status: Optional[JobStatus] = None,
+    kind: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    stmt = select(Job)
+    if status:
+        stmt = stmt.where(Job.status == status)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    result = await db.execute(stmt.order_by(Job.id.desc()).limit(min(limit, 200)))
+    return [_job_response(j) for j in result.scalars().all()]
+
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+async def retry_job(job_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role != UserRole.SUPER_ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.FAILED:
+        raise HTTPException(status_code=400, detail="Only failed jobs can be retried")
+    job.status = JobStatus.QUEUED
+    job.attempts = 0
+    job.error = None
+    job.run_after = datetime.utcnow()
+    await db.commit()
+    await db.refresh(job)
+    return _job_response(job)
+
+
+# Worker
+
+class JobWorker:
+    """Polls the jobs table and runs handlers concurrently.
+
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+    worker processes can share one queue without double-processing.
+    """
+
+    def __init__(self, concurrency: int = JOB_WORKER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.kind_slots = {kind: asyncio.Semaphore(n) for kind, n in KIND_CONCURRENCY.items()}
+        self.running = set()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = asyncio.Event()
+
+    async def claim(self, limit: int) -> list[tuple[int, str, str]]:
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=JOB_LOCK_TIMEOUT_SECONDS)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Job)
+                .where(or_(
+                    and_(Job.status == JobStatus.QUEUED, Job.run_after <= now),
+                    and_(Job.status == JobStatus.RUNNING, Job.locked_at < stale),
+                ))
+                .where(Job.kind.in_(list(HANDLERS)))
+                .order_by(Job.run_after, Job.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = result.scalars().all()
+            for job in jobs:
+                job.status = JobStatus.RUNNING
+                job.attempts += 1
+                job.locked_at = now
+            await db.commit()
+            return [(j.id, j.kind, j.payload) for j in jobs]
+
+    async def execute(self, job_id: int, kind: str, payload: str):
+        handler = HANDLERS[kind]
+        kind_slot = self.kind_slots.get(kind)
+        if kind_slot:
+            await kind_slot.acquire()
+        try:
+            async with AsyncSessionLocal() as db:
+                outcome = await handler(db, json.loads(payload))
+            await self.finish(job_id, result=outcome)
+        except Exception as e:
+            traceback.print_exc()
+            await self.finish(job_id, error=f"{type(e).__name__}: {e}")
+        finally:
+            if kind_slot:
+                kind_slot.release()
+
+    async def finish(self, job_id: int, result: Any = None, error: Optional[str] = None):
+        async with AsyncSessionLocal() as db:
+            res = await db.execute(select(Job).where(Job.id == job_id))
+            job = res.scalars().first()
+            if not job:
+                return
+            now = datetime.utcnow()
+            job.locked_at = None
+            if error is None:
+                job.status = JobStatus.DONE
+                job.result = json.dumps(result) if result is not None else None
+                job.error = None
+                job.finished_at = now
+            elif job.attempts < job.max_attempts:
+                # Exponential backoff before the next attempt
+                job.status = JobStatus.QUEUED
+                job.error = error
+                job.run_after = now + timedelta(seconds=JOB_RETRY_BASE_SECONDS ** job.attempts)
+            else:
+                job.status = JobStatus.FAILED
+                job.error = error
+                job.finished_at = now
+            await db.commit()
+
+    async def run(self):
+        print(f"Job worker {self.name} started (concurrency={self.concurrency}, kinds={sorted(HANDLERS)})")
+        while not self.stop_event.is_set():
+            free = self.concurrency - len(self.running)
+            claimed = []
+            if free > 0:
+                try:
+                    claimed = await self.claim(free)
+                except Exception as e:
+                    print(f"Job claim error: {e}")
+            for job_id, kind, payload in claimed:
+                task = asyncio.create_task(self.execute(job_id, kind, payload))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+            if len(claimed) < free:
+                # Queue drained; wait before polling again
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), JOB_POLL_INTERVAL_MS / 1000)
+                except asyncio.TimeoutError:
+                    pass
+        if self.running:
+            await asyncio.gather(*self.running, return_exceptions=True)
+
+    def stop(self):
+        self.stop_event.set()
@@ -1,29 +1,64 @@
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
 from contextlib import asynccontextmanager
+import asyncio
+import csv
+import io
+from datetime import datetime
 import models
-from auth import get_current_user, create_access_token, get_password_hash, verify_password
-from schemas import UserCreate, UserResponse, Token, CompanyCreate, CompanyResponse, OrderCreate, OrderResponse, ZoneCreate, ZoneResponse, VehicleCreate, VehicleResponse, OrderStatusUpdate, DriverSignupRequest
+from auth import get_current_user, create_access_token, get_password_hash, verify_password, oauth2_scheme, decode_token, revoke_token
+from schemas import UserCreate, UserResponse, Token, RefreshRequest, CompanyCreate, CompanyResponse, OrderCreate, OrderResponse, ZoneCreate, ZoneResponse, VehicleCreate, VehicleResponse, OrderStatusUpdate, DriverSignupRequest
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
-from fastapi import Depends, HTTPException, status
-from sqlalchemy import select
+from database import get_db, AsyncSessionLocal
+from fastapi import Depends, HTTPException, Header, Query, status
+from typing import Optional
+from sqlalchemy import select, text
 from models import User, Company, UserRole, Order, Zone, Vehicle, UserStatus
 import addresses
 import trips
 import driver_auth
 import admin_routes
+import jobs
+import assignment
+import geocoding
+import distance
+import pricing
+import route_planner
+import heatmap
+import stats
+import zones
+import fleet
+import order_events
+import archive
+import idempotency
+import refresh_tokens
+import ratelimit
+import invalidation
+import health
+import etags
+import compression
+import numpy as np
 
 # ... (rest of imports)
 import schemas
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables on startup
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Nothing here waits on the database: schema checks and cache warm-up run
+    # in the background and /readyz reports when they are done
+    stop = asyncio.Event()
+    background = [
+        asyncio.create_task(health.start(stop)),
+        asyncio.create_task(heatmap.run_flusher(stop)),
+        asyncio.create_task(stats.run_compactor(stop)),
+        asyncio.create_task(idempotency.run_purger(stop)),
+        asyncio.create_task(refresh_tokens.run_purger(stop)),
+        asyncio.create_task(invalidation.run_listener(stop)),
+    ]
     yield
+    stop.set()
+    await asyncio.gather(*background)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -35,18 +70,37 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
+# Added before CORS so 429 responses still carry CORS headers
+if ratelimit.RATE_LIMIT_ENABLED:
+    app.add_middleware(ratelimit.RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Outermost, so every response (429s and CORS errors included) is compressed
+app.add_middleware(compression.CompressionMiddleware)
+
+app.include_router(health.router)
 app.include_router(addresses.router)
 app.include_router(trips.router)
 app.include_router(driver_auth.router)
 app.include_router(admin_routes.router)
+app.include_router(jobs.router)
+app.include_router(geocoding.router)
+app.include_router(pricing.router)
+app.include_router(route_planner.router)
+app.include_router(heatmap.router)
+app.include_router(stats.router)
+app.include_router(zones.router)
+app.include_router(fleet.router)
+app.include_router(order_events.router)
+app.include_router(archive.router)
 
 @app.get("/")
 def read_root():
@@ -87,7 +141,39 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
         )
     
     access_token = create_access_token(data={"sub": user.email, "role": user.role})
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await refresh_tokens.issue(db, user.id)
+    await db.commit()
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@app.post("/token/refresh", response_model=Token)
+async def refresh_access_token(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Trade a refresh token for a new access token and the next refresh token"""
+    user_id, refresh_token = await refresh_tokens.rotate(db, payload.refresh_token)
+    user = await db.get(User, user_id)
+    # Same rule as /token: only approved accounts get access tokens
+    if user is None or user.status in (UserStatus.PENDING, UserStatus.REJECTED, UserStatus.SUSPENDED):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is not active",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(data={"sub": user.email, "role": user.role})
+    await db.commit()
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@app.post("/logout")
+async def logout(
+    payload: Optional[RefreshRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke the token used for this request, and the refresh token if given"""
+    await revoke_token(db, decode_token(token))
+    if payload is not None:
+        await refresh_tokens.revoke(db, payload.refresh_token)
+    await db.commit()
+    return {"message": "Logged out"}
 
 # Signup Endpoint (Combined Company + User for MSME)
 @app.post("/signup/msme", response_model=UserResponse)
@@ -192,6 +278,7 @@ async def update_user_profile(
     if 'password' in payload and payload['password']:
         current_user.hashed_password = get_password_hash(payload['password'])
     
+    await invalidation.notify(db, invalidation.USERS, current_user.id)
     await db.commit()
     
     # Reload user with company relationship
@@ -203,7 +290,6 @@ async def update_user_profile(
     return user_with_company
 
 # --- Geospatial Logic ---
-from shapely.geometry import Point, Polygon
 import json
 
 # Order Endpoints
@@ -211,7 +297,22 @@ from schemas import OrderCreate, OrderResponse
 from models import Order
 
 @app.post("/orders", response_model=OrderResponse)
-async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_order(
+    order: OrderCreate,
+    defer_assignment: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # A retry with the same Idempotency-Key gets the first response back
+    # before any zone lookup or assignment work is done
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = idempotency.request_hash({"order": order.model_dump(), "defer_assignment": defer_assignment})
+        replay = await idempotency.claim(db, current_user.id, idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+
     # Calculate Volume
     volume = (order.length_cm * order.width_cm * order.height_cm) / 1000000.0
     pickup_loc_str = f"{order.latitude},{order.longitude}"
@@ -227,39 +328,11 @@ async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db), c
         if trip:
             assigned_vehicle_id = trip.vehicle_id
             status_val = models.OrderStatus.ASSIGNED
-    else:
-        # Standard Zone Logic
-        # 1. Fetch all zones from DB
-        result = await db.execute(select(models.Zone))
-        db_zones = result.scalars().all()
-        
-        matched_zone_id = None
-        point = Point(order.latitude, order.longitude)
-        
-        for z in db_zones:
-            try:
-                coords = json.loads(z.geometry_coords)
-                poly_coords = [(p[0], p[1]) for p in coords]
-                polygon = Polygon(poly_coords)
-                
-                if polygon.contains(point):
-                    matched_zone_id = z.id
-                    break
-            except Exception as e:
-                print(f"Zone parse error {z.name}: {e}")
-                continue
-        
-        if matched_zone_id:
-            # 2. Find available vehicle in that zone
-            result = await db.execute(select(Vehicle).where(Vehicle.zone_id == matched_zone_id))
-            vehicles_in_zone = result.scalars().all()
-            
-            for v in vehicles_in_zone:
-                # Simple capacity check
-                if v.max_weight_kg >= order.weight_kg and v.max_volume_m3 >= volume:
-                    assigned_vehicle_id = v.id
-                    status_val = models.OrderStatus.ASSIGNED
-                    break
+    elif not defer_assignment and assignment.ASSIGNMENT_MODE != "batch":
+        # Standard Zone Logic (in "batch" mode the assigner loop picks the order up instead)
+        assigned_vehicle_id = await assignment.auto_assign(db, order.latitude, order.longitude, order.weight_kg, volume)
+        if assigned_vehicle_id:
+            status_val = models.OrderStatus.ASSIGNED
     
     drop_loc_str = f"{order.drop_latitude},{order.drop_longitude}" if order.drop_latitude else None
     
@@ -277,12 +350,21 @@ async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db), c
         drop_address=order.drop_address,
         status=status_val,
         trip_id=order.trip_id,
-        assigned_vehicle_id=assigned_vehicle_id
+        assigned_vehicle_id=assigned_vehicle_id,
+        created_at=datetime.utcnow()
     )
     
     db.add(new_order)
-    await db.commit()
-    await db.refresh(new_order)
+    await db.flush()  # Assigns new_order.id for the history row and job payload
+    stats.record_change(db, new_order)
+    order_events.record(db, new_order, actor_id=current_user.id)
+    await invalidation.notify(db, invalidation.ORDERS)
+    
+    # Deferred mode: store as PENDING now and let the job worker assign it
+    job_id = None
+    if defer_assignment and not order.trip_id:
+        job = await jobs.enqueue(db, "auto_assign_order", {"order_id": new_order.id}, created_by=current_user.id)
+        job_id = job.id
     
     lat, lon = map(float, new_order.pickup_location.split(','))
     d_lat, d_lon = 0.0, 0.0
@@ -292,7 +374,12 @@ async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db), c
          except:
              pass
     
-    return OrderResponse(
+    distance_km, eta = None, None
+    if d_lat or d_lon:
+        distance_km = await asyncio.to_thread(distance.distance_km, lat, lon, d_lat, d_lon)
+        eta = float(distance.eta_minutes(distance_km))
+    
+    response = OrderResponse(
         id=new_order.id,
         user_id=new_order.user_id,
         item_name=new_order.item_name,
@@ -309,41 +396,137 @@ async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db), c
         drop_latitude=d_lat,
         drop_longitude=d_lon,
         pickup_address=new_order.pickup_address,
-        drop_address=new_order.drop_address
+        drop_address=new_order.drop_address,
+        assignment_job_id=job_id,
+        distance_km=distance_km,
+        eta_minutes=eta
     )
-
-@app.get("/orders", response_model=list[OrderResponse])
-async def read_orders(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
-    stmt = select(Order, Vehicle).outerjoin(Vehicle, Order.assigned_vehicle_id == Vehicle.id)
+    if idempotency_key:
+        # Stored in the order's transaction: the key exists only if the order does
+        await idempotency.complete(db, current_user.id, idempotency_key, response.model_dump(mode="json"))
     
+    await db.commit()
+    heatmap.record_order(order.latitude, order.longitude, new_order.weight_kg, new_order.volume_m3, new_order.created_at)
+    if idempotency_key:
+        idempotency.remember(current_user.id, idempotency_key, fingerprint, response.model_dump(mode="json"))
+    return response
+
+def _scope_orders(stmt, current_user: User):
+    """Restrict an orders query to what the user may see; None if nothing."""
     if current_user.role == models.UserRole.SUPER_ADMIN:
-        stmt = stmt.order_by(Order.id.desc())
-    elif current_user.role == models.UserRole.DRIVER:
-        if current_user.vehicle:
-            stmt = stmt.where(Order.assigned_vehicle_id == current_user.vehicle.id).order_by(Order.id.desc())
-        else:
-            return []
-    else:
-        stmt = stmt.where(Order.user_id == current_user.id).order_by(Order.id.desc())
+        return stmt
+    if current_user.role == models.UserRole.DRIVER:
+        if not current_user.vehicle:
+            return None
+        return stmt.where(Order.assigned_vehicle_id == current_user.vehicle.id)
+    return stmt.where(Order.user_id == current_user.id)
+
+# Order lists embed vehicle numbers, so they change with either table
+@app.get("/orders", response_model=list[OrderResponse], dependencies=[Depends(etags.conditional_for_user(invalidation.ORDERS, invalidation.VEHICLES))])
+async def read_orders(
+    vehicle_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Live orders only (orders_hot); archived ones are under /orders/history
+    stmt = select(Order, Vehicle).outerjoin(Vehicle, Order.assigned_vehicle_id == Vehicle.id).where(Order.archived.is_(False))
+    if vehicle_id is not None:
+        stmt = stmt.where(Order.assigned_vehicle_id == vehicle_id)
+    stmt = _scope_orders(stmt, current_user)
+    if stmt is None:
+        return []
         
-    result = await db.execute(stmt)
-    rows = result.all() # list of (Order, Vehicle) tuples
+    result = await db.execute(stmt.order_by(Order.id.desc()))
+    return await _order_responses(result.all())
+
+@app.get("/orders/history", response_model=list[OrderResponse], dependencies=[Depends(etags.conditional_for_user(invalidation.ORDERS, invalidation.VEHICLES))])
+async def read_order_history(
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Archived (delivered) orders, newest first. Page with before_id = last id seen."""
+    stmt = select(Order, Vehicle).outerjoin(Vehicle, Order.assigned_vehicle_id == Vehicle.id).where(Order.archived.is_(True))
+    stmt = _scope_orders(stmt, current_user)
+    if stmt is None:
+        return []
+    if before_id is not None:
+        stmt = stmt.where(Order.id < before_id)
+    result = await db.execute(stmt.order_by(Order.id.desc()).limit(limit))
+    return await _order_responses(result.all())
+
+ORDER_EXPORT_BATCH_SIZE = 1000
+ORDER_EXPORT_COLUMNS = list(OrderResponse.model_fields)
+
+@app.get("/orders/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    archived: Optional[bool] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Every order the user may see, streamed in id order as NDJSON or CSV.
+
+    Rows are read in keyset batches and sent as they are produced; the
+    compression middleware flushes each chunk, so memory stays flat however
+    many orders there are.
+    """
+    base = select(Order, Vehicle).outerjoin(Vehicle, Order.assigned_vehicle_id == Vehicle.id)
+    if archived is not None:
+        base = base.where(Order.archived.is_(archived))
+    base = _scope_orders(base, current_user)
+
+    def encode(rows) -> str:
+        if format == "ndjson":
+            return "".join(r.model_dump_json() + "\n" for r in rows)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            data = r.model_dump(mode="json")
+            writer.writerow([data[c] for c in ORDER_EXPORT_COLUMNS])
+        return buf.getvalue()
+
+    async def generate():
+        if format == "csv":
+            yield ",".join(ORDER_EXPORT_COLUMNS) + "\n"
+        if base is None:
+            return
+        # Own session: the request's session is closed once streaming starts
+        async with AsyncSessionLocal() as db:
+            after_id = 0
+            while True:
+                result = await db.execute(base.where(Order.id > after_id).order_by(Order.id).limit(ORDER_EXPORT_BATCH_SIZE))
+                rows = result.all()
+                if not rows:
+                    return
+                yield encode(await _order_responses(rows))
+                after_id = rows[-1][0].id
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+async def _order_responses(rows) -> list[OrderResponse]:
+    """rows: (Order, Vehicle or None) tuples."""
+    # Pickup -> drop distances for the whole list in one vectorized pass
+    coords = [_order_coords(o) for o, _ in rows]
+    with_drop = [i for i, (_, _, d_lat, d_lon) in enumerate(coords) if d_lat or d_lon]
+    distances, etas = {}, {}
+    if with_drop:
+        pts = np.array([coords[i] for i in with_drop], dtype=np.float64)
+        # Off the event loop: uncached pairs may search the road graph
+        km = await asyncio.to_thread(distance.batch_distance_km, pts[:, 0], pts[:, 1], pts[:, 2], pts[:, 3])
+        minutes = distance.eta_minutes(km)
+        for j, i in enumerate(with_drop):
+            distances[i] = round(float(km[j]), 2)
+            etas[i] = round(float(minutes[j]), 1)
     
     response = []
-    for o, v in rows:
-        lat, lon = 0.0, 0.0
-        if o.pickup_location:
-            try:
-                lat, lon = map(float, o.pickup_location.split(','))
-            except:
-                pass
-        
-        d_lat, d_lon = 0.0, 0.0
-        if o.drop_location:
-            try:
-                d_lat, d_lon = map(float, o.drop_location.split(','))
-            except:
-                pass
+    for i, (o, v) in enumerate(rows):
+        lat, lon, d_lat, d_lon = coords[i]
         
         response.append(OrderResponse(
             id=o.id,
@@ -363,10 +546,27 @@ async def read_orders(db: AsyncSession = Depends(get_db), current_user: User = D
             drop_latitude=d_lat,
             drop_longitude=d_lon,
             pickup_address=o.pickup_address,
-            drop_address=o.drop_address
+            drop_address=o.drop_address,
+            distance_km=distances.get(i),
+            eta_minutes=etas.get(i)
         ))
     return response
 
+def _order_coords(o: Order) -> tuple[float, float, float, float]:
+    """(pickup lat, pickup lon, drop lat, drop lon); zeros where missing or malformed."""
+    lat, lon, d_lat, d_lon = 0.0, 0.0, 0.0, 0.0
+    if o.pickup_location:
+        try:
+            lat, lon = map(float, o.pickup_location.split(','))
+        except ValueError:
+            pass
+    if o.drop_location:
+        try:
+            d_lat, d_lon = map(float, o.drop_location.split(','))
+        except ValueError:
+            pass
+    return lat, lon, d_lat, d_lon
+
 @app.get("/orders/{order_id}/compatible-vehicles", response_model=list[VehicleResponse])
 async def get_compatible_vehicles(order_id: int, db: AsyncSession = Depends(get_db)):
     # 1. Get Order
@@ -376,29 +576,19 @@ async def get_compatible_vehicles(order_id: int, db: AsyncSession = Depends(get_
         raise HTTPException(status_code=404, detail="Order not found")
 
     lat, lon = map(float, order.pickup_location.split(','))
-    point = Point(lat, lon)
     
-    # 2. Get All Zones
-    z_res = await db.execute(select(models.Zone))
-    zones = z_res.scalars().all()
+    # 2. Find the pickup zone; fall back to overlapping, then adjacent zones
+    index = await zones.get_zone_index(db)
+    zone_id = index.lookup(lat, lon)
     
     compatible_vehicles = []
     
-    for z in zones:
-        try:
-            coords = json.loads(z.geometry_coords)
-            poly_coords = [(p[0], p[1]) for p in coords]
-            polygon = Polygon(poly_coords)
-            
-            if polygon.contains(point):
-                # Found the zone. Get vehicles in this zone.
-                v_res = await db.execute(select(Vehicle).where(Vehicle.zone_id == z.id))
-                vehs = v_res.scalars().all()
-                # Filter by capacity
-                for v in vehs:
-                         compatible_vehicles.append(v)
-        except:
-             continue
+    if zone_id:
+        for candidate_zone_id in index.candidate_zones(zone_id):
+            v_res = await db.execute(select(Vehicle).where(Vehicle.zone_id == candidate_zone_id).order_by(Vehicle.id))
+            compatible_vehicles = v_res.scalars().all()
+            if compatible_vehicles:
+                break
                 
     return [
         VehicleResponse(
@@ -415,7 +605,8 @@ async def get_compatible_vehicles(order_id: int, db: AsyncSession = Depends(get_
 @app.patch("/orders/{order_id}/status", response_model=OrderResponse)
 async def update_order_status(order_id: int, status_update: schemas.OrderStatusUpdate, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     # Verify Driver has access or Admin
-    result = await db.execute(select(Order).where(Order.id == order_id))
+    # Archived orders are read-only
+    result = await db.execute(select(Order).where(Order.id == order_id, Order.archived.is_(False)).with_for_update())
     order = result.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -424,7 +615,15 @@ async def update_order_status(order_id: int, status_update: schemas.OrderStatusU
         if not current_user.vehicle or order.assigned_vehicle_id != current_user.vehicle.id:
              raise HTTPException(status_code=403, detail="Not authorized to update this order")
     
+    before = stats.snapshot(order)
     order.status = status_update.status
+    if order.status != models.OrderStatus.DELIVERED:
+        order.delivered_at = None
+    elif before[0] != models.OrderStatus.DELIVERED:
+        order.delivered_at = datetime.utcnow()
+    stats.record_change(db, order, before)
+    order_events.record(db, order, before, actor_id=current_user.id)
+    await invalidation.notify(db, invalidation.ORDERS)
     await db.commit()
     await db.refresh(order)
     
@@ -463,20 +662,29 @@ async def assign_order(
         raise HTTPException(status_code=403, detail="Only admins can assign orders")
 
     # Fetch Order
-    result = await db.execute(select(Order).where(Order.id == order_id))
+    # Archived orders are read-only
+    result = await db.execute(select(Order).where(Order.id == order_id, Order.archived.is_(False)).with_for_update())
     order = result.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
-    # Fetch Vehicle
-    v_result = await db.execute(select(Vehicle).where(Vehicle.id == request.vehicle_id))
-    vehicle = v_result.scalars().first()
+    # Fetch Vehicle, locked so concurrent assignments see each other's load
+    vehicle = await assignment.lock_vehicle(db, request.vehicle_id)
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
+    load = await assignment.vehicle_load(db, vehicle.id, exclude_order_id=order.id)
+    if not assignment.vehicle_has_room(vehicle, load, order.weight_kg, order.volume_m3):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Vehicle does not have enough remaining capacity")
+
     # Update
+    before = stats.snapshot(order)
     order.assigned_vehicle_id = vehicle.id
     order.status = models.OrderStatus.ASSIGNED
+    stats.record_change(db, order, before)
+    order_events.record(db, order, before, actor_id=current_user.id)
+    await invalidation.notify(db, invalidation.ORDERS)
     
     await db.commit()
     await db.refresh(order)
@@ -520,14 +728,19 @@ async def unassign_order(
         raise HTTPException(status_code=403, detail="Only admins can unassign orders")
 
     # Fetch Order
-    result = await db.execute(select(Order).where(Order.id == order_id))
+    # Archived orders are read-only
+    result = await db.execute(select(Order).where(Order.id == order_id, Order.archived.is_(False)).with_for_update())
     order = result.scalars().first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     # Update
+    before = stats.snapshot(order)
     order.assigned_vehicle_id = None
     order.status = models.OrderStatus.PENDING
+    stats.record_change(db, order, before)
+    order_events.record(db, order, before, actor_id=current_user.id)
+    await invalidation.notify(db, invalidation.ORDERS)
     
     await db.commit()
     await db.refresh(order)
@@ -572,33 +785,57 @@ from models import Zone
 
 @app.post("/zones", response_model=ZoneResponse)
 async def create_zone(zone: ZoneCreate, db: AsyncSession = Depends(get_db)):
+    try:
+        polygon = zones.validate_coordinates(zone.coordinates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One zone creation at a time, so each sees every other zone when its relations are computed
+    await db.execute(text("LOCK TABLE zones IN SHARE ROW EXCLUSIVE MODE"))
+    result = await db.execute(select(Zone.id).where(Zone.name == zone.name))
+    if result.scalars().first():
+        raise HTTPException(status_code=400, detail="Zone name already exists")
+    existing = await zones.build_zone_index(db)
+
     # Flatten geometry to JSON string for simple storage
-    geo_str = json.dumps(zone.coordinates)
+    geo_str = json.dumps([[lat, lon] for lat, lon in polygon.exterior.coords[:-1]])
     
     new_zone = Zone(
         name=zone.name,
-        geometry_coords=geo_str
+        geometry_coords=geo_str,
+        priority=zone.priority
     )
     db.add(new_zone)
+    await db.flush()
+    for other_id, relation, new_share, other_share in existing.relations_for(polygon):
+        db.add(models.ZoneRelation(zone_id=new_zone.id, other_zone_id=other_id, relation=relation, overlap_fraction=new_share))
+        db.add(models.ZoneRelation(zone_id=other_id, other_zone_id=new_zone.id, relation=relation, overlap_fraction=other_share))
+    # Every other API process drops its zone caches once this commits
+    await invalidation.notify(db, invalidation.ZONES, new_zone.id)
     await db.commit()
     await db.refresh(new_zone)
+    zones.invalidate()
     
     return ZoneResponse(
         id=new_zone.id,
         name=new_zone.name,
-        coordinates=json.loads(new_zone.geometry_coords)
+        coordinates=json.loads(new_zone.geometry_coords),
+        priority=new_zone.priority
     )
 
-@app.get("/zones", response_model=list[ZoneResponse])
-async def read_zones(db: AsyncSession = Depends(get_db)):
+@app.get("/zones", response_model=list[ZoneResponse], dependencies=[Depends(etags.conditional(invalidation.ZONES))])
+async def read_zones(include_geometry: bool = True, db: AsyncSession = Depends(get_db)):
+    if not include_geometry:
+        result = await db.execute(select(Zone.id, Zone.name, Zone.priority))
+        return [ZoneResponse(id=zone_id, name=name, priority=priority) for zone_id, name, priority in result.all()]
     result = await db.execute(select(Zone))
-    zones = result.scalars().all()
     return [
         ZoneResponse(
             id=z.id,
             name=z.name,
-            coordinates=json.loads(z.geometry_coords)
-        ) for z in zones
+            coordinates=json.loads(z.geometry_coords),
+            priority=z.priority
+        ) for z in result.scalars().all()
     ]
 
 # Vehicle Endpoints
@@ -614,6 +851,7 @@ async def create_vehicle(vehicle: VehicleCreate, db: AsyncSession = Depends(get_
     
     db.add(new_vehicle)
     try:
+        await invalidation.notify(db, invalidation.VEHICLES)
         await db.commit()
         await db.refresh(new_vehicle)
     except Exception as e:
@@ -635,22 +873,16 @@ async def create_vehicle(vehicle: VehicleCreate, db: AsyncSession = Depends(get_
         utilization_percentage=0.0
     )
 
-@app.get("/vehicles", response_model=list[VehicleResponse])
+@app.get("/vehicles", response_model=list[VehicleResponse], dependencies=[Depends(etags.conditional(invalidation.VEHICLES, invalidation.ZONES))])
 async def read_vehicles(db: AsyncSession = Depends(get_db)):
    # Join with Zone
     from sqlalchemy.orm import selectinload
-    result = await db.execute(select(Vehicle).options(selectinload(Vehicle.zone)))
+    result = await db.execute(select(Vehicle).options(selectinload(Vehicle.zone).load_only(Zone.id, Zone.name)))
     vehicles = result.scalars().all()
     
     response = []
     for v in vehicles:
-        zone_resp = None
-        if v.zone:
-            zone_resp = ZoneResponse(
-                id=v.zone.id,
-                name=v.zone.name,
-                coordinates=json.loads(v.zone.geometry_coords)
-            )
+        zone_resp = schemas.ZoneSummary(id=v.zone.id, name=v.zone.name) if v.zone else None
 
         response.append(VehicleResponse(
             id=v.id,
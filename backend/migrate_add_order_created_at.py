@@ -0,0 +1,14 @@
+import asyncio
+from database import engine
+from sqlalchemy import text
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            await conn.execute(text("ALTER TABLE orders ADD COLUMN IF NOT EXISTS created_at TIMESTAMP"))
+            print("Successfully added created_at column to orders table.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,14 @@
+import asyncio
+from database import engine
+from sqlalchemy import text
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_assigned_vehicle_id ON orders (assigned_vehicle_id)"))
+            print("Successfully added assigned_vehicle_id index to orders table.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
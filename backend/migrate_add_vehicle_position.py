@@ -0,0 +1,16 @@
+import asyncio
+from database import engine
+from sqlalchemy import text
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            await conn.execute(text("ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS last_latitude DOUBLE PRECISION"))
+            await conn.execute(text("ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS last_longitude DOUBLE PRECISION"))
+            await conn.execute(text("ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS last_position_at TIMESTAMP"))
+            print("Successfully added position columns to vehicles table.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
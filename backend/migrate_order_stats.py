@@ -0,0 +1,19 @@
+import asyncio
+from database import engine, Base
+from sqlalchemy import text
+import models
+import stats
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            await conn.run_sync(Base.metadata.create_all, tables=[models.OrderStat.__table__])
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_role_status ON users (role, status)"))
+            for statement in stats.REBUILD_SQL:
+                await conn.execute(statement)
+            print("Successfully seeded order_stats from existing orders.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
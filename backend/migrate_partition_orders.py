@@ -0,0 +1,47 @@
+"""Convert orders into a table partitioned into orders_hot / orders_cold.
+
+Copies every row into the new table in one transaction; stop the API and
+workers first. Existing orders land in orders_hot and are moved to
+orders_cold by the archiver once delivered long enough.
+"""
+import asyncio
+from database import engine, Base
+from sqlalchemy import text
+import models
+import archive
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            partitioned = (await conn.execute(text(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'orders'::regclass"
+            ))).scalar()
+            if partitioned:
+                print("orders is already partitioned.")
+                return
+
+            # Move the old table (and the names it owns) out of the way
+            await conn.execute(text("ALTER TABLE orders RENAME TO orders_unpartitioned"))
+            await conn.execute(text("ALTER TABLE orders_unpartitioned RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey"))
+            await conn.execute(text("ALTER TABLE orders_unpartitioned ALTER COLUMN id DROP DEFAULT"))
+            await conn.execute(text("DROP SEQUENCE IF EXISTS orders_id_seq"))
+            for index in ("ix_orders_id", "ix_orders_assigned_vehicle_id", "ix_orders_status_delivered_at"):
+                await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+            await conn.run_sync(Base.metadata.create_all, tables=[models.Order.__table__])
+            await archive.ensure_partitions(conn)
+
+            columns = ", ".join(
+                c.name for c in models.Order.__table__.columns if c.name not in ("archived", "delivered_at")
+            )
+            await conn.execute(text("ALTER TABLE orders_unpartitioned ADD COLUMN IF NOT EXISTS created_at TIMESTAMP"))
+            await conn.execute(text(f"INSERT INTO orders ({columns}, archived) SELECT {columns}, false FROM orders_unpartitioned"))
+            await conn.execute(text("SELECT setval('orders_id_seq', COALESCE((SELECT max(id) FROM orders), 0) + 1, false)"))
+            await conn.execute(text("DROP TABLE orders_unpartitioned"))
+            print("Successfully partitioned orders into orders_hot / orders_cold.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,37 @@
+import asyncio
+from database import engine, Base
+from sqlalchemy import text
+import models
+import zones
+
+async def migrate():
+    async with engine.begin() as conn:
+        try:
+            await conn.execute(text("ALTER TABLE zones ADD COLUMN IF NOT EXISTS priority INTEGER NOT NULL DEFAULT 0"))
+            await conn.run_sync(Base.metadata.create_all, tables=[models.ZoneRelation.__table__])
+            await conn.execute(text("DELETE FROM zone_relations"))
+
+            # Add zones one by one, relating each to the ones before it
+            result = await conn.execute(text("SELECT id, name, geometry_coords FROM zones ORDER BY id"))
+            seen = []
+            pairs = 0
+            for zone_id, name, coords in result.all():
+                try:
+                    polygon = zones.parse_polygon(coords)
+                except Exception as e:
+                    print(f"Skipping zone {name}: {e}")
+                    continue
+                if seen:
+                    for other_id, relation, share, other_share in zones.ZoneIndex(seen).relations_for(polygon):
+                        await conn.execute(
+                            text("INSERT INTO zone_relations (zone_id, other_zone_id, relation, overlap_fraction) VALUES (:a, :b, :r, :f), (:b, :a, :r, :g)"),
+                            {"a": zone_id, "b": other_id, "r": relation, "f": share, "g": other_share},
+                        )
+                        pairs += 1
+                seen.append((zone_id, 0, polygon))
+            print(f"Successfully computed {pairs} zone relations for {len(seen)} zones.")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, Enum, ForeignKey, Index, DateTime, Date
+from datetime import datetime
 from sqlalchemy.orm import relationship
 # from geoalchemy2 import Geometry
 import enum
@@ -21,6 +22,12 @@ class UserStatus(str, enum.Enum):
     REJECTED = "REJECTED"    # Application denied
     SUSPENDED = "SUSPENDED"  # Temporarily disabled
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
 class Company(Base):
     __tablename__ = "companies"
     
@@ -56,6 +63,13 @@ class User(Base):
     # For Drivers
     vehicle = relationship("Vehicle", back_populates="driver", uselist=False)
 
+    # Trigram indexes for the admin directory search (requires pg_trgm)
+    __table_args__ = (
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_role_status", "role", "status"),
+    )
+
 class SavedAddress(Base):
     __tablename__ = "saved_addresses"
     
@@ -80,9 +94,20 @@ class Zone(Base):
     name = Column(String, unique=True, nullable=False)
     # Storing simple list of coords for now: "lat,lng;lat,lng..."
     geometry_coords = Column(String, nullable=False) 
+    # Where zones overlap, the highest priority wins (then the smaller zone)
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
     
     vehicles = relationship("Vehicle", back_populates="zone")
 
+class ZoneRelation(Base):
+    """Precomputed zone neighbourhood, stored in both directions."""
+    __tablename__ = "zone_relations"
+
+    zone_id = Column(Integer, ForeignKey("zones.id"), primary_key=True)
+    other_zone_id = Column(Integer, ForeignKey("zones.id"), primary_key=True)
+    relation = Column(String, nullable=False)  # "overlap" or "adjacent"
+    overlap_fraction = Column(Float, nullable=False, default=0.0)  # Share of zone_id's area
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
     
@@ -96,6 +121,11 @@ class Vehicle(Base):
 
     zone_id = Column(Integer, ForeignKey("zones.id"), nullable=True)
     zone = relationship("Zone", back_populates="vehicles")
+
+    # Last position reported by the driver app
+    last_latitude = Column(Float, nullable=True)
+    last_longitude = Column(Float, nullable=True)
+    last_position_at = Column(DateTime, nullable=True)
     
     orders = relationship("Order", back_populates="vehicle")
     trips = relationship("Trip", back_populates="vehicle")
@@ -127,9 +157,11 @@ class TripStop(Base):
     trip = relationship("Trip", back_populates="stops")
 
 class Order(Base):
+    """Partitioned by LIST (archived): orders_hot holds live orders,
+    orders_cold the delivered orders moved out by archive.py."""
     __tablename__ = "orders"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     item_name = Column(String, nullable=True)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
@@ -148,8 +180,125 @@ class Order(Base):
     drop_address = Column(String, nullable=True)
 
     trip_id = Column(Integer, ForeignKey("trips.id"), nullable=True) # Linked Trip
-    assigned_vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=True)
+    assigned_vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    # Partition key; part of the table's primary key, as Postgres requires
+    archived = Column(Boolean, primary_key=True, default=False, server_default="false")
     
     user = relationship("User", back_populates="orders")
     vehicle = relationship("Vehicle", back_populates="orders")
     trip = relationship("Trip", back_populates="orders")
+
+    __table_args__ = (
+        Index("ix_orders_status_delivered_at", "status", "delivered_at"),
+        {"postgresql_partition_by": "LIST (archived)"},
+    )
+    # Ids stay unique across partitions, so the ORM identity is still just id
+    __mapper_args__ = {"primary_key": [id]}
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # Handler name, e.g. "auto_assign_order"
+    payload = Column(String, nullable=False, default="{}")  # JSON string
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    result = Column(String, nullable=True)  # JSON string
+    error = Column(String, nullable=True)
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Workers poll on (status, run_after)
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+class DemandTile(Base):
+    """Order pickups pre-aggregated per geohash cell, per day, at several precisions."""
+    __tablename__ = "demand_tiles"
+
+    precision = Column(Integer, primary_key=True)
+    geohash = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    total_weight_kg = Column(Float, nullable=False, default=0.0)
+    total_volume_m3 = Column(Float, nullable=False, default=0.0)
+    center_lat = Column(Float, nullable=False)
+    center_lon = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_demand_tiles_precision_day", "precision", "day"),
+    )
+
+class OrderStat(Base):
+    """Append-only order counter deltas for the admin dashboard.
+
+    Every order mutation adds a -1 row for the order's old (day, status,
+    vehicle) and a +1 row for the new one; stats.compact() periodically sums
+    rows with the same key into one.
+    """
+    __tablename__ = "order_stats"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)  # Day the order was created
+    status = Column(Enum(OrderStatus), nullable=False)
+    vehicle_id = Column(Integer, nullable=False, default=0)  # 0 = unassigned
+    orders = Column(Integer, nullable=False, default=0)
+    weight_kg = Column(Float, nullable=False, default=0.0)
+    volume_m3 = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index("ix_order_stats_day_status", "day", "status"),
+        Index("ix_order_stats_status_vehicle", "status", "vehicle_id"),
+    )
+
+class OrderEvent(Base):
+    """Append-only order history, range-partitioned by month on created_at.
+
+    No foreign keys, so old partitions can be detached and archived on their
+    own (see order_events.ensure_partitions / detach_partitions_before).
+    """
+    __tablename__ = "order_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)  # Partition key
+    order_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)  # CREATED, ASSIGNED, UNASSIGNED, STATUS_CHANGED, ARCHIVED
+    from_status = Column(Enum(OrderStatus), nullable=True)
+    to_status = Column(Enum(OrderStatus), nullable=True)
+    vehicle_id = Column(Integer, nullable=True)  # Vehicle the event concerns
+    actor_id = Column(Integer, nullable=True)  # None for automatic assignment
+
+    __table_args__ = (
+        Index("ix_order_events_order_time", "order_id", "created_at"),
+        Index("ix_order_events_vehicle_time", "vehicle_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+class IdempotencyKey(Base):
+    """Stored response for a client-supplied Idempotency-Key (see idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    response = Column(String, nullable=True)  # JSON string, written in the same transaction as the order
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Expiry sweeps
+
+class RefreshToken(Base):
+    """Hashed refresh token (see refresh_tokens.py); the client holds "<id>.<secret>"."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(32), primary_key=True)  # Token id: one index lookup per refresh
+    family_id = Column(String(32), nullable=False, index=True)  # Every rotation of one login
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False)  # sha256 of the secret; it is random, so no bcrypt needed
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)  # Set when rotated; a second use means the token leaked
@@ -0,0 +1,213 @@
+import asyncio
+import os
+from datetime import date, datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+
+import models
+from models import Order, OrderEvent, User, Vehicle
+from database import get_db, get_engine
+from auth import get_current_user
+
+router = APIRouter(tags=["Order Events"])
+
+# Monthly partitions are created this far ahead of the current month
+ORDER_EVENTS_MONTHS_AHEAD = int(os.getenv("ORDER_EVENTS_MONTHS_AHEAD", 3))
+# How often the job worker checks that those partitions exist
+ORDER_EVENTS_PARTITION_CHECK_SECONDS = float(os.getenv("ORDER_EVENTS_PARTITION_CHECK_SECONDS", 6 * 3600))
+
+
+def record(db: AsyncSession, order: Order, before: Optional[tuple] = None, actor_id: Optional[int] = None):
+    """Append history rows for an order change to the caller's transaction.
+
+    before is stats.snapshot(order) taken before the change, or None for a
+    new order. Rows are only added to the session, so everything recorded in
+    one transaction goes out in a single batched INSERT at flush.
+    """
+    now = datetime.utcnow()
+    status, vehicle_id = order.status, order.assigned_vehicle_id
+
+    def add(event_type, from_status, to_status, vid):
+        db.add(OrderEvent(
+            created_at=now, order_id=order.id, event_type=event_type,
+            from_status=from_status, to_status=to_status, vehicle_id=vid, actor_id=actor_id,
+        ))
+
+    if before is None:
+        add("CREATED", None, status, vehicle_id)
+        return
+    old_status, old_vehicle_id = before
+    if old_vehicle_id != vehicle_id:
+        # A reassignment shows up on both vehicles' timelines
+        if old_vehicle_id:
+            add("UNASSIGNED", old_status, status, old_vehicle_id)
+        if vehicle_id:
+            add("ASSIGNED", old_status, status, vehicle_id)
+    elif old_status != status:
+        add("STATUS_CHANGED", old_status, status, vehicle_id)
+
+
+# Partition maintenance
+
+def _month_start(d: date, offset: int = 0) -> date:
+    months = d.year * 12 + d.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"order_events_y{month.year}m{month.month:02d}"
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int = ORDER_EVENTS_MONTHS_AHEAD):
+    """Create monthly partitions from this month to months_ahead, plus a
+    default partition as a safety net so an insert never fails.
+
+    Postgres refuses to create a partition while the default partition holds
+    rows in its range, so for a month that already spilled into the default
+    the default is detached, the partition created, those rows moved into it
+    and the default attached again, all in the caller's transaction.
+    """
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS order_events_default PARTITION OF order_events DEFAULT"))
+    this_month = _month_start(datetime.utcnow().date())
+    for offset in range(months_ahead + 1):
+        start, end = _month_start(this_month, offset), _month_start(this_month, offset + 1)
+        name = partition_name(start)
+        if (await conn.execute(text(f"SELECT to_regclass('{name}')"))).scalar() is not None:
+            continue
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        spilled = (await conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM order_events_default WHERE created_at >= :start AND created_at < :end)"
+        ), {"start": start, "end": end})).scalar()
+        if not spilled:
+            await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF order_events FOR VALUES {bounds}"))
+            continue
+        await conn.execute(text("ALTER TABLE order_events DETACH PARTITION order_events_default"))
+        await conn.execute(text(f"CREATE TABLE {name} PARTITION OF order_events FOR VALUES {bounds}"))
+        moved = await conn.execute(text(
+            "WITH moved AS ("
+            " DELETE FROM order_events_default WHERE created_at >= :start AND created_at < :end RETURNING *"
+            ") INSERT INTO order_events SELECT * FROM moved"
+        ), {"start": start, "end": end})
+        await conn.execute(text("ALTER TABLE order_events ATTACH PARTITION order_events_default DEFAULT"))
+        print(f"Moved {moved.rowcount} order events from order_events_default to {name}")
+    stray = (await conn.execute(text("SELECT count(*) FROM order_events_default"))).scalar()
+    if stray:
+        print(f"Warning: {stray} order events outside the monthly partitions are in order_events_default")
+
+
+async def run_partition_maintainer(stop: asyncio.Event, interval_seconds: float = ORDER_EVENTS_PARTITION_CHECK_SECONDS):
+    """Keep creating partitions ahead in a long-running process, so months
+    never start without one."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with get_engine().begin() as conn:
+                await ensure_partitions(conn)
+        except Exception as e:
+            print(f"Order events partition maintenance error: {e}")
+
+
+async def detach_partitions_before(conn: AsyncConnection, month: date) -> list[str]:
+    """Detach every monthly partition that ends on or before `month`.
+
+    Detached partitions become ordinary tables with the same name, ready to
+    be dumped (pg_dump -t) and dropped without touching live history.
+    """
+    result = await conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'order_events' AND c.relname LIKE 'order_events_y%'
+        ORDER BY c.relname
+    """))
+    cutoff = partition_name(_month_start(month))
+    detached = []
+    for (name,) in result.all():
+        if name < cutoff:  # Names sort chronologically
+            await conn.execute(text(f"ALTER TABLE order_events DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+
+# Schemas
+class OrderEventResponse(BaseModel):
+    id: int
+    order_id: int
+    event_type: str
+    from_status: Optional[models.OrderStatus] = None
+    to_status: Optional[models.OrderStatus] = None
+    vehicle_id: Optional[int] = None
+    actor_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Endpoints
+
+@router.get("/orders/{order_id}/events", response_model=List[OrderEventResponse])
+async def get_order_timeline(
+    order_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    result = await db.execute(select(Order).where(Order.id == order_id))
+    order = result.scalars().first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if current_user.role != models.UserRole.SUPER_ADMIN and order.user_id != current_user.id:
+        if not (current_user.vehicle and order.assigned_vehicle_id == current_user.vehicle.id):
+            raise HTTPException(status_code=403, detail="Not authorized to view this order")
+
+    result = await db.execute(
+        select(OrderEvent)
+        .where(OrderEvent.order_id == order_id)
+        .order_by(OrderEvent.created_at, OrderEvent.id)
+    )
+    return result.scalars().all()
+
+
+@router.get("/vehicles/{vehicle_id}/events", response_model=List[OrderEventResponse])
+async def get_vehicle_timeline(
+    vehicle_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Newest first. Page back by passing the last event's created_at as
+    `until` and its id as `before_id`; events sharing that timestamp (one
+    batch assignment writes many) are then not skipped."""
+    result = await db.execute(select(Vehicle).where(Vehicle.id == vehicle_id))
+    vehicle = result.scalars().first()
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    if current_user.role != models.UserRole.SUPER_ADMIN and vehicle.driver_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this vehicle")
+
+    # Bounds on created_at let Postgres prune partitions outside the window
+    query = select(OrderEvent).where(OrderEvent.vehicle_id == vehicle_id)
+    if since:
+        query = query.where(OrderEvent.created_at >= since)
+    if until and before_id is not None:
+        # Keyset on (created_at, id); the plain bound keeps partition pruning
+        query = query.where(
+            OrderEvent.created_at <= until,
+            tuple_(OrderEvent.created_at, OrderEvent.id) < tuple_(until, before_id),
+        )
+    elif until:
+        query = query.where(OrderEvent.created_at < until)
+    result = await db.execute(query.order_by(OrderEvent.created_at.desc(), OrderEvent.id.desc()).limit(limit))
+    return result.scalars().all()
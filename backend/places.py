@@ -0,0 +1,151 @@
+import asyncio
+import difflib
+import re
+from typing import Optional
+
+from sqlalchemy import select, func, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Trip, TripStop
+import invalidation
+
+SUGGEST_TOP_K = 10
+
+
+def normalize(name: str) -> str:
+    """Case/space-insensitive key used for both indexing and trip matching.
+
+    lower() rather than casefold() so normalized_sql computes the same key.
+    """
+    return re.sub(r"\s+", " ", name or "").strip().lower()
+
+
+def normalized_sql(column):
+    """normalize() as a SQL expression, for filtering on place-name columns."""
+    return func.lower(func.btrim(func.regexp_replace(column, r"\s+", " ", "g")))
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # Up to SUGGEST_TOP_K (-weight, key), best first
+
+
+class PlaceIndex:
+    """Prefix trie over place names with the top-k completions cached on every
+    node, so a suggest call costs one walk down the prefix.
+
+    Weight is the number of trips that pass through a place; names only known
+    from the pincode directory carry weight 0 and rank after real routes.
+    """
+
+    def __init__(self, k: int = SUGGEST_TOP_K):
+        self.k = k
+        self.root = _Node()
+        self.weights = {}   # key -> weight
+        self.display = {}   # key -> name as first seen
+
+    def __len__(self):
+        return len(self.weights)
+
+    def add(self, name: str, weight: int = 1):
+        key = normalize(name)
+        if not key:
+            return
+        self.display.setdefault(key, name.strip())
+        self.weights[key] = self.weights.get(key, 0) + weight
+        entry = (-self.weights[key], key)
+
+        node = self.root
+        self._offer(node, key, entry)
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            self._offer(node, key, entry)
+
+    def _offer(self, node: _Node, key: str, entry: tuple):
+        top = [e for e in node.top if e[1] != key]
+        top.append(entry)
+        top.sort()
+        node.top = top[: self.k]
+
+    def suggest(self, prefix: str, limit: Optional[int] = None) -> list[dict]:
+        node = self.root
+        for ch in normalize(prefix):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [
+            {"name": self.display[key], "trips": -neg_weight}
+            for neg_weight, key in node.top[: limit or self.k]
+        ]
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Best known key for user input: exact, then prefix, then close spelling."""
+        key = normalize(name)
+        if key in self.weights:
+            return key
+        matches = self.suggest(key, 1)
+        if matches:
+            return normalize(matches[0]["name"])
+        close = difflib.get_close_matches(key, self.weights.keys(), n=1, cutoff=0.8)
+        return close[0] if close else None
+
+
+_index: Optional[PlaceIndex] = None
+_index_lock = asyncio.Lock()
+_generation = 0  # Bumped by invalidate()
+
+
+async def get_index(db: AsyncSession) -> PlaceIndex:
+    """Build the index from all trips (and known cities) on first use."""
+    global _index
+    if _index is None:
+        async with _index_lock:
+            if _index is None:
+                generation = _generation
+                index = await build_index(db)
+                # A trip notified while building may be missing: use, don't keep
+                if generation != _generation:
+                    return index
+                _index = index
+    return _index
+
+
+async def build_index(db: AsyncSession) -> PlaceIndex:
+    index = PlaceIndex()
+
+    names = union_all(
+        select(TripStop.location_name.label("name"), TripStop.trip_id.label("trip_id")),
+        select(Trip.source.label("name"), Trip.id.label("trip_id")),
+        select(Trip.destination.label("name"), Trip.id.label("trip_id")),
+    ).subquery()
+    result = await db.execute(
+        select(names.c.name, func.count(func.distinct(names.c.trip_id))).group_by(names.c.name)
+    )
+    for name, trips in result.all():
+        index.add(name, trips)
+
+    # Known cities from the offline pincode directory, if it is loaded
+    import geocoding
+    geo = await asyncio.to_thread(geocoding.get_index)
+    for city in {geo.strings[i] for i in geo.office_district}:
+        index.add(city, 0)
+    return index
+
+
+@invalidation.on(invalidation.TRIPS)
+def invalidate(payload: str = ""):
+    """A trip was created in another process; rebuild from the DB on next use."""
+    global _index, _generation
+    _index = None
+    _generation += 1
+
+
+def record_trip(source: str, destination: str, stop_names: list[str]):
+    """Keep a built index current after a trip is created."""
+    if _index is None:
+        return  # Next get_index() reads it from the DB anyway
+    for name in {normalize(n): n for n in [source, destination, *stop_names]}.values():
+        _index.add(name, 1)
@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from auth import get_current_admin
+
+router = APIRouter(prefix="/pricing", tags=["Pricing"])
+
+RATE_TABLES_PATH = os.getenv(
+    "RATE_TABLES_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "rate_tables.json"),
+)
+RATE_TABLES_CHECK_SECONDS = float(os.getenv("RATE_TABLES_CHECK_SECONDS", 5))
+
+# Used when no rate table file exists. Bands are [up_to, value]; the last
+# band applies to everything above it.
+DEFAULT_RATE_TABLES = {
+    "base_fare": 300.0,
+    "min_charge": 500.0,
+    "volumetric_kg_per_m3": 250.0,  # Road freight: 1 m3 is charged as 250 kg
+    "per_km": [[50, 14.0], [300, 11.0], [1000, 9.0], [1e9, 8.0]],
+    "per_kg": [[100, 2.0], [500, 1.5], [2000, 1.2], [1e9, 1.0]],
+    # Fraction of the vehicle already booked on the trip -> multiplier
+    "occupancy": [[0.5, 1.0], [0.8, 1.1], [0.95, 1.25], [1e9, 1.5]],
+    # "from_zone_id:to_zone_id" -> multiplier
+    "zone_pairs": {},
+}
+
+
+class RateCard:
+    """Rate tables compiled into sorted NumPy band arrays.
+
+    Immutable once built; a reload builds a new card and swaps the module
+    reference, so in-flight quotes always see one consistent version.
+    """
+
+    def __init__(self, tables: dict, version: str):
+        self.version = version
+        self.base_fare = float(tables["base_fare"])
+        self.min_charge = float(tables["min_charge"])
+        self.volumetric = float(tables["volumetric_kg_per_m3"])
+        self.km_edges, self.km_rates = _compile_bands(tables["per_km"])
+        self.kg_edges, self.kg_rates = _compile_bands(tables["per_kg"])
+        self.occ_edges, self.occ_mult = _compile_bands(tables["occupancy"])
+        self.zone_pairs = {
+            tuple(int(z) for z in k.split(":")): float(v)
+            for k, v in tables.get("zone_pairs", {}).items()
+        }
+
+    def quote(self, distance_km, weight_kg, volume_m3, occupancy=None, zone_pairs=None) -> np.ndarray:
+        """Price n shipments at once; every argument is a length-n array (or scalar)."""
+        distance_km = np.asarray(distance_km, dtype=np.float64)
+        chargeable = np.maximum(
+            np.asarray(weight_kg, dtype=np.float64),
+            np.asarray(volume_m3, dtype=np.float64) * self.volumetric,
+        )
+        price = (
+            self.base_fare
+            + self.km_rates[np.searchsorted(self.km_edges, distance_km)] * distance_km
+            + self.kg_rates[np.searchsorted(self.kg_edges, chargeable)] * chargeable
+        )
+        if occupancy is not None:
+            price = price * self.occ_mult[np.searchsorted(self.occ_edges, np.asarray(occupancy, dtype=np.float64))]
+        if zone_pairs is not None and self.zone_pairs:
+            price = price * np.array([self.zone_pairs.get(p, 1.0) for p in zone_pairs])
+        return np.round(np.maximum(price, self.min_charge), 2)
+
+
+def _compile_bands(bands) -> tuple[np.ndarray, np.ndarray]:
+    bands = sorted((float(upto), float(value)) for upto, value in bands)
+    if not bands:
+        raise ValueError("Rate band table is empty")
+    edges = np.array([b[0] for b in bands])
+    values = np.array([b[1] for b in bands] + [bands[-1][1]])  # Past the last edge: last value
+    return edges, values
+
+
+_card: Optional[RateCard] = None
+_card_mtime: Optional[float] = None
+_last_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def load_rate_card() -> RateCard:
+    """Read and compile the rate tables, then swap them in."""
+    global _card, _card_mtime
+    with _reload_lock:
+        if os.path.exists(RATE_TABLES_PATH):
+            mtime = os.path.getmtime(RATE_TABLES_PATH)
+            with open(RATE_TABLES_PATH) as f:
+                tables = {**DEFAULT_RATE_TABLES, **json.load(f)}
+            card = RateCard(tables, version=f"file:{int(mtime)}")
+        else:
+            mtime = None
+            card = RateCard(DEFAULT_RATE_TABLES, version="default")
+        _card, _card_mtime = card, mtime
+        return card
+
+
+def get_rate_card() -> RateCard:
+    """Current card; picks up edits to the rate file within RATE_TABLES_CHECK_SECONDS."""
+    global _last_check
+    if _card is None:
+        return load_rate_card()
+    now = time.monotonic()
+    if now - _last_check >= RATE_TABLES_CHECK_SECONDS:
+        _last_check = now
+        mtime = os.path.getmtime(RATE_TABLES_PATH) if os.path.exists(RATE_TABLES_PATH) else None
+        if mtime != _card_mtime:
+            try:
+                return load_rate_card()
+            except Exception as e:
+                # Keep serving the last good card
+                print(f"Rate table reload failed: {e}")
+    return _card
+
+
+# Schemas
+class QuoteRequest(BaseModel):
+    distance_km: float
+    weight_kg: float
+    volume_m3: float = 0.0
+    occupancy: Optional[float] = None  # 0..1, share of the trip segment already booked
+    from_zone_id: Optional[int] = None
+    to_zone_id: Optional[int] = None
+
+
+class BatchQuoteResponse(BaseModel):
+    rate_version: str
+    prices: List[float]
+
+
+# Endpoints
+
+@router.post("/quotes", response_model=BatchQuoteResponse)
+def batch_quote(requests: List[QuoteRequest]):
+    card = get_rate_card()
+    if not requests:
+        return {"rate_version": card.version, "prices": []}
+    prices = card.quote(
+        [r.distance_km for r in requests],
+        [r.weight_kg for r in requests],
+        [r.volume_m3 for r in requests],
+        occupancy=[r.occupancy or 0.0 for r in requests],
+        zone_pairs=[(r.from_zone_id, r.to_zone_id) for r in requests],
+    )
+    return {"rate_version": card.version, "prices": prices.tolist()}
+
+
+@router.post("/reload")
+def reload_rates(admin=Depends(get_current_admin)):
+    try:
+        card = load_rate_card()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rate tables: {e}")
+    return {"rate_version": card.version}
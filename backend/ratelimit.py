@@ -0,0 +1,173 @@
+"""Token-bucket rate limiting per user (from the JWT) or per client IP.
+
+Limits are (tokens per second, burst) per "METHOD /path"; "*" applies to
+every other route. Override or add routes with RATE_LIMITS, a JSON object
+such as {"POST /trips/search": [5, 20], "GET /zones": null} (null lifts the
+limit). Buckets live in each API process unless RATE_LIMIT_REDIS_URL points
+at a Redis server, in which case all processes share them.
+"""
+import json
+import math
+import os
+import time
+from typing import Optional
+
+from jose import JWTError
+from starlette.responses import JSONResponse
+
+from auth import decode_token
+
+DEFAULT_RATE_LIMITS = {
+    # bcrypt on every attempt
+    "POST /token": (0.2, 5),
+    "POST /driver/login": (0.2, 5),
+    "POST /driver/signup": (0.05, 3),
+    # Scans every trip
+    "POST /trips/search": (2, 10),
+    # Probes
+    "GET /healthz": None,
+    "GET /readyz": None,
+    "*": (20, 60),
+}
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Only behind a proxy that sets it; otherwise clients could pick their own key
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# Idle buckets are dropped once a process tracks this many keys
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+
+
+def load_limits() -> dict:
+    limits = dict(DEFAULT_RATE_LIMITS)
+    overrides = os.getenv("RATE_LIMITS")
+    if overrides:
+        for route, limit in json.loads(overrides).items():
+            limits[route] = tuple(limit) if limit else None
+    return limits
+
+
+class TokenBuckets:
+    """In-process buckets: key -> [tokens, last refill time]."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def take(self, key, rate: float, burst: float) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [burst - 1, now, rate, burst]
+            return 0.0
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def _prune(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        self._buckets = {
+            key: b for key, b in self._buckets.items()
+            if b[0] + (now - b[1]) * b[2] < b[3]
+        }
+
+
+# Same algorithm in Redis, atomic per key. Returns the wait in milliseconds.
+_REDIS_TAKE = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(b[1]) or burst
+local last = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + (now - last) / 1000 * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = math.ceil((1 - tokens) / rate * 1000) end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return wait
+"""
+
+
+class RedisTokenBuckets:
+    """Buckets shared by every API process through one Redis server."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+
+    async def take(self, key, rate: float, burst: float) -> float:
+        wait_ms = await self._take(keys=["ratelimit:" + ":".join(map(str, key))], args=[rate, burst, int(time.time() * 1000)])
+        return int(wait_ms) / 1000
+
+
+class RateLimitMiddleware:
+    """Plain ASGI middleware, so allowed requests pay a dict lookup and a bucket update."""
+
+    def __init__(self, app, limits: Optional[dict] = None, redis_url: Optional[str] = RATE_LIMIT_REDIS_URL):
+        self.app = app
+        self.limits = load_limits() if limits is None else limits
+        self.default = self.limits.get("*")
+        self.local = TokenBuckets()
+        self.shared = None
+        if redis_url:
+            try:
+                self.shared = RedisTokenBuckets(redis_url)
+            except ImportError:
+                print("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; limiting per process")
+
+    def _subject(self, token: str) -> Optional[str]:
+        # Shares auth's verified-token cache, so get_current_user won't check the signature again
+        try:
+            return decode_token(token).get("sub")
+        except JWTError:
+            return None
+
+    def _client_key(self, scope) -> str:
+        headers = dict(scope["headers"])
+        auth = headers.get(b"authorization")
+        if auth and auth[:7].lower() == b"bearer ":
+            subject = self._subject(auth[7:].decode("latin-1"))
+            if subject:
+                return "user:" + subject
+        if RATE_LIMIT_TRUST_FORWARDED and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = scope["method"] + " " + scope["path"]
+        if route in self.limits:
+            limit = self.limits[route]  # None: unlimited
+        else:
+            limit, route = self.default, "*"
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        key = (route, self._client_key(scope))
+        wait = 0.0
+        if self.shared is not None:
+            try:
+                wait = await self.shared.take(key, *limit)
+            except Exception as e:
+                # Redis down: keep limiting, per process
+                print(f"Rate limit Redis error: {e}")
+                wait = self.local.take(key, *limit)
+        else:
+            wait = self.local.take(key, *limit)
+        if wait > 0:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            return await response(scope, receive, send)
+        return await self.app(scope, receive, send)
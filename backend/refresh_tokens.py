@@ -0,0 +1,125 @@
+"""Rotating refresh tokens.
+
+A refresh token is "<id>.<secret>". Only the sha256 of the secret is stored:
+the secret is 32 random bytes, so a fast hash is as safe as bcrypt here and
+a refresh costs one primary-key lookup instead of a password check. Every
+refresh marks the token used and issues the next one in the same family; a
+used token presented again after REFRESH_REUSE_GRACE_SECONDS means it was
+copied, so the whole family (that login) is revoked.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import RefreshToken
+
+# Counted from the last refresh, so an active client stays logged in
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+# Used tokens are kept this long to detect replays, then purged
+REFRESH_REUSE_WINDOW_HOURS = int(os.getenv("REFRESH_REUSE_WINDOW_HOURS", 24))
+# A token used this recently is still accepted, so two browser tabs (or a
+# retried request whose response was lost) refreshing with the same token
+# don't end the login
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 30))
+REFRESH_PURGE_SECONDS = float(os.getenv("REFRESH_PURGE_SECONDS", 3600))
+
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _invalid():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def issue(db: AsyncSession, user_id: int, family_id: Optional[str] = None) -> str:
+    """Add a new refresh token to the caller's transaction and return it."""
+    token_id = secrets.token_urlsafe(12)
+    secret = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        id=token_id,
+        family_id=family_id or token_id,
+        user_id=user_id,
+        token_hash=_hash(secret),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return f"{token_id}.{secret}"
+
+
+async def _find(db: AsyncSession, token: str) -> Optional[RefreshToken]:
+    token_id, _, secret = token.partition(".")
+    result = await db.execute(select(RefreshToken).where(RefreshToken.id == token_id).with_for_update())
+    row = result.scalars().first()
+    if row is None or not hmac.compare_digest(row.token_hash, _hash(secret)):
+        return None
+    return row
+
+
+async def rotate(db: AsyncSession, token: str) -> tuple[int, str]:
+    """Use up token and return (user id, next refresh token); the caller commits.
+
+    The row lock makes two concurrent refreshes with one token run one after
+    the other, so the second one sees the token as used: within the grace
+    window it gets a token of its own, after it the login is revoked.
+    """
+    row = await _find(db, token)
+    now = datetime.utcnow()
+    if row is None or row.expires_at <= now:
+        raise _invalid()
+    if row.used_at is not None:
+        if now - row.used_at <= timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+            # Only hashes are stored, so the successor issued then can't be
+            # handed out again; add another token to the same family instead
+            return row.user_id, await issue(db, row.user_id, row.family_id)
+        await db.execute(delete(RefreshToken).where(RefreshToken.family_id == row.family_id))
+        await db.commit()
+        print(f"Refresh token reused for user {row.user_id}; revoked that login")
+        raise _invalid()
+    row.used_at = now
+    return row.user_id, await issue(db, row.user_id, row.family_id)
+
+
+async def revoke(db: AsyncSession, token: str) -> None:
+    """Revoke the login token belongs to; the caller commits."""
+    row = await _find(db, token)
+    if row is not None:
+        await db.execute(delete(RefreshToken).where(RefreshToken.family_id == row.family_id))
+
+
+async def purge(db: AsyncSession) -> int:
+    now = datetime.utcnow()
+    result = await db.execute(
+        delete(RefreshToken).where(or_(
+            RefreshToken.expires_at < now,
+            RefreshToken.used_at < now - timedelta(hours=REFRESH_REUSE_WINDOW_HOURS),
+        ))
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def run_purger(stop: asyncio.Event, interval_seconds: float = REFRESH_PURGE_SECONDS):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with AsyncSessionLocal() as db:
+                await purge(db)
+        except Exception as e:
+            print(f"Refresh token purge error: {e}")
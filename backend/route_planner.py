@@ -0,0 +1,266 @@
+import asyncio
+import time
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from models import Order, User, Vehicle
+from database import get_db
+from auth import get_current_user
+import distance
+
+router = APIRouter(prefix="/vehicles", tags=["Routing"])
+
+MAX_TIME_BUDGET_MS = 5000
+
+
+class RoutePlan:
+    """Pickup-and-delivery sequencing over a precomputed distance matrix.
+
+    Node 0 is the start; every other node is a pickup or a drop. partner[i] is
+    the matching drop of a pickup (or pickup of a drop), -1 if it has none.
+    Routes are open paths starting at node 0.
+    """
+
+    def __init__(self, dist: np.ndarray, is_pickup: np.ndarray, partner: np.ndarray):
+        self.dist = dist
+        self.is_pickup = is_pickup
+        self.partner = partner
+        self.n = len(dist)
+
+    def length(self, route: List[int]) -> float:
+        r = np.asarray(route)
+        return float(self.dist[r[:-1], r[1:]].sum()) if len(r) > 1 else 0.0
+
+    def feasible(self, route: List[int]) -> bool:
+        pos = np.empty(self.n, dtype=np.int64)
+        pos[route] = np.arange(len(route))
+        for node in route[1:]:
+            p = self.partner[node]
+            if p >= 0 and self.is_pickup[node] and pos[node] > pos[p]:
+                return False
+        return True
+
+    def nearest_neighbour(self) -> List[int]:
+        """Greedy: always drive to the closest stop that is currently allowed."""
+        route = [0]
+        visited = np.zeros(self.n, dtype=bool)
+        visited[0] = True
+        # A drop is allowed once its pickup is visited (or it has none)
+        allowed = np.array([
+            i != 0 and (self.is_pickup[i] or self.partner[i] < 0) for i in range(self.n)
+        ])
+        current = 0
+        for _ in range(self.n - 1):
+            d = np.where(allowed & ~visited, self.dist[current], np.inf)
+            nxt = int(np.argmin(d))
+            route.append(nxt)
+            visited[nxt] = True
+            if self.is_pickup[nxt] and self.partner[nxt] >= 0:
+                allowed[self.partner[nxt]] = True
+            current = nxt
+        return route
+
+    def two_opt(self, route: List[int], deadline: float) -> tuple[List[int], bool]:
+        """One pass of best-improvement 2-opt (segment reversal)."""
+        d = self.dist
+        r = np.asarray(route)
+        m = len(r)
+        improved = False
+        for i in range(1, m - 1):
+            if time.perf_counter() > deadline:
+                break
+            a, b = r[i - 1], r[i]
+            # Reverse r[i..j]: edges (a,b) and (c,e) become (a,c) and (b,e)
+            j = np.arange(i + 1, m)
+            c = r[j]
+            e = np.append(r[j[:-1] + 1], -1)
+            tail = np.where(e >= 0, d[b, np.maximum(e, 0)] - d[c, np.maximum(e, 0)], 0.0)
+            delta = d[a, c] - d[a, b] + tail
+            for k in np.argsort(delta):
+                if delta[k] >= -1e-9:
+                    break
+                jj = int(j[k])
+                candidate = np.concatenate([r[:i], r[i:jj + 1][::-1], r[jj + 1:]])
+                if self.feasible(candidate.tolist()):
+                    r = candidate
+                    improved = True
+                    break
+        return r.tolist(), improved
+
+    def or_opt(self, route: List[int], deadline: float) -> tuple[List[int], bool]:
+        """One pass of moving chains of 1-3 consecutive stops elsewhere."""
+        d = self.dist
+        improved = False
+        for seg_len in (1, 2, 3):
+            i = 1
+            while i + seg_len <= len(route):
+                if time.perf_counter() > deadline:
+                    return route, improved
+                seg = route[i:i + seg_len]
+                prev = route[i - 1]
+                nxt = route[i + seg_len] if i + seg_len < len(route) else None
+                removal_gain = d[prev, seg[0]] - (d[prev, nxt] if nxt is not None else 0.0)
+                if nxt is not None:
+                    removal_gain += d[seg[-1], nxt]
+                rest = route[:i] + route[i + seg_len:]
+                r = np.asarray(rest)
+                # Insert between rest[p] and rest[p+1] (or at the end)
+                a = r
+                b = np.append(r[1:], -1)
+                insert_cost = d[a, seg[0]] + np.where(b >= 0, d[seg[-1], np.maximum(b, 0)] - d[a, np.maximum(b, 0)], 0.0)
+                delta = insert_cost - removal_gain
+                delta[i - 1] = np.inf  # Same place it came from
+                moved = False
+                for p in np.argsort(delta):
+                    if delta[p] >= -1e-9:
+                        break
+                    candidate = rest[:p + 1] + seg + rest[p + 1:]
+                    if self.feasible(candidate):
+                        route = candidate
+                        improved = moved = True
+                        break
+                if not moved:
+                    i += 1
+        return route, improved
+
+    def solve(self, time_budget_ms: float) -> List[int]:
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+        route = self.nearest_neighbour()
+        self.initial_length = self.length(route)
+        while time.perf_counter() < deadline:
+            route, improved_2opt = self.two_opt(route, deadline)
+            route, improved_oropt = self.or_opt(route, deadline)
+            if not (improved_2opt or improved_oropt):
+                break
+        return route
+
+
+def plan_route(start: tuple[float, float], stops: list[dict], time_budget_ms: float = 500) -> tuple[List[int], np.ndarray, float]:
+    """stops: dicts with latitude, longitude, is_pickup, partner (index into stops or -1).
+
+    Returns the visiting order as indexes into stops, the distance matrix
+    (start at row 0, stop k at row k + 1) and the length of the initial
+    nearest-neighbour route.
+    """
+    lats = np.array([start[0]] + [s["latitude"] for s in stops])
+    lons = np.array([start[1]] + [s["longitude"] for s in stops])
+    dist = distance.distance_matrix_km(lats, lons)
+    is_pickup = np.array([False] + [s["is_pickup"] for s in stops])
+    partner = np.array([-1] + [s["partner"] + 1 if s["partner"] >= 0 else -1 for s in stops])
+    plan = RoutePlan(dist, is_pickup, partner)
+    route = plan.solve(time_budget_ms)
+    return [node - 1 for node in route[1:]], dist, plan.initial_length
+
+
+# Schemas
+class RouteStop(BaseModel):
+    order_id: int
+    stop_type: str  # "pickup" or "drop"
+    latitude: float
+    longitude: float
+    address: Optional[str] = None
+    cumulative_km: float
+    eta_minutes: float
+
+
+class RouteResponse(BaseModel):
+    vehicle_id: int
+    total_distance_km: float
+    initial_distance_km: float  # Nearest-neighbour construction before improvement
+    stops: List[RouteStop]
+
+
+def _parse(loc: Optional[str]) -> Optional[tuple[float, float]]:
+    if not loc:
+        return None
+    try:
+        lat, lon = map(float, loc.split(','))
+    except ValueError:
+        return None
+    return (lat, lon) if (lat or lon) else None
+
+
+# Endpoints
+
+@router.get("/{vehicle_id}/route", response_model=RouteResponse)
+async def get_vehicle_route(
+    vehicle_id: int,
+    start_latitude: Optional[float] = None,
+    start_longitude: Optional[float] = None,
+    time_budget_ms: int = Query(500, ge=10, le=MAX_TIME_BUDGET_MS),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    result = await db.execute(select(Vehicle).where(Vehicle.id == vehicle_id))
+    vehicle = result.scalars().first()
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    if current_user.role != models.UserRole.SUPER_ADMIN and vehicle.driver_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this route")
+
+    result = await db.execute(
+        select(Order)
+        .where(
+            Order.assigned_vehicle_id == vehicle_id,
+            Order.status.in_([models.OrderStatus.ASSIGNED, models.OrderStatus.SHIPPED]),
+            Order.archived.is_(False),
+        )
+        .order_by(Order.id)
+    )
+    orders = result.scalars().all()
+
+    # SHIPPED orders are already on board: only their drop is left
+    stops, meta = [], []
+    for o in orders:
+        pickup, drop = _parse(o.pickup_location), _parse(o.drop_location)
+        pickup_idx = -1
+        if o.status == models.OrderStatus.ASSIGNED and pickup:
+            pickup_idx = len(stops)
+            stops.append({"latitude": pickup[0], "longitude": pickup[1], "is_pickup": True, "partner": -1})
+            meta.append((o, "pickup", o.pickup_address))
+        if drop:
+            stops.append({"latitude": drop[0], "longitude": drop[1], "is_pickup": False, "partner": pickup_idx})
+            meta.append((o, "drop", o.drop_address))
+            if pickup_idx >= 0:
+                stops[pickup_idx]["partner"] = len(stops) - 1
+
+    if not stops:
+        return RouteResponse(vehicle_id=vehicle_id, total_distance_km=0.0, initial_distance_km=0.0, stops=[])
+
+    if start_latitude is not None and start_longitude is not None:
+        start = (start_latitude, start_longitude)
+    else:
+        # No live position: start at the first stop that can be visited first
+        first = next(s for s in stops if s["is_pickup"] or s["partner"] < 0)
+        start = (first["latitude"], first["longitude"])
+
+    # CPU-bound for up to time_budget_ms; keep the event loop free
+    order, dist, initial_km = await asyncio.to_thread(plan_route, start, stops, time_budget_ms)
+
+    response_stops, cumulative, prev = [], 0.0, 0
+    for k in order:
+        cumulative += float(dist[prev, k + 1])
+        prev = k + 1
+        o, stop_type, address = meta[k]
+        response_stops.append(RouteStop(
+            order_id=o.id,
+            stop_type=stop_type,
+            latitude=stops[k]["latitude"],
+            longitude=stops[k]["longitude"],
+            address=address,
+            cumulative_km=round(cumulative, 2),
+            eta_minutes=round(float(distance.eta_minutes(cumulative, handling=False)) + distance.HANDLING_MINUTES * len(response_stops), 1),
+        ))
+
+    return RouteResponse(
+        vehicle_id=vehicle_id,
+        total_distance_km=round(cumulative, 2),
+        initial_distance_km=round(initial_km, 2),
+        stops=response_stops,
+    )
@@ -1,11 +1,15 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from models import UserRole, OrderStatus, UserStatus
 
 # Auth Schemas
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -86,14 +90,23 @@ class ZoneBase(BaseModel):
     coordinates: List[Any] 
 
 class ZoneCreate(ZoneBase):
-    pass
+    priority: int = 0
 
 class ZoneResponse(ZoneBase):
     id: int
+    coordinates: Optional[List[Any]] = None  # Omitted when listing without geometry
+    priority: int = 0
     
     class Config:
         from_attributes = True
 
+class ZoneSummary(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
 # Vehicle Schemas
 class VehicleBase(BaseModel):
     vehicle_number: str
@@ -108,7 +121,7 @@ class VehicleResponse(VehicleBase):
     id: int
     current_volume_m3: float = 0.0 
     utilization_percentage: float = 0.0
-    zone: Optional[ZoneResponse] = None
+    zone: Optional[ZoneSummary] = None  # Outline via GET /zones/geometry
     
     class Config:
         from_attributes = True
@@ -145,6 +158,9 @@ class OrderResponse(OrderBase):
     
     pickup_address: Optional[str] = None
     drop_address: Optional[str] = None
+    assignment_job_id: Optional[int] = None  # Set when assignment was deferred to the job queue
+    distance_km: Optional[float] = None  # Pickup -> drop road estimate
+    eta_minutes: Optional[float] = None
     
     class Config:
         from_attributes = True
@@ -154,3 +170,27 @@ class AssignOrderRequest(BaseModel):
 
 class OrderStatusUpdate(BaseModel):
     status: OrderStatus
+
+# Admin Bulk Action Schemas
+class BulkUserStatusRequest(BaseModel):
+    action: Literal["approve", "reject", "suspend"]
+    # Either an explicit list of ids or a role/status filter
+    user_ids: Optional[List[int]] = None
+    role: Optional[UserRole] = None
+    status: Optional[UserStatus] = None
+
+class BulkUserOutcome(BaseModel):
+    id: int
+    outcome: str  # "updated", "not_found", "skipped"
+    status: Optional[UserStatus] = None
+    detail: Optional[str] = None
+
+class BulkUserStatusResponse(BaseModel):
+    action: str
+    updated: int
+    results: List[BulkUserOutcome]
+
+class UserDirectoryPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[int] = None  # Pass back as ?cursor= for the next page
+    estimated_total: int
@@ -0,0 +1,20 @@
+"""Run the API with several worker processes.
+
+    python serve.py
+
+Starts WEB_CONCURRENCY uvicorn workers (default: one per CPU) on HOST:PORT.
+Workers share nothing in memory; zone, vehicle, trip and user changes reach
+every worker's caches through Postgres LISTEN/NOTIFY (see invalidation.py).
+Run worker.py separately for background jobs, as with a single process.
+"""
+import os
+
+import uvicorn
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+HOST = os.getenv("HOST", "127.0.0.1")
+PORT = int(os.getenv("PORT", 8000))
+
+if __name__ == "__main__":
+    print(f"Serving on http://{HOST}:{PORT} with {WEB_CONCURRENCY} workers")
+    uvicorn.run("main:app", host=HOST, port=PORT, workers=WEB_CONCURRENCY, access_log=False)
@@ -0,0 +1,233 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from models import Order, OrderStat, User, Vehicle, Zone
+from database import get_db, AsyncSessionLocal
+from auth import get_current_admin
+import assignment
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+STATS_COMPACT_SECONDS = float(os.getenv("STATS_COMPACT_SECONDS", 60))
+# Orders created before order timestamps existed are counted on this day
+LEGACY_DAY = date(1970, 1, 1)
+_COMPACT_LOCK_ID = 7_301_037  # pg advisory lock: one compactor across API processes
+
+
+def order_day(order: Order) -> date:
+    return order.created_at.date() if order.created_at else LEGACY_DAY
+
+
+def snapshot(order: Order) -> tuple:
+    """The parts of an order the counters are keyed on; take it before mutating."""
+    return order.status, order.assigned_vehicle_id
+
+
+def record_change(db: AsyncSession, order: Order, before: Optional[tuple] = None):
+    """Add counter deltas for an order mutation to the caller's transaction.
+
+    before is snapshot(order) from before the change, or None for a new
+    order. Deltas are plain inserts, so concurrent order writes never wait
+    on a shared counter row. The caller must hold the order row lock (or
+    have just created it) so two changes cannot both subtract the same state.
+    """
+    day = order_day(order)
+    after = snapshot(order)
+    if before == after:
+        return
+    if before is not None:
+        status, vehicle_id = before
+        db.add(OrderStat(
+            day=day, status=status, vehicle_id=vehicle_id or 0,
+            orders=-1, weight_kg=-(order.weight_kg or 0.0), volume_m3=-(order.volume_m3 or 0.0),
+        ))
+    status, vehicle_id = after
+    db.add(OrderStat(
+        day=day, status=status, vehicle_id=vehicle_id or 0,
+        orders=1, weight_kg=order.weight_kg or 0.0, volume_m3=order.volume_m3 or 0.0,
+    ))
+
+
+COMPACT_SQL = text("""
+    WITH moved AS (
+        DELETE FROM order_stats
+        WHERE (day, status, vehicle_id) IN (
+            SELECT day, status, vehicle_id FROM order_stats
+            GROUP BY day, status, vehicle_id HAVING count(*) > 1
+        )
+        RETURNING day, status, vehicle_id, orders, weight_kg, volume_m3
+    )
+    INSERT INTO order_stats (day, status, vehicle_id, orders, weight_kg, volume_m3)
+    SELECT day, status, vehicle_id, sum(orders), sum(weight_kg), sum(volume_m3)
+    FROM moved
+    GROUP BY day, status, vehicle_id
+    HAVING sum(orders) <> 0
+""")
+
+# Recount everything from orders; used by the migration to seed the counters
+REBUILD_SQL = [
+    text("LOCK TABLE orders IN SHARE MODE"),
+    text("DELETE FROM order_stats"),
+    text(f"""
+        INSERT INTO order_stats (day, status, vehicle_id, orders, weight_kg, volume_m3)
+        SELECT COALESCE(created_at::date, DATE '{LEGACY_DAY.isoformat()}'), status,
+               COALESCE(assigned_vehicle_id, 0), count(*),
+               COALESCE(sum(weight_kg), 0), COALESCE(sum(volume_m3), 0)
+        FROM orders
+        GROUP BY 1, 2, 3
+    """),
+]
+
+
+async def compact(db: AsyncSession) -> bool:
+    """Collapse delta rows with the same key. Returns False if another process holds the lock."""
+    locked = (await db.execute(text(f"SELECT pg_try_advisory_xact_lock({_COMPACT_LOCK_ID})"))).scalar()
+    if not locked:
+        await db.rollback()
+        return False
+    await db.execute(COMPACT_SQL)
+    await db.commit()
+    return True
+
+
+async def run_compactor(stop: asyncio.Event, interval_seconds: float = STATS_COMPACT_SECONDS):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval_seconds)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with AsyncSessionLocal() as db:
+                await compact(db)
+        except Exception as e:
+            print(f"Stats compaction error: {e}")
+
+
+# Schemas
+class DailyStatusCount(BaseModel):
+    day: date
+    status: models.OrderStatus
+    orders: int
+
+
+class VehicleLoad(BaseModel):
+    vehicle_id: int
+    vehicle_number: str
+    zone_id: Optional[int] = None
+    active_orders: int
+    load_weight_kg: float
+    load_volume_m3: float
+    utilization_percentage: float
+
+
+class ZoneLoad(BaseModel):
+    zone_id: int
+    zone_name: str
+    vehicles: int
+    active_orders: int
+    avg_utilization_percentage: float
+
+
+class DashboardStats(BaseModel):
+    total_orders: int
+    orders_by_status: Dict[str, int]
+    daily: List[DailyStatusCount]
+    vehicles: List[VehicleLoad]
+    zones: List[ZoneLoad]
+    avg_utilization_percentage: float
+    pending_drivers: int
+
+
+# Endpoints
+
+@router.get("/stats", response_model=DashboardStats)
+async def get_dashboard_stats(
+    days: int = Query(14, ge=1, le=366),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    result = await db.execute(
+        select(OrderStat.status, func.sum(OrderStat.orders)).group_by(OrderStat.status)
+    )
+    by_status = {s.value: 0 for s in models.OrderStatus}
+    for status, count in result.all():
+        by_status[status.value] = int(count)
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    result = await db.execute(
+        select(OrderStat.day, OrderStat.status, func.sum(OrderStat.orders))
+        .where(OrderStat.day >= since)
+        .group_by(OrderStat.day, OrderStat.status)
+        .order_by(OrderStat.day)
+    )
+    daily = [
+        DailyStatusCount(day=day, status=status, orders=int(count))
+        for day, status, count in result.all() if count
+    ]
+
+    result = await db.execute(
+        select(OrderStat.vehicle_id, func.sum(OrderStat.orders), func.sum(OrderStat.weight_kg), func.sum(OrderStat.volume_m3))
+        .where(OrderStat.status.in_(assignment.ACTIVE_ORDER_STATUSES), OrderStat.vehicle_id != 0)
+        .group_by(OrderStat.vehicle_id)
+    )
+    loads = {vid: (int(n), float(w), float(v)) for vid, n, w, v in result.all()}
+
+    vehicles = (await db.execute(select(Vehicle).order_by(Vehicle.id))).scalars().all()
+    vehicle_loads = []
+    for v in vehicles:
+        n, w, vol = loads.get(v.id, (0, 0.0, 0.0))
+        util = max(
+            w / v.max_weight_kg if v.max_weight_kg else 0.0,
+            vol / v.max_volume_m3 if v.max_volume_m3 else 0.0,
+        )
+        vehicle_loads.append(VehicleLoad(
+            vehicle_id=v.id,
+            vehicle_number=v.vehicle_number,
+            zone_id=v.zone_id,
+            active_orders=n,
+            load_weight_kg=round(w, 2),
+            load_volume_m3=round(vol, 3),
+            utilization_percentage=round(min(util, 1.0) * 100, 1),
+        ))
+
+    by_zone = defaultdict(list)
+    for vl in vehicle_loads:
+        by_zone[vl.zone_id].append(vl)
+    zones = (await db.execute(select(Zone.id, Zone.name).order_by(Zone.id))).all()
+    zone_loads = []
+    for zone_id, zone_name in zones:
+        members = by_zone[zone_id]
+        zone_loads.append(ZoneLoad(
+            zone_id=zone_id,
+            zone_name=zone_name,
+            vehicles=len(members),
+            active_orders=sum(vl.active_orders for vl in members),
+            avg_utilization_percentage=round(sum(vl.utilization_percentage for vl in members) / len(members), 1) if members else 0.0,
+        ))
+
+    pending_drivers = (await db.execute(
+        select(func.count(User.id)).where(
+            User.role == models.UserRole.DRIVER,
+            User.status == models.UserStatus.PENDING,
+        )
+    )).scalar()
+
+    return DashboardStats(
+        total_orders=sum(by_status.values()),
+        orders_by_status=by_status,
+        daily=daily,
+        vehicles=vehicle_loads,
+        zones=zone_loads,
+        avg_utilization_percentage=round(sum(vl.utilization_percentage for vl in vehicle_loads) / len(vehicle_loads), 1) if vehicle_loads else 0.0,
+        pending_drivers=pending_drivers or 0,
+    )
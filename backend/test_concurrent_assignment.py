@@ -0,0 +1,73 @@
+import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Stress test: many clients create orders in the same zone at once.
+# The zone has one small vehicle; the total weight auto-assigned to it
+# must never exceed its capacity, however the requests interleave.
+
+API_BASE = "http://127.0.0.1:8000"
+PARALLEL = 64
+ORDERS = 256
+VEHICLE_MAX_WEIGHT = 1000.0
+VEHICLE_MAX_VOLUME = 10.0
+ORDER_WEIGHT = 90.0  # At most 11 fit
+
+def login(email, password):
+    resp = requests.post(f"{API_BASE}/token", data={"username": email, "password": password})
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+def test_concurrent_assignment():
+    headers = login("admin@logisoft.com", "admin123")
+    suffix = int(time.time())
+
+    # Isolated zone far from real data, with a single vehicle in it
+    lat, lon = 10.0 + (suffix % 1000) / 1000.0, 60.0
+    zone = requests.post(f"{API_BASE}/zones", headers=headers, json={
+        "name": f"STRESS-ZONE-{suffix}",
+        "coordinates": [[lat - 0.0004, lon - 0.0004], [lat - 0.0004, lon + 0.0004],
+                        [lat + 0.0004, lon + 0.0004], [lat + 0.0004, lon - 0.0004]],
+    }).json()
+    vehicle = requests.post(f"{API_BASE}/vehicles", headers=headers, json={
+        "vehicle_number": f"STRESS-{suffix}",
+        "max_volume_m3": VEHICLE_MAX_VOLUME,
+        "max_weight_kg": VEHICLE_MAX_WEIGHT,
+        "zone_id": zone["id"],
+    }).json()
+    print(f"Zone {zone['id']}, vehicle {vehicle['id']}")
+
+    def place(i):
+        resp = requests.post(f"{API_BASE}/orders", headers=headers, json={
+            "item_name": f"stress-{suffix}-{i}",
+            "length_cm": 10, "width_cm": 10, "height_cm": 10,
+            "weight_kg": ORDER_WEIGHT,
+            "latitude": lat, "longitude": lon,
+        })
+        return resp.status_code, resp.json()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=PARALLEL) as pool:
+        results = list(pool.map(place, range(ORDERS)))
+    elapsed = time.perf_counter() - start
+
+    errors = [r for code, r in results if code != 200]
+    assigned = [r for code, r in results if code == 200 and r["assigned_vehicle_id"] == vehicle["id"]]
+    pending = [r for code, r in results if code == 200 and r["status"] == "PENDING"]
+    total = sum(r["weight_kg"] for r in assigned)
+
+    print(f"{ORDERS} orders with {PARALLEL} clients in {elapsed:.2f}s ({ORDERS / elapsed:.0f} req/s)")
+    print(f"Errors: {len(errors)}")
+    print(f"Assigned to vehicle: {len(assigned)} orders, {total} / {VEHICLE_MAX_WEIGHT} kg")
+    print(f"Left pending: {len(pending)} orders")
+
+    # Under contention SKIP LOCKED with bounded retries may leave an order
+    # PENDING that would have fit, so the assigned count is not checked
+    # exactly; only capacity and that every order is accounted for
+    if total <= VEHICLE_MAX_WEIGHT and not errors and len(assigned) + len(pending) == ORDERS:
+        print("SUCCESS: capacity invariant held.")
+    else:
+        print(f"FAILURE: expected at most {VEHICLE_MAX_WEIGHT} kg assigned and every order assigned or pending.")
+
+if __name__ == "__main__":
+    test_concurrent_assignment()
@@ -1,13 +1,24 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, or_
 from database import get_db
-from models import Trip, TripStop, Vehicle, User, UserRole
+from models import Trip, TripStop, Vehicle, User, UserRole, Order
 from pydantic import BaseModel
 from typing import List, Optional
+import places
+import geocoding
+import distance
+import pricing
+import assignment
+import zones
+import invalidation
 
 router = APIRouter(prefix="/trips", tags=["Trips"])
 
+# Used when the origin or destination cannot be located
+DEFAULT_COST_ESTIMATE = 1500.00
+
 # Schemas
 class TripStopCreate(BaseModel):
     location_name: str
@@ -36,7 +47,9 @@ class TripResponse(BaseModel):
     start_time: str
     available_weight_kg: float
     available_volume_m3: float
-    cost_estimate: float # Mock cost
+    cost_estimate: float
+    distance_km: Optional[float] = None
+    eta_minutes: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -66,59 +79,161 @@ async def create_trip(trip: TripCreate, db: AsyncSession = Depends(get_db)):
         )
         db.add(new_stop)
 
+    await invalidation.notify(db, invalidation.TRIPS, new_trip.id)
     await db.commit()
+    places.record_trip(trip.source, trip.destination, [s.location_name for s in trip.stops])
     return {"message": "Trip scheduled successfully", "trip_id": new_trip.id}
 
+@router.get("/suggest")
+async def suggest_locations(q: str, limit: int = 10, db: AsyncSession = Depends(get_db)):
+    index = await places.get_index(db)
+    return index.suggest(q, min(limit, places.SUGGEST_TOP_K))
+
 @router.post("/search", response_model=List[TripResponse])
 async def search_trips(criteria: TripSearch, db: AsyncSession = Depends(get_db)):
     # Railway Logic:
     # 1. Find trips with Stop A (from) and Stop B (to)
     # 2. Ensure Stop A order < Stop B order
-    # 3. Check Capacity (Simple check against Max Capacity for now, real logic needs live load calc)
+    # 3. Check Capacity left on the requested segment (see _segment_load)
 
-    # Fetch all trips with their stops and vehicle
-    # Inefficient for large DBs but fine for prototype
+    # Resolve free text (case, spacing, typos) to known place names
+    index = await places.get_index(db)
+    from_key = index.resolve(criteria.from_location) or places.normalize(criteria.from_location)
+    to_key = index.resolve(criteria.to_location) or places.normalize(criteria.to_location)
+
+    # Only load trips that touch the origin; route order is checked below
     from sqlalchemy.orm import selectinload
+    from_trip_ids = select(TripStop.trip_id).where(places.normalized_sql(TripStop.location_name) == from_key)
     result = await db.execute(
         select(Trip)
         .options(selectinload(Trip.stops), selectinload(Trip.vehicle))
         .where(Trip.status == "SCHEDULED")
+        .where(or_(Trip.id.in_(from_trip_ids), places.normalized_sql(Trip.source) == from_key))
     )
     all_trips = result.scalars().all()
     
-    matches = []
+    # One distance for the requested segment, shared by every matching trip
+    distance_km, eta, zone_pair = None, None, (None, None)
+    origin = geocoding.place_coordinates(index.display.get(from_key, criteria.from_location))
+    dest = geocoding.place_coordinates(index.display.get(to_key, criteria.to_location))
+    if origin and dest:
+        distance_km = round(await asyncio.to_thread(distance.distance_km, origin[0], origin[1], dest[0], dest[1]), 1)
+        eta = round(float(distance.eta_minutes(distance_km, handling=False)), 0)
+        zone_index = await zones.get_zone_index(db)
+        zone_pair = (zone_index.lookup(*origin), zone_index.lookup(*dest))
+    
+    route_matches = []
     
     for trip in all_trips:
-        # Check Capacity
+        # Check Capacity (upper bound; booked load is subtracted below)
         if trip.vehicle.max_weight_kg < criteria.required_weight_kg:
              continue
         if trip.vehicle.max_volume_m3 < criteria.required_volume_m3:
              continue
              
         # Check Route
-        from_stop = next((s for s in trip.stops if s.location_name.lower() == criteria.from_location.lower()), None)
-        to_stop = next((s for s in trip.stops if s.location_name.lower() == criteria.to_location.lower()), None)
+        from_stop = next((s for s in trip.stops if places.normalize(s.location_name) == from_key), None)
+        to_stop = next((s for s in trip.stops if places.normalize(s.location_name) == to_key), None)
         
         # Also check source/dest match if stops are implicit
-        if not from_stop and trip.source.lower() == criteria.from_location.lower():
+        if not from_stop and places.normalize(trip.source) == from_key:
             from_stop = type('obj', (object,), {'stop_order': 0})
-        if not to_stop and trip.destination.lower() == criteria.to_location.lower():
+        if not to_stop and places.normalize(trip.destination) == to_key:
             to_stop = type('obj', (object,), {'stop_order': 9999})
             
         if from_stop and to_stop:
             if from_stop.stop_order < to_stop.stop_order:
-                # MATCH FOUND
-                matches.append(TripResponse(
-                    id=trip.id,
-                    vehicle_number=trip.vehicle.vehicle_number,
-                    source=trip.source,
-                    destination=trip.destination,
-                    start_time=trip.start_time,
-                    available_weight_kg=trip.vehicle.max_weight_kg, # Simplification
-                    available_volume_m3=trip.vehicle.max_volume_m3,
-                    cost_estimate=1500.00 # Placeholder pricing
-                ))
+                route_matches.append((trip, from_stop.stop_order, to_stop.stop_order))
+    
+    if not route_matches:
+        return []
+    
+    # Space already booked on each matching trip, in one query
+    load_result = await db.execute(
+        select(Order.trip_id, Order.weight_kg, Order.volume_m3, Order.pickup_location, Order.drop_location)
+        .where(Order.trip_id.in_([t.id for t, _, _ in route_matches]), Order.status.in_(assignment.ACTIVE_ORDER_STATUSES), Order.archived.is_(False))
+    )
+    booked = {}
+    for trip_id, w, v, pickup, drop in load_result.all():
+        booked.setdefault(trip_id, []).append((w or 0.0, v or 0.0, pickup, drop))
     
-    return matches
+    candidates = []
+    for trip, seg_from, seg_to in route_matches:
+        used_w, used_v = _segment_load(trip, booked.get(trip.id, []), seg_from, seg_to)
+        free_w = trip.vehicle.max_weight_kg - used_w
+        free_v = trip.vehicle.max_volume_m3 - used_v
+        if free_w < criteria.required_weight_kg or free_v < criteria.required_volume_m3:
+            continue
+        occupancy = max(used_w / trip.vehicle.max_weight_kg if trip.vehicle.max_weight_kg else 0.0,
+                        used_v / trip.vehicle.max_volume_m3 if trip.vehicle.max_volume_m3 else 0.0)
+        candidates.append((trip, free_w, free_v, occupancy))
+    
+    # Price every candidate in one vectorized call
+    prices = [DEFAULT_COST_ESTIMATE] * len(candidates)
+    if distance_km is not None and candidates:
+        prices = pricing.get_rate_card().quote(
+            [distance_km] * len(candidates),
+            [criteria.required_weight_kg] * len(candidates),
+            [criteria.required_volume_m3] * len(candidates),
+            occupancy=[c[3] for c in candidates],
+            zone_pairs=[zone_pair] * len(candidates),
+        ).tolist()
+    
+    return [
+        TripResponse(
+            id=trip.id,
+            vehicle_number=trip.vehicle.vehicle_number,
+            source=trip.source,
+            destination=trip.destination,
+            start_time=trip.start_time,
+            available_weight_kg=free_w,
+            available_volume_m3=free_v,
+            cost_estimate=price,
+            distance_km=distance_km,
+            eta_minutes=eta
+        )
+        for (trip, free_w, free_v, _), price in zip(candidates, prices)
+    ]
+
+def _parse_point(loc: Optional[str]) -> Optional[tuple[float, float]]:
+    try:
+        lat, lon = map(float, loc.split(','))
+    except (AttributeError, ValueError):
+        return None
+    return lat, lon
+
+def _segment_load(trip: Trip, orders: list, seg_from: int, seg_to: int) -> tuple[float, float]:
+    """Most weight and volume on board anywhere between two stop orders.
+
+    Orders don't record where they join or leave a trip, so each one is
+    taken to ride from the stop nearest its pickup to the stop nearest its
+    drop. Orders (or stops) that can't be located count for the whole trip.
+    """
+    route = [(0, trip.source)] + [(s.stop_order, s.location_name) for s in trip.stops] + [(9999, trip.destination)]
+    located = [(order, geocoding.place_coordinates(name)) for order, name in route]
+    located = [(order, point) for order, point in located if point]
+
+    def nearest_stop(point, default: int) -> int:
+        if point is None or not located:
+            return default
+        km = distance.haversine_km(point[0], point[1], [p[0] for _, p in located], [p[1] for _, p in located])
+        return located[int(km.argmin())][0]
 
+    legs = []
+    for w, v, pickup, drop in orders:
+        board = nearest_stop(_parse_point(pickup), 0)
+        alight = nearest_stop(_parse_point(drop), 9999)
+        if board >= alight:
+            board, alight = 0, 9999
+        # On board over [board, alight); only overlap with the segment counts
+        if board < seg_to and alight > seg_from:
+            legs.append((max(board, seg_from), alight, w, v))
 
+    # The load only rises where an order boards, so those points (and the
+    # segment start) are the only ones to check
+    max_w = max_v = 0.0
+    for at in {seg_from} | {board for board, _, _, _ in legs}:
+        on_board = [(w, v) for board, alight, w, v in legs if board <= at < alight]
+        max_w = max(max_w, sum(w for w, _ in on_board))
+        max_v = max(max_v, sum(v for _, v in on_board))
+    return max_w, max_v
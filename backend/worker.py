@@ -0,0 +1,45 @@
+"""Background job worker.
+
+Run alongside the API (any number of copies):
+    python worker.py
+"""
+import asyncio
+import signal
+
+from jobs import JobWorker, JOB_WORKER_CONCURRENCY
+# Importing these modules registers their job handlers
+import assignment
+import heatmap
+import order_events
+import archive
+from database import get_engine
+
+
+async def main():
+    # Keep history partitions ahead of time even if the API is rarely restarted;
+    # run_partition_maintainer repeats this while the worker runs
+    async with get_engine().begin() as conn:
+        await order_events.ensure_partitions(conn)
+        await archive.ensure_partitions(conn)
+    worker = JobWorker(concurrency=JOB_WORKER_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+    tasks = [worker.run(), order_events.run_partition_maintainer(stop=worker.stop_event)]
+    if assignment.ASSIGNMENT_MODE == "batch":
+        # Same stop event, so SIGTERM drains both loops
+        tasks.append(assignment.run_assigner(stop=worker.stop_event))
+    if archive.ORDER_ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(archive.run_archiver(stop=worker.stop_event))
+    await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,229 @@
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from models import Zone, ZoneRelation
+from schemas import ZoneResponse
+import invalidation
+import etags
+
+# shapely is imported where it is used, so importing this module (and so the
+# API and the job worker) does not pay for it until zones are first needed
+if TYPE_CHECKING:
+    from shapely.geometry import Polygon
+
+router = APIRouter(prefix="/zones", tags=["Zones"])
+
+# At this zoom a screen pixel is ~2m; geometry is returned unsimplified
+FULL_DETAIL_ZOOM = 16
+# Zones closer than this (in degrees, ~500m) count as neighbours
+ZONE_ADJACENCY_DEG = float(os.getenv("ZONE_ADJACENCY_DEG", 0.005))
+
+
+def simplify_tolerance(zoom: int) -> float:
+    """Width of one 256px web-map tile pixel at `zoom`, in degrees."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def parse_polygon(geometry_coords: str) -> "Polygon":
+    """Zones are stored as a JSON list of [lat, lon] pairs."""
+    from shapely.geometry import Polygon
+    return Polygon([(p[0], p[1]) for p in json.loads(geometry_coords)])
+
+
+def validate_coordinates(coordinates: list) -> "Polygon":
+    """Check a [[lat, lon], ...] ring and return it as a polygon; ValueError says what is wrong."""
+    from shapely.geometry import Polygon
+    from shapely.validation import explain_validity
+    points = []
+    for p in coordinates:
+        try:
+            lat, lon = float(p[0]), float(p[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            raise ValueError("Coordinates must be [latitude, longitude] pairs")
+        if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Coordinate out of range: [{lat}, {lon}]")
+        points.append((lat, lon))
+    if len(set(points)) < 3:
+        raise ValueError("A zone needs at least 3 distinct points")
+    polygon = Polygon(points)
+    if not polygon.is_valid:
+        raise ValueError(f"Invalid zone geometry: {explain_validity(polygon)}")
+    if polygon.area == 0:
+        raise ValueError("Zone has no area")
+    return polygon
+
+
+class ZoneIndex:
+    """STR-tree over all zone polygons plus the precomputed zone_relations.
+
+    A point resolves to exactly one zone: among the zones containing it, the
+    highest priority, then the smallest area, then the lowest id.
+    """
+
+    def __init__(self, zones: list[tuple[int, int, "Polygon"]], relations: list[tuple[int, int, str]] = ()):
+        from shapely import STRtree
+        from shapely.geometry import Point
+        from shapely.prepared import prep
+        self._point = Point
+        self.ids = [zone_id for zone_id, _, _ in zones]
+        self.polygons = [polygon for _, _, polygon in zones]
+        self.rank = {zone_id: (-priority, polygon.area, zone_id) for zone_id, priority, polygon in zones}
+        self.centroids = {zone_id: (polygon.centroid.x, polygon.centroid.y) for zone_id, _, polygon in zones}
+        self._prepared = [prep(p) for p in self.polygons]
+        self._tree = STRtree(self.polygons)
+        self.neighbours = defaultdict(list)
+        for zone_id, other_id, relation in relations:
+            if other_id in self.rank:
+                self.neighbours[zone_id].append((0 if relation == "overlap" else 1, self.rank[other_id], other_id))
+        for entries in self.neighbours.values():
+            entries.sort()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, lat: float, lon: float) -> Optional[int]:
+        point = self._point(lat, lon)
+        best = None
+        for i in self._tree.query(point):
+            if self._prepared[i].contains(point):
+                zone_id = self.ids[i]
+                if best is None or self.rank[zone_id] < self.rank[best]:
+                    best = zone_id
+        return best
+
+    def candidate_zones(self, zone_id: int) -> list[int]:
+        """The zone itself, then overlapping zones, then adjacent ones, each by rank."""
+        return [zone_id] + [other_id for _, _, other_id in self.neighbours.get(zone_id, ())]
+
+    def relations_for(self, polygon: "Polygon") -> list[tuple[int, str, float, float]]:
+        """(other zone id, relation, share of the new zone, share of the other zone)
+        for every existing zone overlapping or within ZONE_ADJACENCY_DEG of polygon."""
+        found = []
+        for i in self._tree.query(polygon.buffer(ZONE_ADJACENCY_DEG)):
+            other = self.polygons[i]
+            shared = polygon.intersection(other).area
+            if shared > 0:
+                found.append((self.ids[i], "overlap", shared / polygon.area, shared / other.area))
+            elif polygon.distance(other) <= ZONE_ADJACENCY_DEG:
+                found.append((self.ids[i], "adjacent", 0.0, 0.0))
+        return found
+
+
+async def build_zone_index(db: AsyncSession) -> ZoneIndex:
+    result = await db.execute(select(Zone.id, Zone.name, Zone.priority, Zone.geometry_coords).order_by(Zone.id))
+    zones = []
+    for zone_id, name, priority, coords in result.all():
+        try:
+            zones.append((zone_id, priority or 0, parse_polygon(coords)))
+        except Exception as e:
+            print(f"Zone parse error {name}: {e}")
+    result = await db.execute(select(ZoneRelation.zone_id, ZoneRelation.other_zone_id, ZoneRelation.relation))
+    return ZoneIndex(zones, result.all())
+
+
+def _simplified(zone: Zone, zoom: int) -> Optional[dict]:
+    try:
+        polygon = parse_polygon(zone.geometry_coords)
+    except Exception as e:
+        print(f"Zone parse error {zone.name}: {e}")
+        return None
+    if zoom < FULL_DETAIL_ZOOM:
+        # Douglas-Peucker; preserve_topology keeps the ring valid at coarse zooms
+        polygon = polygon.simplify(simplify_tolerance(zoom), preserve_topology=True)
+    return {
+        "id": zone.id,
+        "name": zone.name,
+        "priority": zone.priority or 0,
+        "coordinates": [[round(lat, 6), round(lon, 6)] for lat, lon in polygon.exterior.coords],
+        "bounds": polygon.bounds,  # (min_lat, min_lon, max_lat, max_lon)
+    }
+
+
+# zoom -> (version, simplified zones). Zones are only ever added, so the
+# count and highest id identify the current set across API processes when
+# the invalidation listener is not connected.
+_cache = {}
+_cache_lock = threading.Lock()
+_index: Optional[tuple] = None  # (version, ZoneIndex)
+# Bumped by invalidate(): a build that started before a bump may have read
+# the old zones, so it is returned to its caller but not cached
+_generation = 0
+
+
+async def zones_version(db: AsyncSession) -> tuple:
+    result = await db.execute(select(func.count(Zone.id), func.max(Zone.id)))
+    return tuple(result.one())
+
+
+@invalidation.on(invalidation.ZONES)
+def invalidate(payload: str = ""):
+    global _index, _generation
+    with _cache_lock:
+        _cache.clear()
+        _index = None
+        _generation += 1
+
+
+async def get_zone_index(db: AsyncSession) -> ZoneIndex:
+    """Shared ZoneIndex, rebuilt when a zone has been added (in any process)."""
+    global _index
+    current, generation = _index, _generation
+    if current and invalidation.listening():
+        return current[1]  # Zone changes arrive as notifications; no version query
+    version = await zones_version(db)
+    if current and current[0] == version:
+        return current[1]
+    index = await build_zone_index(db)
+    with _cache_lock:
+        if generation == _generation:
+            _index = (version, index)
+    return index
+
+
+async def simplified_zones(db: AsyncSession, zoom: int) -> list[dict]:
+    zoom = min(zoom, FULL_DETAIL_ZOOM)
+    with _cache_lock:
+        cached, generation = _cache.get(zoom), _generation
+    if cached and invalidation.listening():
+        return cached[1]
+    version = await zones_version(db)
+    if cached and cached[0] == version:
+        return cached[1]
+    result = await db.execute(select(Zone).order_by(Zone.id))
+    entries = [e for e in (_simplified(z, zoom) for z in result.scalars().all()) if e]
+    with _cache_lock:
+        if generation == _generation:
+            _cache[zoom] = (version, entries)
+    return entries
+
+
+# Endpoints
+
+@router.get("/geometry", response_model=List[ZoneResponse], dependencies=[Depends(etags.conditional(invalidation.ZONES))])
+async def get_zone_geometry(
+    zoom: int = Query(12, ge=0, le=22),
+    min_lat: Optional[float] = None,
+    min_lon: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lon: Optional[float] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Zone outlines simplified to about one screen pixel at `zoom`,
+    optionally limited to zones intersecting the visible box."""
+    entries = await simplified_zones(db, zoom)
+    if None not in (min_lat, min_lon, max_lat, max_lon):
+        entries = [
+            e for e in entries
+            if e["bounds"][0] <= max_lat and e["bounds"][2] >= min_lat
+            and e["bounds"][1] <= max_lon and e["bounds"][3] >= min_lon
+        ]
+    return [ZoneResponse(id=e["id"], name=e["name"], coordinates=e["coordinates"], priority=e["priority"]) for e in entries]
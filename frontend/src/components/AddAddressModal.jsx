@@ -2,6 +2,7 @@ import { useState, useRef, useEffect } from 'react';
 import axios from 'axios';
 import { API_BASE_URL } from '../apiConfig';
 import LocationPickerMap from './LocationPickerMap';
+import { reverseGeocode } from '../geo';
 import '../pages/MSMEPortal.css'; // Ensure we have the drawer styles
 
 export default function AddAddressModal({ onClose, onSuccess }) {
@@ -32,17 +33,17 @@ export default function AddAddressModal({ onClose, onSuccess }) {
         setPincode(val);
         if (val.length === 6) {
             try {
-                const res = await axios.get(`https://api.postalpincode.in/pincode/${val}`);
-                if (res.data && res.data[0].Status === "Success") {
-                    const postOffices = res.data[0].PostOffice;
-                    setCityOptions(postOffices);
-
-                    if (postOffices.length > 0) {
-                        setCity(postOffices[0].Name);
-                        setState(postOffices[0].State);
-                    }
-                } else {
-                    setCityOptions([]);
+                // Served from the backend's offline pincode index
+                const res = await axios.get(`${API_BASE_URL}/geo/pincode/${val}`);
+                const postOffices = res.data.offices || [];
+                setCityOptions(postOffices);
+
+                if (postOffices.length > 0) {
+                    setCity(postOffices[0].name);
+                    setState(postOffices[0].state);
+                }
+                if (res.data.latitude && res.data.longitude && !mapLocation) {
+                    setMapLocation({ lat: res.data.latitude, lng: res.data.longitude });
                 }
             } catch (err) {
                 console.error("Failed to fetch pincode details", err);
@@ -58,39 +59,18 @@ export default function AddAddressModal({ onClose, onSuccess }) {
         // Reverse Geocoding
         try {
             const { lat, lng } = latlng;
-            const res = await axios.get(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}`);
-            if (res.data && res.data.address) {
-                const addr = res.data.address;
-
-                // Map API fields to State
-                const newPincode = addr.postcode || '';
-                const newCity = addr.city || addr.town || addr.village || addr.suburb || addr.neighbourhood || '';
-                const newState = addr.state || '';
-                const newAddress = [
-                    addr.house_number,
-                    addr.road,
-                    addr.suburb,
-                    addr.neighbourhood
-                ].filter(Boolean).join(', ');
-
-                // Update State if fields are present
-                if (newPincode) setPincode(newPincode);
-                if (newCity) setCity(newCity);
-                if (newState) setState(newState);
-                if (newAddress && !addressLine1) setAddressLine1(newAddress); // Only fill if empty or overwrite? User said autofill. Let's overwrite or maybe usually overwrite is expected on map click.
-                setAddressLine1(newAddress); // Let's overwrite to match "autofill from map" expectation
-
-                // If pincode changed, maybe we should fetch City options again? 
-                // Or just trust the reverse geocode. 
-                // Since we setCity directly, options validation might be tricky if it's a dropdown.
-                // But in the render:
-                /* 
-                   {cityOptions.length > 1 ? (select...) : (input...)}
-                   If we setCity, and options are empty (because we didn't call pincode API), it renders Input. 
-                   If we setPincode, properly we should trigger options fetch or just let it be an input.
-                   Let's clear options so it renders as Input with the geocoded city.
-                */
-                setCityOptions([]);
+            // Nearest pincode from the backend's offline index
+            const place = await reverseGeocode(lat, lng);
+            const postOffices = place.offices || [];
+            setPincode(place.pincode);
+            setCityOptions(postOffices);
+            if (postOffices.length > 0) {
+                setCity(postOffices[0].name);
+                setState(postOffices[0].state);
+            }
+            // The index knows localities, not streets: only fill an empty address
+            if (!addressLine1 && postOffices.length > 0) {
+                setAddressLine1(`${postOffices[0].name}, ${place.city}`);
             }
         } catch (err) {
             console.error("Reverse geocoding failed", err);
@@ -193,7 +173,7 @@ export default function AddAddressModal({ onClose, onSuccess }) {
                                 {cityOptions.length > 1 ? (
                                     <select className="form-input" value={city} onChange={e => setCity(e.target.value)}>
                                         {cityOptions.map((po, idx) => (
-                                            <option key={idx} value={po.Name}>{po.Name}</option>
+                                            <option key={idx} value={po.name}>{po.name}</option>
                                         ))}
                                     </select>
                                 ) : (
@@ -1,7 +1,7 @@
 import { MapContainer, TileLayer, Marker, Popup, useMapEvents, useMap, GeoJSON } from 'react-leaflet';
 import { useState, useEffect, useRef, useMemo } from 'react';
-import axios from 'axios';
 import L from 'leaflet';
+import { searchPlaces, lookupPincode, placeLabel } from '../geo';
 
 // Common India Lat/Long
 const CENTER = [28.6139, 77.2090];
@@ -76,6 +76,8 @@ export default function LocationPickerMap({ onLocationSelect, style, pincode, se
   const [pincodePlaces, setPincodePlaces] = useState([]);
   const [loadingPlaces, setLoadingPlaces] = useState(false);
   const [gettingLocation, setGettingLocation] = useState(false);
+  const [placeSuggestions, setPlaceSuggestions] = useState([]);
+  const pickedSuggestion = useRef(false);
 
   // Fix for marker icon not showing
   useEffect(() => {
@@ -113,24 +115,46 @@ export default function LocationPickerMap({ onLocationSelect, style, pincode, se
     }
   }, [pincode]);
 
+  // Autocomplete from our pincode directory while typing
+  useEffect(() => {
+    const q = searchQuery.trim();
+    if (pickedSuggestion.current || q.length < 2) {
+      // Filling in a picked suggestion is not a new search
+      pickedSuggestion.current = false;
+      setPlaceSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      searchPlaces(q)
+        .then(places => { if (!cancelled) setPlaceSuggestions(places); })
+        .catch(() => { if (!cancelled) setPlaceSuggestions([]); });
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
+  const selectPlace = (place) => {
+    const newPos = { lat: place.latitude, lng: place.longitude };
+    setMapCenter([place.latitude, place.longitude]);
+    setMarkerPosition(newPos);
+    setPlaceSuggestions([]);
+    if (onLocationSelect) {
+      onLocationSelect(newPos);
+    }
+  };
+
   const handleSearch = async (e) => {
     e.preventDefault();
     if (!searchQuery.trim()) return;
 
     setIsSearching(true);
     try {
-      const res = await axios.get(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(searchQuery)}`);
-      if (res.data && res.data.length > 0) {
-        const first = res.data[0];
-        const lat = parseFloat(first.lat);
-        const lon = parseFloat(first.lon);
-        const newPos = { lat, lng: lon };
-
-        setMapCenter([lat, lon]);
-        setMarkerPosition(newPos);
-        if (onLocationSelect) {
-          onLocationSelect(newPos);
-        }
+      const [first] = await searchPlaces(searchQuery.trim(), 1);
+      if (first) {
+        selectPlace(first);
       } else {
         alert("Location not found");
       }
@@ -150,44 +174,20 @@ export default function LocationPickerMap({ onLocationSelect, style, pincode, se
     setLoadingPlaces(true);
 
     try {
-      // 1. Fetch Boundary & Centroid from Nominatim
-      const res = await axios.get(`https://nominatim.openstreetmap.org/search?postalcode=${encodeURIComponent(code)}&country=india&polygon_geojson=1&format=json`);
-
-      if (res.data && res.data.length > 0) {
-        const first = res.data[0];
-        const lat = parseFloat(first.lat);
-        const lon = parseFloat(first.lon);
-
+      const record = await lookupPincode(code);
+      if (record.latitude != null && record.longitude != null) {
+        const lat = record.latitude;
+        const lon = record.longitude;
         setMapCenter([lat, lon]);
 
-        // Set GeoJSON if available
-        if (first.geojson && (first.geojson.type === 'Polygon' || first.geojson.type === 'MultiPolygon')) {
-          setGeoJsonData(first.geojson);
-        }
-
-        // Set Display Name / Details
-        setAreaDetails(first.display_name);
-
-        // 2. Fetch Nearby Villages/Suburbs using Overpass API
-        const overpassQuery = `[out:json];(node(around:5000,${lat},${lon})["place"~"village|suburb|neighbourhood|town"];);out;`;
-        const placesRes = await axios.get(`https://overpass-api.de/api/interpreter?data=${encodeURIComponent(overpassQuery)}`);
-
-        if (placesRes.data && placesRes.data.elements) {
-          const places = placesRes.data.elements
-            .filter(el => el.tags.name)
-            .map(el => ({
-              name: el.tags.name,
-              lat: el.lat,
-              lon: el.lon
-            }));
-
-          const uniquePlaces = [...new Map(places.map(item => [item.name, item])).values()];
-          setPincodePlaces(uniquePlaces);
-        }
+        setAreaDetails(placeLabel(record));
 
+        // Post offices of the pincode; the directory has one centroid per pincode
+        const places = record.offices.map(o => ({ name: o.name, lat, lon }));
+        const uniquePlaces = [...new Map(places.map(item => [item.name, item])).values()];
+        setPincodePlaces(uniquePlaces);
       } else {
-        // If triggered by prop, we might not want to alert intensely, but for now it helps debug
-        console.warn("Pincode not found or no boundary data available.");
+        console.warn("Pincode has no coordinates in the directory.");
       }
     } catch (err) {
       console.error("Pincode Search failed", err);
@@ -255,6 +255,23 @@ export default function LocationPickerMap({ onLocationSelect, style, pincode, se
             onKeyDown={(e) => e.key === 'Enter' && handleSearch(e)}
             style={{ paddingRight: '80px' }}
           />
+          {placeSuggestions.length > 0 && (
+            <div style={{ position: 'absolute', top: '100%', left: 0, right: 0, zIndex: 1000, background: 'white', border: '1px solid var(--border)', borderRadius: '0.375rem', boxShadow: '0 4px 12px rgba(0,0,0,0.1)', maxHeight: '240px', overflowY: 'auto' }}>
+              {placeSuggestions.map(place => (
+                <div
+                  key={place.pincode}
+                  onClick={() => {
+                    pickedSuggestion.current = true;
+                    setSearchQuery(placeLabel(place));
+                    selectPlace(place);
+                  }}
+                  style={{ padding: '0.5rem 0.75rem', cursor: 'pointer', fontSize: '0.85rem', borderBottom: '1px solid #f1f5f9' }}
+                >
+                  {placeLabel(place)}
+                </div>
+              ))}
+            </div>
+          )}
           <div style={{ position: 'absolute', right: '4px', top: '50%', transform: 'translateY(-50%)', display: 'flex', alignItems: 'center', gap: '4px' }}>
             <button
               onClick={handleLocateMe}
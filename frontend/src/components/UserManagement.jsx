@@ -9,6 +9,9 @@ export default function UserManagement() {
     const [pendingDrivers, setPendingDrivers] = useState([]);
     const [loading, setLoading] = useState(false);
     const [filterRole, setFilterRole] = useState('');
+    const [search, setSearch] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [estimatedTotal, setEstimatedTotal] = useState(0);
     const [message, setMessage] = useState({ text: '', type: '' });
 
     // Fetch Data
@@ -21,13 +24,17 @@ export default function UserManagement() {
         }
     };
 
-    const fetchAllUsers = async () => {
+    const fetchAllUsers = async (cursor = null) => {
         setLoading(true);
         try {
-            let url = `${API_BASE_URL}/admin/users`;
-            if (filterRole) url += `?role=${filterRole}`;
-            const res = await axios.get(url);
-            setUsers(res.data);
+            const params = { limit: 50 };
+            if (filterRole) params.role = filterRole;
+            if (search.trim()) params.q = search.trim();
+            if (cursor) params.cursor = cursor;
+            const res = await axios.get(`${API_BASE_URL}/admin/users/directory`, { params });
+            setUsers(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+            setNextCursor(res.data.next_cursor);
+            setEstimatedTotal(res.data.estimated_total);
         } catch (err) {
             console.error("Failed to fetch users", err);
         } finally {
@@ -37,8 +44,11 @@ export default function UserManagement() {
 
     useEffect(() => {
         if (activeTab === 'pending') fetchPendingDrivers();
-        if (activeTab === 'directory') fetchAllUsers();
-    }, [activeTab, filterRole]);
+        if (activeTab !== 'directory') return;
+        // Debounce search so typing doesn't fire a request per keystroke
+        const timer = setTimeout(() => fetchAllUsers(), search ? 250 : 0);
+        return () => clearTimeout(timer);
+    }, [activeTab, filterRole, search]);
 
     // Handlers
     const handleApprove = async (id) => {
@@ -168,6 +178,17 @@ export default function UserManagement() {
                             <option value="MSME">MSME Users</option>
                             <option value="SUPER_ADMIN">Admins</option>
                         </select>
+                        <input
+                            type="text"
+                            value={search}
+                            onChange={(e) => setSearch(e.target.value)}
+                            placeholder="Search name or email"
+                            className="form-input"
+                            style={{ maxWidth: '300px' }}
+                        />
+                        <span style={{ alignSelf: 'center', fontSize: '0.875rem', color: 'var(--text-muted)' }}>
+                            ~{estimatedTotal} users
+                        </span>
                     </div>
 
                     <div className="card" style={{ overflow: 'hidden', padding: 0 }}>
@@ -247,6 +268,17 @@ export default function UserManagement() {
                             </tbody>
                         </table>
                     </div>
+                    {nextCursor && (
+                        <div style={{ textAlign: 'center', marginTop: '1rem' }}>
+                            <button
+                                onClick={() => fetchAllUsers(nextCursor)}
+                                className="btn"
+                                disabled={loading}
+                            >
+                                {loading ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
 
@@ -9,7 +9,7 @@ import 'leaflet-draw/dist/leaflet.draw.css';
 
 // Common India Lat/Long (Delhi)
 const CENTER = [28.6139, 77.2090];
-const ZOOM = 11;
+export const ZOOM = 11;
 
 export default function ZoneMap({ onCreated, zones = [] }) {
   const mapRef = useRef();
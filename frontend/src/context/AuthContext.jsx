@@ -11,6 +11,63 @@ export const AuthProvider = ({ children }) => {
   const [token, setToken] = useState(localStorage.getItem('token'));
   const [loading, setLoading] = useState(true);
 
+  // Access tokens last 15 minutes: on a 401, trade the refresh token for a
+  // new pair once and retry. Concurrent 401s share one refresh, since each
+  // refresh token only works once. Tabs share localStorage, so a tab first
+  // checks whether another one has already refreshed.
+  useEffect(() => {
+    let refreshing = null;
+    const interceptor = axios.interceptors.response.use(null, async (error) => {
+      const config = error.config;
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (error.response?.status !== 401 || !refreshToken || !config || config._retried || config.url?.includes('/token')) {
+        throw error;
+      }
+      const storedToken = localStorage.getItem('token');
+      const sentAuth = config.headers?.Authorization || config.headers?.authorization;
+      if (storedToken && sentAuth && sentAuth !== `Bearer ${storedToken}`) {
+        // Another tab refreshed since this request was sent
+        config._retried = true;
+        config.headers = { ...config.headers, Authorization: `Bearer ${storedToken}` };
+        return axios(config);
+      }
+      if (!refreshing) {
+        refreshing = axios.post(`${API_BASE_URL}/token/refresh`, { refresh_token: refreshToken })
+          .then(res => {
+            localStorage.setItem('token', res.data.access_token);
+            localStorage.setItem('refresh_token', res.data.refresh_token);
+            axios.defaults.headers.common['Authorization'] = `Bearer ${res.data.access_token}`;
+            setToken(res.data.access_token);
+            return res.data.access_token;
+          })
+          .catch(err => {
+            // Only a rejected token is dropped; a network error may be retried later
+            if (err.response?.status === 401) localStorage.removeItem('refresh_token');
+            return null;
+          })
+          .finally(() => { refreshing = null; });
+      }
+      const accessToken = await refreshing;
+      if (!accessToken) throw error;
+      config._retried = true;
+      config.headers = { ...config.headers, Authorization: `Bearer ${accessToken}` };
+      return axios(config);
+    });
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
+  // Pick up tokens refreshed (or cleared by logout) in other tabs
+  useEffect(() => {
+    const onStorage = (e) => {
+      if (e.key === 'token' && e.newValue) {
+        axios.defaults.headers.common['Authorization'] = `Bearer ${e.newValue}`;
+        setToken(e.newValue);
+      }
+    };
+    window.addEventListener('storage', onStorage);
+    return () => window.removeEventListener('storage', onStorage);
+  }, []);
+
   // Configure axios defaults
   useEffect(() => {
     if (token) {
@@ -48,9 +105,10 @@ export const AuthProvider = ({ children }) => {
           'Content-Type': 'application/x-www-form-urlencoded'
         }
       });
-      const { access_token } = res.data;
+      const { access_token, refresh_token } = res.data;
 
       localStorage.setItem('token', access_token);
+      if (refresh_token) localStorage.setItem('refresh_token', refresh_token);
       // We need to decode token or fetch user to get role. 
       // For simplicity, let's assume we decode or backend returns it.
       // But backend only returns token. Let's fetch /users/me
@@ -117,6 +175,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    if (token) {
+      // Revoke the token server-side; logging out locally doesn't wait for it
+      const refreshToken = localStorage.getItem('refresh_token');
+      axios.post(`${API_BASE_URL}/logout`, refreshToken ? { refresh_token: refreshToken } : undefined).catch(() => {});
+    }
     setUser(null);
     setToken(null);
     localStorage.clear();
@@ -0,0 +1,45 @@
+import axios from 'axios';
+import { API_BASE_URL } from './apiConfig';
+
+// Lookups against our own /geo endpoints (offline pincode directory), so
+// address forms never call third-party geocoders from the browser.
+
+export const searchPlaces = async (q, limit = 8) => {
+  const res = await axios.get(`${API_BASE_URL}/geo/autocomplete`, { params: { q, limit } });
+  return res.data.filter(p => p.latitude != null && p.longitude != null);
+};
+
+export const lookupPincode = async (pincode) => {
+  const res = await axios.get(`${API_BASE_URL}/geo/pincode/${encodeURIComponent(pincode)}`);
+  return res.data;
+};
+
+export const reverseGeocode = async (lat, lng) => {
+  const res = await axios.get(`${API_BASE_URL}/geo/reverse`, { params: { lat, lon: lng } });
+  return res.data;
+};
+
+// Best effort for free text such as a company address: a 6-digit pincode in
+// it wins, otherwise the comma-separated parts are tried from the end
+// (city and district names come last in Indian addresses).
+export const geocodePlace = async (text) => {
+  const pin = text.match(/\b\d{6}\b/);
+  if (pin) {
+    try {
+      return await lookupPincode(pin[0]);
+    } catch {
+      // Unknown pincode: fall back to the place names
+    }
+  }
+  const parts = text.split(',').map(s => s.trim()).filter(Boolean).reverse();
+  for (const part of parts) {
+    const [first] = await searchPlaces(part, 1);
+    if (first) return first;
+  }
+  return null;
+};
+
+export const placeLabel = (place) => {
+  const name = place.offices?.[0]?.name || place.offices?.[0] || place.city;
+  return [name, place.city !== name ? place.city : null, place.state, place.pincode].filter(Boolean).join(', ');
+};
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
 import { API_BASE_URL } from '../apiConfig';
-import ZoneMap from '../components/ZoneMap';
+import ZoneMap, { ZOOM as ZONE_MAP_ZOOM } from '../components/ZoneMap';
 import UserManagement from '../components/UserManagement';
 import './AdminDashboard.css';
 
@@ -16,6 +16,7 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
     const [vehicles, setVehicles] = useState([]);
     const [orders, setOrders] = useState([]);
     const [zones, setZones] = useState([]);
+    const [stats, setStats] = useState(null);
     const [loading, setLoading] = useState(true);
 
     const fetchData = async () => {
@@ -24,14 +25,16 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
         try {
             axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
 
-            const [vehRes, ordRes, zoneRes] = await Promise.all([
+            // Per-vehicle load comes with the stats; the full order list is
+            // only fetched for the orders tab
+            const [vehRes, zoneRes, statsRes] = await Promise.all([
                 axios.get(`${API_BASE_URL}/vehicles`),
-                axios.get(`${API_BASE_URL}/orders`),
-                axios.get(`${API_BASE_URL}/zones`)
+                axios.get(`${API_BASE_URL}/zones`, { params: { include_geometry: false } }),
+                axios.get(`${API_BASE_URL}/analytics/stats`)
             ]);
             setVehicles(vehRes.data);
-            setOrders(ordRes.data);
             setZones(zoneRes.data);
+            setStats(statsRes.data);
         } catch (err) {
             console.error("Failed to fetch admin data", err);
             if (err.response?.status === 401) {
@@ -42,10 +45,24 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
         }
     };
 
+    const fetchOrders = async () => {
+        if (!token) return;
+        try {
+            const res = await axios.get(`${API_BASE_URL}/orders`);
+            setOrders(res.data);
+        } catch (err) {
+            console.error("Failed to fetch orders", err);
+        }
+    };
+
     useEffect(() => {
         fetchData();
     }, [token]);
 
+    useEffect(() => {
+        if (activeTab === 'orders') fetchOrders();
+    }, [token, activeTab]);
+
     const [isFilterOpen, setIsFilterOpen] = useState(false);
 
     // Filter Data
@@ -53,18 +70,11 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
         ? vehicles
         : vehicles.filter(v => v.zone?.name === filter);
 
-    // Calculate filtered stats
-    const filteredVehicleStats = filteredVehicles.map(v => {
-        const vOrders = orders.filter(o => o.assigned_vehicle_id === v.id);
-        const currentWeight = vOrders.reduce((acc, o) => acc + o.weight_kg, 0);
-        const currentVol = vOrders.reduce((acc, o) => acc + o.volume_m3, 0);
-
-        const volUtil = (currentVol / v.max_volume_m3) * 100;
-        const weightUtil = (currentWeight / v.max_weight_kg) * 100;
-        const utilPct = Math.min(Math.max(volUtil, weightUtil), 100);
-
-        return { ...v, currentWeight, currentVol, utilPct };
-    });
+    // Pre-aggregated on the server
+    const avgUtilization = !stats ? 0
+        : filter === 'All Zones'
+            ? stats.avg_utilization_percentage
+            : (stats.zones.find(z => z.zone_name === filter)?.avg_utilization_percentage ?? 0);
 
     return (
         <div>
@@ -174,23 +184,21 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
                             </div>
                             <div className="card stat-card">
                                 <div style={{ fontSize: '0.875rem', color: 'var(--text-muted)' }}>Total Orders</div>
-                                <div className="stat-value">{orders.length}</div>
+                                <div className="stat-value">{stats ? stats.total_orders : 0}</div>
                             </div>
                             <div className="card stat-card">
                                 <div style={{ fontSize: '0.875rem', color: 'var(--text-muted)' }}>Utilization Avg.</div>
                                 <div className="stat-value">
-                                    {filteredVehicleStats.length > 0 ? (
-                                        (filteredVehicleStats.reduce((acc, v) => acc + v.utilPct, 0) / filteredVehicleStats.length).toFixed(1)
-                                    ) : '0.0'}%
+                                    {avgUtilization.toFixed(1)}%
                                 </div>
                             </div>
                         </div>
 
-                        <FleetGrid vehicles={filteredVehicles} orders={orders} onUpdate={fetchData} />
+                        <FleetGrid vehicles={filteredVehicles} loads={stats?.vehicles ?? []} onUpdate={fetchData} />
                     </>
                 )}
                 {activeTab === 'zones' && <ZoneManager />}
-                {activeTab === 'orders' && <OrderManager orders={orders} onUpdate={fetchData} />}
+                {activeTab === 'orders' && <OrderManager orders={orders} onUpdate={() => { fetchOrders(); fetchData(); }} />}
             </div>
 
             {isVehicleModalOpen && (
@@ -206,25 +214,27 @@ export default function AdminDashboard({ activeTab: initialTab = 'fleet' }) {
     );
 }
 
-function FleetGrid({ vehicles, orders, onUpdate }) {
-    const [selectedVehicle, setSelectedVehicle] = useState(null);
+function FleetGrid({ vehicles, loads, onUpdate }) {
+    const [selectedVehicleId, setSelectedVehicleId] = useState(null);
 
     if (vehicles.length === 0) {
         return <div className="card" style={{ padding: '2rem', textAlign: 'center', color: 'var(--text-muted)' }}>No vehicles in fleet. Add one to get started.</div>;
     }
 
-    // Calculate current loads for display
+    // Current loads are pre-aggregated on the server (/analytics/stats)
+    const loadById = new Map(loads.map(l => [l.vehicle_id, l]));
     const vehicleStats = vehicles.map(v => {
-        const vOrders = orders.filter(o => o.assigned_vehicle_id === v.id);
-        const currentWeight = vOrders.reduce((acc, o) => acc + o.weight_kg, 0);
-        const currentVol = vOrders.reduce((acc, o) => acc + o.volume_m3, 0);
-
-        const volUtil = (currentVol / v.max_volume_m3) * 100;
-        const weightUtil = (currentWeight / v.max_weight_kg) * 100;
-        const utilPct = Math.min(Math.max(volUtil, weightUtil), 100);
-
-        return { ...v, currentWeight, currentVol, utilPct };
+        const load = loadById.get(v.id);
+        return {
+            ...v,
+            activeOrders: load?.active_orders ?? 0,
+            currentWeight: load?.load_weight_kg ?? 0,
+            currentVol: load?.load_volume_m3 ?? 0,
+            utilPct: load?.utilization_percentage ?? 0,
+        };
     });
+    // Looked up by id so the modal shows loads refreshed after an unassign
+    const selectedVehicle = vehicleStats.find(v => v.id === selectedVehicleId);
 
     return (
         <>
@@ -233,7 +243,7 @@ function FleetGrid({ vehicles, orders, onUpdate }) {
                     <div
                         key={v.id}
                         className="card card-hover vehicle-card"
-                        onClick={() => setSelectedVehicle(v)}
+                        onClick={() => setSelectedVehicleId(v.id)}
                     >
                         {/* Header */}
                         <div className="vehicle-header">
@@ -282,8 +292,7 @@ function FleetGrid({ vehicles, orders, onUpdate }) {
             {selectedVehicle && (
                 <VehicleDetailsModal
                     vehicle={selectedVehicle}
-                    orders={orders.filter(o => o.assigned_vehicle_id === selectedVehicle.id)}
-                    onClose={() => setSelectedVehicle(null)}
+                    onClose={() => setSelectedVehicleId(null)}
                     onUpdate={onUpdate}
                 />
             )}
@@ -291,11 +300,27 @@ function FleetGrid({ vehicles, orders, onUpdate }) {
     );
 }
 
-function VehicleDetailsModal({ vehicle, orders, onClose, onUpdate }) {
+function VehicleDetailsModal({ vehicle, onClose, onUpdate }) {
+    const [orders, setOrders] = useState([]);
+
+    const fetchVehicleOrders = async () => {
+        try {
+            const res = await axios.get(`${API_BASE_URL}/orders`, { params: { vehicle_id: vehicle.id } });
+            setOrders(res.data);
+        } catch (err) {
+            console.error("Failed to fetch vehicle orders", err);
+        }
+    };
+
+    useEffect(() => {
+        fetchVehicleOrders();
+    }, [vehicle.id]);
+
     const handleUnassign = async (orderId) => {
         if (!confirm("Are you sure you want to unassign this order?")) return;
         try {
             await axios.post(`${API_BASE_URL}/orders/${orderId}/unassign`);
+            fetchVehicleOrders();
             onUpdate(); // Refresh data
         } catch (err) {
             console.error("Failed to unassign", err);
@@ -314,7 +339,7 @@ function VehicleDetailsModal({ vehicle, orders, onClose, onUpdate }) {
                 <div className="modal-stats-row">
                     <div>
                         <div style={{ fontSize: '0.75rem', color: 'var(--text-muted)' }}>Load</div>
-                        <div style={{ fontWeight: '600' }}>{orders.length} Orders</div>
+                        <div style={{ fontWeight: '600' }}>{vehicle.activeOrders} Orders</div>
                     </div>
                     <div>
                         <div style={{ fontSize: '0.75rem', color: 'var(--text-muted)' }}>Weight</div>
@@ -381,7 +406,7 @@ function AddVehicleModal({ onClose, onSuccess }) {
     const [loading, setLoading] = useState(false);
 
     useEffect(() => {
-        axios.get(`${API_BASE_URL}/zones`)
+        axios.get(`${API_BASE_URL}/zones`, { params: { include_geometry: false } })
             .then(res => {
                 setZones(res.data);
                 if (res.data.length > 0) {
@@ -473,7 +498,8 @@ function ZoneManager() {
     const [zones, setZones] = useState([]);
 
     useEffect(() => {
-        axios.get(`${API_BASE_URL}/zones`)
+        // Outlines simplified for the map's zoom level
+        axios.get(`${API_BASE_URL}/zones/geometry`, { params: { zoom: ZONE_MAP_ZOOM } })
             .then(res => setZones(res.data))
             .catch(err => console.error(err));
     }, []);
@@ -39,7 +39,7 @@ export default function AdminSettings() {
                 axios.get(`${API_BASE_URL}/users`).catch(() => ({ data: [] })),
                 axios.get(`${API_BASE_URL}/orders`).catch(() => ({ data: [] })),
                 axios.get(`${API_BASE_URL}/vehicles`).catch(() => ({ data: [] })),
-                axios.get(`${API_BASE_URL}/zones`).catch(() => ({ data: [] }))
+                axios.get(`${API_BASE_URL}/zones`, { params: { include_geometry: false } }).catch(() => ({ data: [] }))
             ]);
 
             setStats({
@@ -6,6 +6,7 @@ import LocationPickerMap from '../components/LocationPickerMap';
 import AddAddressModal from '../components/AddAddressModal';
 import LocationAutocomplete from '../components/LocationAutocomplete';
 import { API_BASE_URL } from '../apiConfig';
+import { geocodePlace, reverseGeocode } from '../geo';
 import './MSMEPortal.css';
 import FindTransportPanel from '../components/FindTransportPanel';
 
@@ -419,23 +420,25 @@ function NewShipmentModal({ onClose, onSuccess, suggestions = [], initialValues
             // Since we only have City Names, we'd need to geocode them to get Lat/Lng for the map.
             if (initialValues.from) {
                 // Try to geocode source
-                axios.get(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(initialValues.from)}&limit=1`)
-                    .then(res => {
-                        if (res.data?.[0]) {
-                            setPickupLocation({ lat: parseFloat(res.data[0].lat), lng: parseFloat(res.data[0].lon) });
+                geocodePlace(initialValues.from)
+                    .then(place => {
+                        if (place) {
+                            setPickupLocation({ lat: place.latitude, lng: place.longitude });
                             setCity(initialValues.from);
                         }
-                    });
+                    })
+                    .catch(() => { });
             }
             if (initialValues.to) {
                 // Try to geocode dest
-                axios.get(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(initialValues.to)}&limit=1`)
-                    .then(res => {
-                        if (res.data?.[0]) {
-                            setDropLocation({ lat: parseFloat(res.data[0].lat), lng: parseFloat(res.data[0].lon) });
+                geocodePlace(initialValues.to)
+                    .then(place => {
+                        if (place) {
+                            setDropLocation({ lat: place.latitude, lng: place.longitude });
                             setDropCity(initialValues.to);
                         }
-                    });
+                    })
+                    .catch(() => { });
             }
         }
     }, [initialValues]);
@@ -467,16 +470,13 @@ function NewShipmentModal({ onClose, onSuccess, suggestions = [], initialValues
             if (user.company.address) {
                 setAddressLine1(user.company.address);
                 // Smart Autofill via Geocoding
-                axios.get(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(user.company.address)}&addressdetails=1&limit=1`)
-                    .then(res => {
-                        if (res.data?.[0]) {
-                            const data = res.data[0];
-                            setPickupLocation({ lat: parseFloat(data.lat), lng: parseFloat(data.lon) });
-                            if (data.address) {
-                                if (data.address.postcode) setPincode(data.address.postcode);
-                                setCity(data.address.city || data.address.town || data.address.village || 'City');
-                                setState(data.address.state || '');
-                            }
+                geocodePlace(user.company.address)
+                    .then(place => {
+                        if (place) {
+                            setPickupLocation({ lat: place.latitude, lng: place.longitude });
+                            setPincode(place.pincode);
+                            setCity(place.city || 'City');
+                            setState(place.state || '');
                         }
                     })
                     .catch(() => { });
@@ -575,6 +575,8 @@ function NewShipmentModal({ onClose, onSuccess, suggestions = [], initialValues
     };
 
     const [addressLoading, setAddressLoading] = useState(false);
+    // One key per shipment form: a retried submit cannot create a second order
+    const [idempotencyKey] = useState(() => crypto.randomUUID());
 
     const handleMapLocationSelect = async (loc) => {
         setAddressLoading(true);
@@ -585,25 +587,20 @@ function NewShipmentModal({ onClose, onSuccess, suggestions = [], initialValues
         }
 
         try {
-            const res = await axios.get(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${loc.lat}&lon=${loc.lng}`);
-            if (res.data && res.data.address) {
-                const addr = res.data.address;
-                const newPincode = addr.postcode || '';
-                const newCity = addr.city || addr.town || addr.village || addr.county || '';
-                const newState = addr.state || '';
-                const newAddressLine = res.data.display_name;
-
-                if (activeLocationType === 'pickup') {
-                    setPincode(newPincode);
-                    setCity(newCity);
-                    setState(newState);
-                    setAddressLine1(newAddressLine);
-                } else {
-                    setDropPincode(newPincode);
-                    setDropCity(newCity);
-                    setDropState(newState);
-                    setDropAddressLine1(newAddressLine);
-                }
+            const place = await reverseGeocode(loc.lat, loc.lng);
+            const locality = place.offices?.[0]?.name;
+            const newAddressLine = [locality, place.city, place.state, place.pincode].filter(Boolean).join(', ');
+
+            if (activeLocationType === 'pickup') {
+                setPincode(place.pincode);
+                setCity(place.city || '');
+                setState(place.state || '');
+                setAddressLine1(newAddressLine);
+            } else {
+                setDropPincode(place.pincode);
+                setDropCity(place.city || '');
+                setDropState(place.state || '');
+                setDropAddressLine1(newAddressLine);
             }
         } catch (err) {
             console.error("Reverse geocoding failed", err);
@@ -687,7 +684,9 @@ function NewShipmentModal({ onClose, onSuccess, suggestions = [], initialValues
                 // Link Trip if booking from search
                 trip_id: initialValues?.trip_id || null
             };
-            await axios.post(`${API_BASE_URL}/orders`, payload, config);
+            await axios.post(`${API_BASE_URL}/orders`, payload, {
+                headers: { ...config.headers, 'Idempotency-Key': idempotencyKey }
+            });
             onSuccess();
         } catch (err) {
             console.error(err);